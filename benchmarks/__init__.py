@@ -0,0 +1,22 @@
+"""
+Benchmarks hors ligne de la pipeline (aucun accès réseau, modèle MarianMT minuscule initialisé au hasard).
+
+    python -m benchmarks run [--suites translation io] [--scales 10k 100k 1M] [--out results.json]
+    python -m benchmarks compare baseline.json results.json [--threshold 0.10]
+
+- translation : débit (phrases/s, tokens/s) et latence p50/p95/p99 par sous-batch de translate_sentences
+  selon la taille des sous-batchs, le nombre de threads, la précision et le profil de décodage
+- io : génération des lots EN, transitions de statut et ajouts au meta FR à 10k/100k/1M phrases
+- metrics : surcoût par appel du registre de métriques (utils/metrics.py)
+- startup : temps d'import des modules (python -X importtime) et des commandes légères de la CLI,
+  dépendances lourdes importées par chaque module
+- server : test de charge du serveur local de traduction (requêtes/s, latence p50/p95/p99 par requête)
+  selon le nombre de clients concurrents
+"""
+import io
+import contextlib
+
+
+def quiet():
+    """Contexte qui masque la recopie des logs sur stdout pendant une mesure."""
+    return contextlib.redirect_stdout(io.StringIO())
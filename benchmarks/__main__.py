@@ -0,0 +1,83 @@
+"""
+Point d'entrée des benchmarks : python -m benchmarks run|compare (voir benchmarks/__init__.py).
+compare sort avec le code 1 si une métrique régresse au-delà du seuil (utilisable en CI).
+"""
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+from benchmarks.results import save_results, load_results, compare_results
+
+SUITES = ['translation', 'io', 'metrics', 'startup', 'server']
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def run(args):
+    results = []
+    if 'translation' in args.suites:
+        from benchmarks import bench_translation
+        print("Suite translation")
+        results += bench_translation.run(n=args.n, batch_sizes=args.batch_sizes, threads=args.threads, precisions=args.precisions, profiles=args.profiles, overlap=[o == 'on' for o in args.overlap])
+    if 'io' in args.suites:
+        from benchmarks import bench_io
+        print("Suite io")
+        results += bench_io.run(args.scales, args.batch_size)
+    if 'metrics' in args.suites:
+        from benchmarks import bench_metrics
+        print("Suite metrics")
+        results += bench_metrics.run()
+    if 'startup' in args.suites:
+        from benchmarks import bench_startup
+        print("Suite startup")
+        results += bench_startup.run(repeat=args.repeat)
+    if 'server' in args.suites:
+        from benchmarks import bench_server
+        print("Suite server")
+        results += bench_server.run(concurrency=args.concurrency, n_requests=args.requests)
+    out = args.out or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d-%H%M%S}.json")
+    print(f"{len(results)} résultat(s) écrit(s) dans {save_results(results, out)}")
+    return 0
+
+
+def compare(args):
+    rows = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+    if not rows:
+        print("Aucun résultat commun entre les deux fichiers.")
+        return 0
+    regressions = [r for r in rows if r['regression']]
+    for r in rows:
+        flag = 'REGRESSION' if r['regression'] else 'ok'
+        print(f"{flag:<10} {r['suite']}/{r['name']} {r['params']} {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})")
+    print(f"{len(rows)} métrique(s) comparée(s), {len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Benchmarks hors ligne de la pipeline")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_run = sub.add_parser('run', help='Exécute les benchmarks et écrit les résultats en JSON')
+    p_run.add_argument('--suites', nargs='+', default=SUITES, choices=SUITES)
+    p_run.add_argument('--out', type=str, default=None, help='Fichier JSON de sortie (défaut : benchmarks/results/bench_<date>.json)')
+    p_run.add_argument('--n', type=int, default=256, help='translation : nombre de phrases')
+    p_run.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 32, 64], help='translation : tailles de sous-batch')
+    p_run.add_argument('--threads', type=int, nargs='+', default=None, help='translation : threads PyTorch (défaut : 1 et tous)')
+    p_run.add_argument('--precisions', nargs='+', default=None, choices=['fp32', 'fp16', 'int8'], help='translation : précisions (défaut : fp32, int8, fp16 si GPU)')
+    p_run.add_argument('--profiles', nargs='+', default=['fast', 'balanced', 'quality'], help='translation : profils de décodage')
+    p_run.add_argument('--overlap', nargs='+', default=['on'], choices=['on', 'off'], help='translation : étages recouverts (on) ou enchaînés (off)')
+    p_run.add_argument('--scales', nargs='+', default=['10k', '100k', '1M'], help='io : nombres de phrases')
+    p_run.add_argument('--batch-size', type=int, default=100, help='io : taille des lots générés')
+    p_run.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64], help='server : niveaux de concurrence')
+    p_run.add_argument('--requests', type=int, default=256, help='server : requêtes par niveau')
+    p_run.add_argument('--repeat', type=int, default=5, help='startup : mesures par module (la plus rapide est retenue)')
+    p_cmp = sub.add_parser('compare', help='Compare des résultats à une référence et signale les régressions')
+    p_cmp.add_argument('baseline', help='JSON de référence')
+    p_cmp.add_argument('current', help='JSON à comparer')
+    p_cmp.add_argument('--threshold', type=float, default=0.10, help='Régression au-delà de cette dégradation relative (0.10 = 10 %%)')
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    return run(args) if args.command == 'run' else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
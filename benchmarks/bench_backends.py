@@ -0,0 +1,83 @@
+"""
+benchmarks/bench_backends.py : Compare les moteurs d'inférence (torch = référence, onnx) sur CPU.
+Mesure sur un lot EN (ou sur des phrases synthétiques) :
+- latence : une phrase à la fois (médiane et p95, en ms)
+- débit : phrases/s par sous-batchs de --batch-size phrases
+- taux de traductions différentes par rapport au moteur torch
+
+Usage : python -m benchmarks.bench_backends [--batch en_batch_xxx.parquet] [--n 200] [--batch-size 32] [--backends torch onnx]
+"""
+import os
+import time
+import argparse
+import statistics
+import pandas as pd
+from utils.config_loader import load_config, get_abs_path_from_config
+from pipeline.backends import BACKENDS, get_backend_loader
+
+
+def load_sentences(config, batch_name=None, n=200):
+    if batch_name:
+        path = os.path.join(get_abs_path_from_config(config, 'batches_dir'), batch_name)
+        return pd.read_parquet(path, columns=['en'])['en'].astype(str).tolist()[:n]
+    from benchmarks.bench_negation import make_sentences
+    return make_sentences(n)
+
+
+def translate(tokenizer, model, sentences):
+    import torch
+    inputs = tokenizer(sentences, return_tensors="pt", padding=True, truncation=True)
+    with torch.no_grad():
+        out = model.generate(**inputs)
+    return tokenizer.batch_decode(out, skip_special_tokens=True)
+
+
+def bench_backend(backend, model_path, model_name, sentences, batch_size):
+    t0 = time.perf_counter()
+    tokenizer, model = get_backend_loader(backend)(model_path, 'cpu', 'fp32', model_name)
+    load_time = time.perf_counter() - t0
+    translate(tokenizer, model, sentences[:2])  # préchauffage
+    latencies = []
+    for sentence in sentences:
+        t0 = time.perf_counter()
+        translate(tokenizer, model, [sentence])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    translations = []
+    t0 = time.perf_counter()
+    for i in range(0, len(sentences), batch_size):
+        translations.extend(translate(tokenizer, model, sentences[i:i + batch_size]))
+    elapsed = time.perf_counter() - t0
+    return {
+        'backend': backend,
+        'load_s': round(load_time, 2),
+        'latency_p50_ms': round(statistics.median(latencies), 2),
+        'latency_p95_ms': round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 2),
+        'sentences_per_s': round(len(sentences) / elapsed, 1),
+    }, translations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des moteurs d'inférence sur CPU")
+    parser.add_argument('--batch', type=str, default=None, help='Lot EN à utiliser (défaut : phrases synthétiques)')
+    parser.add_argument('--n', type=int, default=200, help='Nombre de phrases')
+    parser.add_argument('--batch-size', type=int, default=32, help='Taille des sous-batchs pour la mesure de débit')
+    parser.add_argument('--backends', nargs='+', default=BACKENDS, choices=BACKENDS)
+    args = parser.parse_args()
+    config = load_config()
+    model_info = config['models'][0]
+    model_path = os.path.join(get_abs_path_from_config(config, 'models_dir'), model_info['path'])
+    sentences = load_sentences(config, args.batch, args.n)
+    print(f"{len(sentences)} phrases, modèle {model_info['name']}, CPU")
+    results = []
+    reference = None
+    for backend in args.backends:
+        result, translations = bench_backend(backend, model_path, model_info['name'], sentences, args.batch_size)
+        if reference is None:
+            reference = translations
+        result['diff_rate'] = round(sum(a != b for a, b in zip(reference, translations)) / len(sentences), 4)
+        results.append(result)
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
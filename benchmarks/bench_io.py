@@ -0,0 +1,118 @@
+"""
+Benchmark des étapes hors modèle, à 10k/100k/1M phrases (dans un dossier temporaire) :
+- génération des lots EN (lecture en flux, annotation des négations, écriture parquet, enregistrement meta)
+- transitions de statut dans le store SQLite (réservation puis termine, un lot après l'autre)
+- ajouts au meta FR (un fragment par lot), relecture et compaction de fr_batch_info
+
+Usage : python -m benchmarks.bench_io [--scales 10k 100k 1M] [--batch-size 100]
+"""
+import os
+import time
+import logging
+import argparse
+import tempfile
+from benchmarks import quiet
+
+SCALES = ['10k', '100k', '1M']
+
+
+def parse_scale(scale):
+    """'10k' -> 10000, '1M' -> 1000000."""
+    scale = str(scale).strip()
+    factor = {'k': 1_000, 'K': 1_000, 'm': 1_000_000, 'M': 1_000_000}.get(scale[-1])
+    return int(float(scale[:-1]) * factor) if factor else int(scale)
+
+
+def bench_batch_generation(root, n, batch_size):
+    from pipeline.batch_generation_en import generate_batches
+    from benchmarks.bench_negation import make_sentences
+    data_dir = os.path.join(root, 'raw')
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, 'bench.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(make_sentences(n)) + '\n')
+    t0 = time.perf_counter()
+    generate_batches(batch_size=batch_size, force_rebuild=True, data_dir=data_dir, batches_dir=os.path.join(root, 'batches'), meta_dir=os.path.join(root, 'meta'))
+    elapsed = time.perf_counter() - t0
+    return {'total_s': round(elapsed, 3), 'sentences_per_s': round(n / elapsed, 1)}
+
+
+def bench_status_updates(root):
+    from utils.status_store import BatchStatusStore
+    from benchmarks.bench_translation import percentile
+    store = BatchStatusStore(os.path.join(root, 'meta', 'batch_info.parquet'), heartbeat_interval=None)
+    latencies = []
+    t0 = time.perf_counter()
+    while True:
+        t1 = time.perf_counter()
+        batch_id = store.claim_next()
+        if batch_id is None:
+            break
+        store.set_status(batch_id, 'termine')
+        latencies.append((time.perf_counter() - t1) * 1000)
+    elapsed = time.perf_counter() - t0
+    store.close()
+    return {
+        'total_s': round(elapsed, 3),
+        'transitions_per_s': round(2 * len(latencies) / elapsed, 1),
+        'latency_p50_ms': round(percentile(latencies, 50), 3),
+        'latency_p99_ms': round(percentile(latencies, 99), 3),
+        'batches': len(latencies),
+    }
+
+
+def bench_fr_meta(root, n, batch_size):
+    from utils.meta_utils import append_fr_meta_record, read_fr_batch_info, compact_fr_batch_info
+    meta_dir = os.path.join(root, 'meta')
+    n_batches = (n + batch_size - 1) // batch_size
+    t0 = time.perf_counter()
+    for i in range(n_batches):
+        append_fr_meta_record(meta_dir, {
+            'batch_id': f'fr_batch_bench_{i:07d}', 'batch_file': f'fr_batch_bench_{i:07d}.parquet',
+            'nb_phrases': batch_size, 'status': 'traduit', 'commentaire': ''
+        })
+    append_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    read_fr_batch_info(meta_dir)
+    read_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    compact_fr_batch_info(meta_dir)
+    compact_s = time.perf_counter() - t0
+    return {
+        'append_s': round(append_s, 3),
+        'appends_per_s': round(n_batches / append_s, 1),
+        'read_s': round(read_s, 3),
+        'compact_s': round(compact_s, 3),
+        'batches': n_batches,
+    }
+
+
+def run(scales=SCALES, batch_size=100):
+    """Exécute les trois mesures pour chaque échelle et retourne la liste des résultats."""
+    results = []
+    for scale in scales:
+        n = parse_scale(scale)
+        params = {'sentences': n, 'batch_size': batch_size}
+        with tempfile.TemporaryDirectory(prefix='bench_io_') as root:
+            for name, func, args in [
+                ('batch_generation', bench_batch_generation, (root, n, batch_size)),
+                ('status_updates', bench_status_updates, (root,)),
+                ('fr_meta_appends', bench_fr_meta, (root, n, batch_size)),
+            ]:
+                with quiet():
+                    metrics = func(*args)
+                print(f"  {name} {params} -> {metrics}")
+                results.append({'suite': 'io', 'name': name, 'params': params, 'metrics': metrics})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark génération des lots, statuts et meta FR")
+    parser.add_argument('--scales', nargs='+', default=SCALES, help="Nombres de phrases (10k, 100k, 1M...)")
+    parser.add_argument('--batch-size', type=int, default=100, help='Taille des lots générés')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.scales, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Surcoût par appel du registre de métriques (utils/metrics.py) : inc, set_gauge, observe,
+avec et sans étiquettes, et registre désactivé. Référence : un appel de fonction vide.
+
+Usage : python -m benchmarks.bench_metrics [--n 1000000]
+"""
+import time
+import argparse
+from utils.metrics import MetricsRegistry
+
+
+def per_call_ns(func, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def run(n=1_000_000):
+    registry = MetricsRegistry()
+    disabled = MetricsRegistry()
+    disabled.enabled = False
+    cases = {
+        'empty_call': lambda: None,
+        'inc': lambda: registry.inc('sub_batches_total'),
+        'inc_labels': lambda: registry.inc('alerts_total', kind='ram'),
+        'set_gauge': lambda: registry.set_gauge('padding_efficiency', 0.8),
+        'observe': lambda: registry.observe('sub_batch_latency_seconds', 0.042),
+        'observe_labels': lambda: registry.observe('stage_duration_seconds', 1.5, stage='Traduction'),
+        'inc_disabled': lambda: disabled.inc('sub_batches_total'),
+    }
+    results = []
+    for name, func in cases.items():
+        ns = per_call_ns(func, n)
+        print(f"  metrics {name} -> {ns:.0f} ns/appel")
+        results.append({'suite': 'metrics', 'name': name, 'params': {'n': n}, 'metrics': {'per_call_ms': round(ns / 1e6, 6)}})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surcoût par appel du registre de métriques")
+    parser.add_argument('--n', type=int, default=1_000_000, help="Nombre d'appels par mesure")
+    args = parser.parse_args()
+    run(args.n)
+
+
+if __name__ == "__main__":
+    main()
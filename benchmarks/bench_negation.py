@@ -0,0 +1,51 @@
+"""
+benchmarks/bench_negation.py : Micro-benchmark de l'annotation des négations.
+Compare l'implémentation d'origine (apply ligne à ligne) au moteur en une passe
+(pipeline/negation.py) sur N phrases synthétiques et vérifie que les résultats sont identiques.
+
+Usage : python -m benchmarks.bench_negation [--n 1000000] [--seed 0]
+"""
+import time
+import random
+import argparse
+from pipeline.negation import annotate_negation, annotate_negation_reference, NEGATION_KEYWORDS
+
+VOCAB = "the patient has chest pain fever cough history of acute distress nothing normal knowledge another with and".split()
+
+
+def make_sentences(n, seed=0):
+    """Phrases synthétiques de 3 à 30 mots, environ un tiers avec une négation."""
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(n):
+        words = [rng.choice(VOCAB) for _ in range(rng.randint(3, 30))]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(NEGATION_KEYWORDS))
+        sentences.append(' '.join(words).capitalize() + '.')
+    return sentences
+
+
+def timed(func, sentences):
+    t0 = time.perf_counter()
+    result = func(sentences)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de l'annotation des négations")
+    parser.add_argument('--n', type=int, default=1_000_000, help='Nombre de phrases')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    sentences = make_sentences(args.n, args.seed)
+    ref, t_ref = timed(annotate_negation_reference, sentences)
+    new, t_new = timed(annotate_negation, sentences)
+    for col in ref:
+        assert list(ref[col]) == list(new[col]), f"Résultat différent pour la colonne {col}"
+    print(f"{args.n} phrases, {int(sum(new['has_negation']))} avec négation")
+    print(f"  référence (apply) : {t_ref:.2f} s ({args.n / t_ref:,.0f} phrases/s)")
+    print(f"  moteur une passe  : {t_new:.2f} s ({args.n / t_new:,.0f} phrases/s)")
+    print(f"  accélération      : x{t_ref / t_new:.1f} (résultats identiques)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Test de charge du serveur local de traduction (pipeline/server.py) : N clients concurrents sur des
+connexions persistantes, chacun enchaînant ses requêtes. Par niveau de concurrence : requêtes/s,
+phrases/s, latence p50/p95/p99 par requête, requêtes refusées (503) et taille moyenne des paquets
+envoyés au modèle (micro-batching).
+
+Sans --port/--unix-socket, un serveur est démarré dans le processus sur le modèle minuscule de
+benchmarks/tiny_model.py (profil de décodage fast, mémoire de traduction désactivée).
+
+Usage : python -m benchmarks.bench_server [--concurrency 1 4 16 64] [--requests 256] [--port 8765]
+"""
+import time
+import asyncio
+import logging
+import argparse
+from utils.config_loader import load_config
+from benchmarks.bench_translation import percentile
+from benchmarks.bench_negation import make_sentences
+
+
+def make_tiny_translator(batch_size_model=32):
+    """Fonction de traduction sur le modèle minuscule (chargé une fois)."""
+    from pipeline.model_pool import load_marian_model
+    from pipeline.translation import translate_sentences
+    from pipeline.decoding import get_decoding_profile
+    from benchmarks.tiny_model import build_tiny_model
+    _, decoding = get_decoding_profile(load_config(), 'fast')
+    tokenizer, model = load_marian_model(build_tiny_model(), 'cpu', 'fp32')
+
+    def translate(texts):
+        return translate_sentences(texts, tokenizer, model, 'cpu', batch_size_model=batch_size_model, decoding=decoding)
+    return translate
+
+
+async def load_level(connect, concurrency, n_requests, sentences, per_request=1):
+    """n_requests requêtes réparties entre concurrency clients ; retourne (latences en s, refus, durée)."""
+    from pipeline.server import ServerBusy
+    latencies, rejected = [], [0]
+    next_request = iter(range(n_requests))
+
+    async def client_loop():
+        client = await connect()
+        try:
+            for i in next_request:
+                texts = [sentences[(i * per_request + k) % len(sentences)] for k in range(per_request)]
+                t0 = time.perf_counter()
+                try:
+                    await client.translate(texts)
+                except ServerBusy:
+                    rejected[0] += 1
+                    continue
+                latencies.append(time.perf_counter() - t0)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies, rejected[0], time.perf_counter() - start
+
+
+async def run_async(concurrency, n_requests, per_request, host, port, unix_socket, max_batch_size, max_wait_ms, max_queue):
+    from pipeline.server import TranslationServer, ServerClient
+    server = None
+    if port is None and unix_socket is None:
+        server = TranslationServer({'tiny': make_tiny_translator(max_batch_size)}, max_batch_size, max_wait_ms, max_queue)
+        await server.start(host, 0)
+        host, port = server.address
+
+    async def connect():
+        return await ServerClient(host, port, unix_socket).connect()
+
+    async def batch_stats():
+        client = await connect()
+        try:
+            _, health = await client.request('GET', '/health')
+        finally:
+            await client.close()
+        return sum(m['batches'] for m in health['models'].values()), sum(m['sentences'] for m in health['models'].values())
+
+    sentences = make_sentences(max(n_requests * per_request, 1))
+    results = []
+    try:
+        # Préchauffage : premières requêtes non mesurées
+        await load_level(connect, 1, 4, sentences, per_request)
+        for level in concurrency:
+            batches0, sent0 = await batch_stats()
+            latencies, rejected, elapsed = await load_level(connect, level, n_requests, sentences, per_request)
+            batches1, sent1 = await batch_stats()
+            metrics = {
+                'requests_per_s': round(len(latencies) / elapsed, 1),
+                'sentences_per_s': round(len(latencies) * per_request / elapsed, 1),
+                'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+                'latency_p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+                'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+                'rejected': rejected,
+                'mean_batch_size': round((sent1 - sent0) / max(batches1 - batches0, 1), 1),
+            }
+            params = {'concurrency': level, 'requests': n_requests, 'per_request': per_request, 'max_batch_size': max_batch_size, 'max_wait_ms': max_wait_ms}
+            print(f"  server concurrence {level} -> {metrics['requests_per_s']} req/s, p50 {metrics['latency_p50_ms']} ms, p99 {metrics['latency_p99_ms']} ms, paquets de {metrics['mean_batch_size']}, {rejected} refus")
+            results.append({'suite': 'server', 'name': 'load', 'params': params, 'metrics': metrics})
+    finally:
+        if server is not None:
+            await server.stop()
+    return results
+
+
+def run(concurrency=(1, 4, 16, 64), n_requests=256, per_request=1, host='127.0.0.1', port=None, unix_socket=None, max_batch_size=32, max_wait_ms=10, max_queue=1024):
+    """Exécute le test de charge et retourne la liste des résultats (format benchmarks.results)."""
+    from utils.core import install_log_handlers
+    # Logs de traduction coupés (console comprise) : les threads du serveur écrivent pendant la mesure
+    install_log_handlers([], logging.WARNING, async_logging=False, stdout_mirror=False)
+    return asyncio.run(run_async(concurrency, n_requests, per_request, host, port, unix_socket, max_batch_size, max_wait_ms, max_queue))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du serveur local de traduction")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64], help='Niveaux de concurrence (clients simultanés)')
+    parser.add_argument('--requests', type=int, default=256, help='Requêtes par niveau')
+    parser.add_argument('--per-request', type=int, default=1, help='Phrases par requête')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='Serveur déjà démarré (sinon serveur local sur le modèle minuscule)')
+    parser.add_argument('--unix-socket', default=None)
+    parser.add_argument('--max-batch-size', type=int, default=32, help='Serveur local : phrases par paquet')
+    parser.add_argument('--max-wait-ms', type=float, default=10, help='Serveur local : attente maximale avant envoi')
+    parser.add_argument('--max-queue', type=int, default=1024, help='Serveur local : phrases en attente au plus')
+    args = parser.parse_args()
+    run(args.concurrency, args.requests, args.per_request, args.host, args.port, args.unix_socket, args.max_batch_size, args.max_wait_ms, args.max_queue)
+
+
+if __name__ == "__main__":
+    main()
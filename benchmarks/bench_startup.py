@@ -0,0 +1,87 @@
+"""
+Temps de démarrage : coût d'import des modules de la pipeline (python -X importtime, processus neuf)
+et durée des commandes légères de la CLI (--help, status). Les dépendances lourdes (torch,
+transformers, matplotlib...) importées par chaque module sont relevées : un import apparu au
+niveau module est une régression même si la machine est rapide.
+
+Usage : python -m benchmarks.bench_startup [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    'main_pipeline',
+    'pipeline.translation',
+    'pipeline.preprocessing',
+    'pipeline.parallel',
+    'pipeline.streaming',
+    'pipeline.reporting',
+    'utils.status_store',
+]
+HEAVY_MODULES = ('torch', 'transformers', 'onnxruntime', 'matplotlib', 'seaborn', 'pandas')
+COMMANDS = {
+    'cli_help': ['main_pipeline.py', '--help'],
+    'cli_status': ['main_pipeline.py', 'status'],
+}
+
+
+def parse_importtime(stderr):
+    """Sortie de -X importtime -> {module: temps cumulé (µs)}."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # ligne d'en-tête
+        cumulative[parts[2].strip()] = int(parts[1])
+    return cumulative
+
+
+def measure_import(module):
+    """Import de module dans un processus neuf : (temps cumulé en ms, dépendances lourdes importées)."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import de {module} impossible : {proc.stderr.strip().splitlines()[-1]}")
+    cumulative = parse_importtime(proc.stderr)
+    heavy = sorted(name for name in HEAVY_MODULES if name in cumulative)
+    return cumulative.get(module, 0) / 1000, heavy
+
+
+def measure_command(args):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, check=True)
+    return (time.perf_counter() - t0) * 1000
+
+
+def run(repeat=5, modules=None):
+    results = []
+    for module in modules or MODULES:
+        samples, heavy = [], []
+        for _ in range(repeat):
+            ms, heavy = measure_import(module)
+            samples.append(ms)
+        print(f"  startup import {module} -> {min(samples):.1f} ms" + (f" (importe {', '.join(heavy)})" if heavy else ""))
+        results.append({'suite': 'startup', 'name': f'import:{module}', 'params': {'repeat': repeat},
+                        'metrics': {'import_ms': round(min(samples), 2), 'heavy_imports': heavy}})
+    for name, args in COMMANDS.items():
+        ms = min(measure_command(args) for _ in range(repeat))
+        print(f"  startup {name} -> {ms:.0f} ms")
+        results.append({'suite': 'startup', 'name': name, 'params': {'repeat': repeat}, 'metrics': {'wall_ms': round(ms, 1)}})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'import des modules et de démarrage de la CLI")
+    parser.add_argument('--repeat', type=int, default=5, help='Mesures par module (la plus rapide est retenue)')
+    args = parser.parse_args()
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark du chemin chaud de la traduction (translate_sentences, appelé par translate_batch)
+sur le modèle minuscule de benchmarks/tiny_model.py, mémoire de traduction désactivée.
+Grille : tailles de sous-batch x threads PyTorch x précisions x profils de décodage
+(x étages recouverts ou non, --overlap on off).
+Métriques : phrases/s, tokens source/s, latence par sous-batch (p50/p95/p99, en ms).
+
+Usage : python -m benchmarks.bench_translation [--n 256] [--batch-sizes 8 32 64] [--threads 1 4] [--precisions fp32 int8] [--profiles fast quality] [--overlap on off]
+"""
+import time
+import logging
+import argparse
+from utils.config_loader import load_config
+from benchmarks import quiet
+
+
+def percentile(values, pct):
+    """Percentile au rang le plus proche (values non vide)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def default_precisions():
+    import torch
+    return ['fp32', 'int8'] + (['fp16'] if torch.cuda.is_available() else [])
+
+
+def bench_translate(tokenizer, model, device, sentences, batch_size, decoding, n_tokens, overlap=None):
+    """Traduit sentences une fois et retourne les métriques de débit et de latence par sous-batch."""
+    from pipeline.translation import translate_sentences
+    stamps = []
+    with quiet():
+        start = time.perf_counter()
+        translate_sentences(
+            sentences, tokenizer, model, device, batch_size_model=batch_size,
+            decoding=decoding,
+            overlap=overlap,
+            progress=lambda indices, fr_texts: stamps.append(time.perf_counter())
+        )
+        elapsed = time.perf_counter() - start
+    latencies = [(t1 - t0) * 1000 for t0, t1 in zip([start] + stamps[:-1], stamps)]
+    return {
+        'total_s': round(elapsed, 4),
+        'sentences_per_s': round(len(sentences) / elapsed, 1),
+        'tokens_per_s': round(n_tokens / elapsed, 1),
+        'latency_p50_ms': round(percentile(latencies, 50), 2),
+        'latency_p95_ms': round(percentile(latencies, 95), 2),
+        'latency_p99_ms': round(percentile(latencies, 99), 2),
+        'sub_batches': len(latencies),
+    }
+
+
+def run(n=256, batch_sizes=(8, 32, 64), threads=None, precisions=None, profiles=('fast', 'balanced', 'quality'), model_dir=None, overlap=(True,)):
+    """Exécute la grille et retourne la liste des résultats (format benchmarks.results)."""
+    import torch
+    from pipeline.model_pool import load_marian_model
+    from pipeline.decoding import get_decoding_profile
+    from benchmarks.tiny_model import build_tiny_model
+    from benchmarks.bench_negation import make_sentences
+    config = load_config()
+    model_dir = model_dir or build_tiny_model()
+    threads = threads or sorted({1, torch.get_num_threads()})
+    precisions = precisions or default_precisions()
+    sentences = make_sentences(n)
+    results = []
+    for precision in precisions:
+        device = 'cuda' if precision == 'fp16' or (precision == 'fp32' and torch.cuda.is_available()) else 'cpu'
+        with quiet():
+            tokenizer, model = load_marian_model(model_dir, device, precision)
+        n_tokens = sum(len(ids) for ids in tokenizer(sentences)['input_ids'])
+        for n_threads in threads:
+            torch.set_num_threads(n_threads)
+            for profile_name in profiles:
+                _, decoding = get_decoding_profile(config, profile_name)
+                for batch_size in batch_sizes:
+                    for enabled in overlap:
+                        # Préchauffage : un sous-batch non mesuré
+                        bench_translate(tokenizer, model, device, sentences[:batch_size], batch_size, decoding, 0, {'enabled': enabled})
+                        metrics = bench_translate(tokenizer, model, device, sentences, batch_size, decoding, n_tokens, {'enabled': enabled})
+                        params = {'precision': precision, 'device': device, 'threads': n_threads, 'profile': profile_name, 'batch_size': batch_size, 'n': n, 'overlap': enabled}
+                        print(f"  translate {params} -> {metrics['sentences_per_s']} phrases/s, p95 {metrics['latency_p95_ms']} ms")
+                        results.append({'suite': 'translation', 'name': 'translate_sentences', 'params': params, 'metrics': metrics})
+        del model
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de translate_sentences sur le modèle minuscule")
+    parser.add_argument('--n', type=int, default=256, help='Nombre de phrases')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 32, 64])
+    parser.add_argument('--threads', type=int, nargs='+', default=None)
+    parser.add_argument('--precisions', nargs='+', default=None, choices=['fp32', 'fp16', 'int8'])
+    parser.add_argument('--profiles', nargs='+', default=['fast', 'balanced', 'quality'])
+    parser.add_argument('--overlap', nargs='+', default=['on'], choices=['on', 'off'], help='Étages tokenisation / generate / décodage recouverts (on) ou enchaînés (off)')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.n, args.batch_sizes, args.threads, args.precisions, args.profiles, overlap=[o == 'on' for o in args.overlap])
+
+
+if __name__ == "__main__":
+    main()
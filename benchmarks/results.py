@@ -0,0 +1,79 @@
+"""
+Résultats des benchmarks en JSON et comparaison à une référence (baseline).
+Un résultat : {'suite', 'name', 'params', 'metrics'} ; deux résultats sont comparés s'ils ont
+même suite, nom et paramètres. Sens des métriques d'après leur suffixe :
+*_per_s plus haut = meilleur, *_ms / *_s plus bas = meilleur, les autres ne sont pas comparées.
+"""
+import os
+import json
+import platform
+from datetime import datetime
+
+
+def result_key(result):
+    return (result['suite'], result['name'], json.dumps(result.get('params', {}), sort_keys=True))
+
+
+def metric_direction(metric):
+    """+1 si plus haut = meilleur, -1 si plus bas = meilleur, 0 si la métrique n'est pas comparée."""
+    if metric.endswith('_per_s'):
+        return 1
+    if metric.endswith('_ms') or metric.endswith('_s'):
+        return -1
+    return 0
+
+
+def environment_info():
+    info = {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()}
+    try:
+        import torch
+        info['torch'] = torch.__version__
+        info['cuda'] = torch.cuda.is_available()
+    except ImportError:
+        pass
+    return info
+
+
+def save_results(results, path):
+    payload = {'date': datetime.now().isoformat(timespec='seconds'), 'environment': environment_info(), 'results': results}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """
+    Compare deux listes de résultats. Retourne une ligne par métrique commune :
+    {'suite', 'name', 'params', 'metric', 'baseline', 'current', 'change', 'regression'}
+    change est la variation relative dans le sens « meilleur » (négative = plus lent) ;
+    regression vaut True au-delà de threshold (0.10 = 10 %).
+    """
+    reference = {result_key(r): r for r in baseline}
+    rows = []
+    for result in current:
+        base = reference.get(result_key(result))
+        if base is None:
+            continue
+        for metric, value in result['metrics'].items():
+            direction = metric_direction(metric)
+            base_value = base['metrics'].get(metric)
+            if not direction or not base_value or value is None:
+                continue
+            change = direction * (value - base_value) / abs(base_value)
+            rows.append({
+                'suite': result['suite'],
+                'name': result['name'],
+                'params': result.get('params', {}),
+                'metric': metric,
+                'baseline': base_value,
+                'current': value,
+                'change': round(change, 4),
+                'regression': change < -threshold,
+            })
+    return rows
@@ -0,0 +1,53 @@
+"""
+Modèle MarianMT minuscule pour les benchmarks : tokenizer SentencePiece entraîné sur des phrases
+synthétiques et poids initialisés au hasard (1 couche, d_model 32). Les traductions n'ont pas de sens,
+mais le chemin de calcul (tokenisation, generate, décodage) est celui du vrai modèle.
+Construit une fois dans benchmarks/.cache/tiny_marian.
+"""
+import os
+import json
+import shutil
+import tempfile
+from utils.core import log_info, ensure_dir_exists
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'tiny_marian')
+
+
+def build_tiny_model(out_dir=DEFAULT_DIR, seed=0, force=False):
+    """Construit (si absent) le modèle minuscule et retourne son dossier."""
+    if not force and os.path.isfile(os.path.join(out_dir, 'config.json')):
+        return out_dir
+    import torch
+    import sentencepiece as spm
+    from transformers import MarianConfig, MarianMTModel, MarianTokenizer
+    from benchmarks.bench_negation import make_sentences
+    ensure_dir_exists(out_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, 'corpus.txt')
+        with open(corpus, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(make_sentences(2000, seed)) + '\n')
+        prefix = os.path.join(tmp, 'spm')
+        spm.SentencePieceTrainer.train(
+            input=corpus, model_prefix=prefix, vocab_size=64, model_type='unigram', character_coverage=1.0,
+            bos_id=-1, eos_id=1, unk_id=2, pad_id=0, pad_piece='<pad>', minloglevel=2
+        )
+        shutil.copy(prefix + '.model', os.path.join(out_dir, 'source.spm'))
+        shutil.copy(prefix + '.model', os.path.join(out_dir, 'target.spm'))
+        sp = spm.SentencePieceProcessor(model_file=prefix + '.model')
+        vocab = {sp.id_to_piece(i): i for i in range(sp.get_piece_size())}
+    with open(os.path.join(out_dir, 'vocab.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocab, f)
+    tokenizer = MarianTokenizer(
+        os.path.join(out_dir, 'source.spm'), os.path.join(out_dir, 'target.spm'), os.path.join(out_dir, 'vocab.json'),
+        source_lang='en', target_lang='fr'
+    )
+    tokenizer.save_pretrained(out_dir)
+    torch.manual_seed(seed)
+    config = MarianConfig(
+        vocab_size=len(vocab), d_model=32, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=64, decoder_ffn_dim=64,
+        max_position_embeddings=256, pad_token_id=0, eos_token_id=1, decoder_start_token_id=0, forced_eos_token_id=1
+    )
+    MarianMTModel(config).save_pretrained(out_dir)
+    log_info(f"Modèle minuscule de benchmark construit : {out_dir}")
+    return out_dir
@@ -1,58 +1,99 @@
 """
-compare_fp16_fp32.py : Compare la traduction d'un batch en FP32 et FP16.
-Affiche et exporte les différences (si présentes).
+compare_fp16_fp32.py : Compare la traduction d'un batch en FP32 et FP16, ou en FP32 et int8 (--quantize int8).
+Affiche le taux de phrases différentes et le débit (phrases/s) de chaque mode,
+et exporte les différences (si présentes).
+Le lot est tokenisé une seule fois (tokens pré-calculés de pipeline.pretokenize, partagés par les deux modes).
 """
 import os
+import time
 import pandas as pd
 from transformers import MarianMTModel, MarianTokenizer
 import torch
 from utils.config_loader import load_config, get_abs_path_from_config
 from utils.core import log_info
 
-def translate_sentences(sentences, model_path, device, fp16=False):
+def load_model(model_path, device, fp16=False, quantize=None):
     tokenizer = MarianTokenizer.from_pretrained(model_path)
+    if quantize:
+        # Modèle quantifié : CPU uniquement, lu depuis le cache disque s'il existe
+        from pipeline.quantization import load_quantized_model
+        return tokenizer, load_quantized_model(model_path, quantize), 'cpu'
     model = MarianMTModel.from_pretrained(model_path)
     if fp16 and torch.cuda.is_available():
         model = model.half()
     model.to(device)
-    inputs = tokenizer(sentences, return_tensors="pt", padding=True, truncation=True)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
-    with torch.no_grad():
-        translated = model.generate(**inputs)
-    return tokenizer.batch_decode(translated, skip_special_tokens=True)
+    model.eval()
+    return tokenizer, model, device
 
-def compare_batch(batch_name, batch_dir=None):
+def translate_sentences(sentences, model_path, device, fp16=False, quantize=None, batch_size=32, input_ids=None):
+    """
+    Traduit les phrases et retourne (traductions, phrases/s) ; le chargement du modèle n'est pas chronométré.
+    input_ids : tokens pré-calculés des phrases (sous-batchs simplement paddés).
+    """
+    tokenizer, model, device = load_model(model_path, device, fp16=fp16, quantize=quantize)
+    translations = []
+    t0 = time.perf_counter()
+    for i in range(0, len(sentences), batch_size):
+        if input_ids is not None:
+            inputs = tokenizer.pad({'input_ids': input_ids[i:i + batch_size]}, return_tensors="pt")
+        else:
+            inputs = tokenizer(sentences[i:i + batch_size], return_tensors="pt", padding=True, truncation=True)
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        with torch.no_grad():
+            translated = model.generate(**inputs)
+        translations.extend(tokenizer.batch_decode(translated, skip_special_tokens=True))
+    elapsed = time.perf_counter() - t0
+    return translations, len(sentences) / elapsed if elapsed > 0 else 0.0
+
+def compare_batch(batch_name, batch_dir=None, quantize=None):
     config = load_config()
     if batch_dir is None:
         batch_dir = get_abs_path_from_config(config, 'batches_dir')
     batch_path = os.path.join(batch_dir, batch_name)
-    df = pd.read_parquet(batch_path)
-    sentences = df['en'].astype(str).tolist()
+    from utils.batch_store import read_batch_columns
+    df = read_batch_columns(batch_path, ['en'], config)
+    sentences = df['en'].astype(str).str.strip().tolist()
     model_info = config['models'][0]
     model_dir = get_abs_path_from_config(config, 'models_dir')
     model_path = os.path.join(model_dir, model_info['path'])
-    device = 'cuda' if torch.cuda.is_available() else 'cpu'
-    log_info(f"Comparaison FP32 vs FP16 sur {len(sentences)} phrases, modèle {model_info['name']}")
-    fr_fp32 = translate_sentences(sentences, model_path, device, fp16=False)
-    fr_fp16 = translate_sentences(sentences, model_path, device, fp16=True)
+    from pipeline.pretokenize import get_batch_token_ids
+    token_ids = get_batch_token_ids(batch_path, sentences, MarianTokenizer.from_pretrained(model_path), model_path, config)
+    input_ids = token_ids[0] if token_ids is not None else None
+    if quantize:
+        # La quantification dynamique ne s'applique qu'au CPU : la référence FP32 est aussi mesurée sur CPU
+        device = 'cpu'
+        label = quantize
+    else:
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        label = 'fp16'
+    log_info(f"Comparaison FP32 vs {label.upper()} sur {len(sentences)} phrases, modèle {model_info['name']}")
+    fr_fp32, speed_fp32 = translate_sentences(sentences, model_path, device, fp16=False, input_ids=input_ids)
+    if quantize:
+        fr_other, speed_other = translate_sentences(sentences, model_path, device, quantize=quantize, input_ids=input_ids)
+    else:
+        fr_other, speed_other = translate_sentences(sentences, model_path, device, fp16=True, input_ids=input_ids)
     # Analyse des différences
     diffs = []
-    for i, (s, t32, t16) in enumerate(zip(sentences, fr_fp32, fr_fp16)):
-        if t32 != t16:
-            diffs.append({'idx': i, 'en': s, 'fr_fp32': t32, 'fr_fp16': t16})
+    for i, (s, t32, t_other) in enumerate(zip(sentences, fr_fp32, fr_other)):
+        if t32 != t_other:
+            diffs.append({'idx': i, 'en': s, 'fr_fp32': t32, f'fr_{label}': t_other})
+    diff_rate = len(diffs) / len(sentences) if sentences else 0.0
+    print(f"FP32 : {speed_fp32:.1f} phrases/s | {label.upper()} : {speed_other:.1f} phrases/s (x{speed_other / speed_fp32 if speed_fp32 else 0:.2f})")
+    print(f"Taux de phrases différentes : {diff_rate:.1%} ({len(diffs)}/{len(sentences)})")
     if diffs:
         diff_df = pd.DataFrame(diffs)
-        out_path = os.path.join(batch_dir, f'diff_fp32_fp16_{batch_name}.csv')
+        out_path = os.path.join(batch_dir, f'diff_fp32_{label}_{batch_name}.csv')
         diff_df.to_csv(out_path, index=False)
         print(f"Différences trouvées : {len(diffs)}. Export : {out_path}")
     else:
-        print("Aucune différence entre FP32 et FP16 sur ce batch.")
+        print(f"Aucune différence entre FP32 et {label.upper()} sur ce batch.")
     return diffs
 
 if __name__ == "__main__":
     import argparse
-    parser = argparse.ArgumentParser(description="Comparer la traduction FP32 vs FP16 sur un batch.")
+    parser = argparse.ArgumentParser(description="Comparer la traduction FP32 vs FP16 (ou FP32 vs int8) sur un batch.")
     parser.add_argument('batch_name', type=str, help='Nom du batch (ex: en_batch_0001.parquet)')
     parser.add_argument('--batch-dir', type=str, default=None, help='Répertoire des batches (optionnel)')
+    parser.add_argument('--quantize', type=str, default=None, choices=['int8'], help='Comparer FP32 au modèle quantifié (CPU) au lieu de FP16')
     args = parser.parse_args()
-    compare_batch(args.batch_name, args.batch_dir)
+    compare_batch(args.batch_name, args.batch_dir, quantize=args.quantize)
@@ -1,35 +1,74 @@
-
 """
 Script principal d'automatisation de la pipeline de traduction
 Pipeline modulaire : prétraitement, traduction, post-traitement, analyse, gestion des statuts, logs, archivage, reporting, parallélisation.
+
+Sous-commandes (sans sous-commande : génération puis traduction, comme avant) :
+- generate  : génération des lots EN
+- translate : traduction des lots à traiter (seule étape qui importe torch/transformers)
+- status    : décompte des lots par statut (store SQLite, sans pandas ni torch)
+- report    : rapport des lots FR (matplotlib/seaborn)
+- compare   : comparaison des modèles de la config sur les mêmes lots (pipeline.model_comparison)
+Les dépendances lourdes ne sont importées que par l'étape qui en a besoin.
 """
 
 
 import argparse
-import glob
 import os
 from utils.config_loader import load_config, get_abs_path_from_config
 from utils.core import log_info, log_error, setup_logger
 
-# Initialisation du logger au lancement du script
-setup_logger('logs')
 # ...imports pipeline (étapes) commentés pour l'instant...
 
-def get_all_batches(batches_dir):
-    return glob.glob(os.path.join(batches_dir, '*.parquet'))
+def main(parallel=False, max_workers=2, force_rebuild=False, batch_size=100, num_batches=None, stop_after=None, batch_size_model=32, monitoring_frequency=1, alert_ram=90, alert_gpu=90, alert_time=10, fp16=False, batching=None, max_tokens=None, streaming=False, executor='thread', threads_per_worker=None, pin_cpu=False, translation_memory=True, quantize=None, decoding_profile=None, daemon=False, pretokenize=None, row_filter=None):
+    # Initialisation du logger au lancement de la pipeline (pas à l'import : les workers
+    # processus réimportent ce module)
+    # Mode démon : logs dans le fichier uniquement (pas de recopie console)
+    setup_logger('logs', stdout_mirror=False if daemon else None)
+    run_id = start_run()
+    generate(batch_size=batch_size, force_rebuild=force_rebuild, num_batches=num_batches, pretokenize=pretokenize)
+    translate(
+        parallel=parallel, max_workers=max_workers, num_batches=num_batches, stop_after=stop_after,
+        batch_size_model=batch_size_model, monitoring_frequency=monitoring_frequency, alert_ram=alert_ram,
+        alert_gpu=alert_gpu, alert_time=alert_time, fp16=fp16, batching=batching, max_tokens=max_tokens,
+        streaming=streaming, executor=executor, threads_per_worker=threads_per_worker, pin_cpu=pin_cpu,
+        translation_memory=translation_memory, quantize=quantize, decoding_profile=decoding_profile, run_id=run_id,
+        row_filter=row_filter
+    )
+    end_run()
 
-def main(parallel=False, max_workers=2, force_rebuild=False, batch_size=100, num_batches=None, stop_after=None, batch_size_model=32, monitoring_frequency=1, alert_ram=90, alert_gpu=90, alert_time=10, fp16=False):
+def start_run():
+    """Démarre l'export des métriques d'une exécution et retourne son identifiant."""
+    from datetime import datetime
+    from utils.metrics import start_metrics_export
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    start_metrics_export(load_config(), run_id)
+    return run_id
+
+def end_run():
+    from utils.metrics import stop_metrics_export
+    stop_metrics_export()
+    log_info("--- Pipeline terminée avec succès ---")
+
+def generate(batch_size=100, force_rebuild=False, num_batches=None, pretokenize=None):
+    """Étapes 1-2 : vérification des données sources et génération des lots EN (et de leurs tokens si pretokenize)."""
     config = load_config()
     # Vérification de la présence des données sources
     from utils.core import check_data_source_exists
     files = check_data_source_exists(config)
-    print(f"Fichiers sources trouvés : {files}")
+    log_info(f"Fichiers sources trouvés : {files}")
 
     # Étape 2 : Génération des lots
     from pipeline.batch_generation_en import generate_batches
-    generate_batches(batch_size=batch_size, force_rebuild=force_rebuild, num_batches=num_batches)
-    print("Lots générés (ou déjà présents).")
+    generate_batches(batch_size=batch_size, force_rebuild=force_rebuild, num_batches=num_batches, pretokenize=pretokenize)
+    log_info("Lots générés (ou déjà présents).")
 
+def translate(parallel=False, max_workers=2, num_batches=None, stop_after=None, batch_size_model=32, monitoring_frequency=1, alert_ram=90, alert_gpu=90, alert_time=10, fp16=False, batching=None, max_tokens=None, streaming=False, executor='thread', threads_per_worker=None, pin_cpu=False, translation_memory=True, quantize=None, decoding_profile=None, run_id=None, row_filter=None):
+    """
+    Étapes 3-5 : sélection des lots à traiter selon leur statut, traduction et export des statuts.
+    row_filter : filtre de lignes (pipeline.row_filter) ; lots écartés sur les statistiques des row groups,
+    seules les lignes retenues des autres lots sont traduites.
+    """
+    config = load_config()
     # Étape 3 : Validation du format des lots (désactivée car le test pose problème avec lots FR)
     # from tests.test_batch_format import test_batch_format
     # test_batch_format()
@@ -40,82 +79,81 @@ def main(parallel=False, max_workers=2, force_rebuild=False, batch_size=100, num
     batches_dir = get_abs_path_from_config(config, 'batches_dir')
     meta_dir = get_abs_path_from_config(config, 'meta_dir')
     meta_path = os.path.join(meta_dir, 'batch_info.parquet')
-    batch_paths = get_all_batches(batches_dir)
-    # Correction : extraire batch_id depuis le nom de fichier batch_XXXX_YYYY.parquet
-    batch_id_to_path = {}
-    for p in batch_paths:
-        fname = os.path.basename(p)
-        # Correction : inclure les fichiers commençant par 'en_batch_' (et potentiellement d'autres préfixes)
-        if fname.endswith('.parquet'):
-            batch_id = fname[:-len('.parquet')]
-            batch_id_to_path[batch_id] = p
     batches_to_process = get_batches_to_process(meta_path)
+    # Chemin logique de chaque lot (<batches_dir>/<batch_id>.parquet), fichier réel ou row group du dataset :
+    # pas de listing du dossier des lots
+    from utils.batch_store import get_batch_path
+    batch_items = [(batch_id, get_batch_path(batches_dir, batch_id)) for batch_id in batches_to_process]
+    # Filtre de lignes : lots sans ligne retenue écartés, positions des lignes à traduire par lot
+    selection = {}
+    if row_filter:
+        from pipeline.row_filter import select_batches
+        batch_items, selection = select_batches(batch_items, row_filter, config, limit=num_batches)
     # Limiter le nombre de batchs à traiter si demandé
-    if num_batches is not None:
-        batches_to_process = batches_to_process[:num_batches]
+    elif num_batches is not None:
+        batch_items = batch_items[:num_batches]
+    batches_to_process = [batch_id for batch_id, _ in batch_items]
+    batch_id_to_path = dict(batch_items)
     if batches_to_process:
         log_info(f"[ÉTAPE 5] {len(batches_to_process)} lot(s) à traiter : {batches_to_process}")
     else:
         log_info("[ÉTAPE 5] Aucun lot à traiter : tous les lots sont terminés ou en erreur.")
 
     # --- Étapes suivantes à valider plus tard ---
-    from utils.meta_utils import update_batch_status
-
-    def process_one_batch(batch_id):
-        batch_name = os.path.basename(batch_id_to_path[batch_id])
-        try:
-            update_batch_status(meta_path, batch_id, 'en_cours')
-            # Étape 1 : prétraitement
-            from pipeline.preprocessing import preprocess_batch
-            preprocess_batch(batch_name)
-            if stop_after == 'preprocessing':
-                log_info(f"Arrêt demandé après prétraitement du lot {batch_id}.")
-                return True
-            # Étape 2 : traduction
-            from pipeline.translation import translate_batch
-            translate_batch(
-                batch_name,
-                batch_size_model=batch_size_model,
-                monitoring_frequency=monitoring_frequency,
-                alert_ram=alert_ram,
-                alert_gpu=alert_gpu,
-                alert_time=alert_time,
-                fp16=fp16
-            )
-            if stop_after == 'translation':
-                log_info(f"Arrêt demandé après traduction du lot {batch_id}.")
-                return True
-            # Étape 3 : post-traitement (à activer si besoin)
-            try:
-                from pipeline.postprocessing import postprocess_batch
-                postprocess_batch(batch_name)
-                if stop_after == 'postprocessing':
-                    log_info(f"Arrêt demandé après post-traitement du lot {batch_id}.")
-                    return True
-            except ImportError:
-                pass
-            # Étape 4 : analyse (à activer si besoin)
-            try:
-                from pipeline.analysis import analyze_batch
-                analyze_batch(batch_name)
-                if stop_after == 'analysis':
-                    log_info(f"Arrêt demandé après analyse du lot {batch_id}.")
-                    return True
-            except ImportError:
-                pass
-            update_batch_status(meta_path, batch_id, 'termine')
-            log_info(f"Lot {batch_id} prétraité, traduit et post-traité.")
-        except Exception as e:
-            update_batch_status(meta_path, batch_id, 'erreur')
-            log_error(f"Erreur sur le lot {batch_id}", exc=e)
-        return True
+    from pipeline.parallel import process_one_batch
+    translation_options = dict(
+        batch_size_model=batch_size_model,
+        monitoring_frequency=monitoring_frequency,
+        alert_ram=alert_ram,
+        alert_gpu=alert_gpu,
+        alert_time=alert_time,
+        fp16=fp16,
+        batching=batching,
+        max_tokens=max_tokens,
+        translation_memory=translation_memory,
+        quantize=quantize,
+        decoding_profile=decoding_profile
+    )
 
     import concurrent.futures
     log_info("--- Démarrage de la pipeline automatisée ---")
-    if parallel:
+    if streaming and stop_after != 'preprocessing':
+        # Tous les lots à traiter forment un seul flux de phrases pour le modèle
+        from pipeline.streaming import translate_stream
+        translate_stream(
+            [(batch_id, batch_id_to_path[batch_id]) for batch_id in batches_to_process],
+            meta_path,
+            batch_size_model=batch_size_model,
+            monitoring_frequency=monitoring_frequency,
+            alert_ram=alert_ram,
+            alert_gpu=alert_gpu,
+            alert_time=alert_time,
+            fp16=fp16,
+            batching=batching,
+            max_tokens=max_tokens,
+            stop_after=stop_after,
+            translation_memory=translation_memory,
+            quantize=quantize,
+            decoding_profile=decoding_profile,
+            selection=selection
+        )
+    elif executor == 'process':
+        from pipeline.parallel import run_batches_in_processes
+        run_batches_in_processes(
+            [(batch_id, batch_id_to_path[batch_id]) for batch_id in batches_to_process],
+            meta_path,
+            translation_options,
+            stop_after=stop_after,
+            max_workers=max_workers,
+            threads_per_worker=threads_per_worker,
+            pin_cpu=pin_cpu,
+            metrics_run_id=run_id,
+            selection=selection
+        )
+    elif parallel:
         log_info(f"Traitement parallèle activé ({max_workers} workers)...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(process_one_batch, batch_id): batch_id for batch_id in batches_to_process}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool_executor:
+            futures = {pool_executor.submit(process_one_batch, batch_id, batch_id_to_path[batch_id], meta_path, translation_options, stop_after, True, selection.get(batch_id)): batch_id for batch_id in batches_to_process}
             for future in concurrent.futures.as_completed(futures):
                 batch_id = futures[future]
                 try:
@@ -124,65 +162,183 @@ def main(parallel=False, max_workers=2, force_rebuild=False, batch_size=100, num
                     log_error(f"Exception dans le traitement du lot {batch_id}: {exc}")
     else:
         for batch_id in batches_to_process:
-            process_one_batch(batch_id)
-    log_info("--- Pipeline terminée avec succès ---")
+            process_one_batch(batch_id, batch_id_to_path[batch_id], meta_path, translation_options, stop_after, rows=selection.get(batch_id))
+    # Export des statuts vers batch_info.parquet pour les outils de reporting
+    from utils.meta_utils import export_batch_info, compact_fr_batch_info
+    export_batch_info(meta_path)
+    n_fragments = compact_fr_batch_info(meta_dir)
+    if n_fragments:
+        log_info(f"Meta FR compacté : {n_fragments} fragment(s) fusionné(s) dans fr_batch_info.parquet")
+    from utils.batch_store import is_dataset_layout, compact_fr_dataset
+    if is_dataset_layout(config):
+        n_fragments = compact_fr_dataset(config, batches_dir)
+        if n_fragments:
+            log_info(f"Dataset FR compacté : {n_fragments} lot(s) fusionné(s) dans les partitions")
+    from pipeline.model_pool import has_model_pool, get_model_pool
+    if has_model_pool():
+        get_model_pool().log_stats()
+    from pipeline.translation_memory import log_all_stats
+    log_all_stats()
 
-if __name__ == "__main__":
-    import importlib
-    parser = argparse.ArgumentParser(description="Pipeline de traduction modulaire")
-    parser.add_argument('--parallel', action='store_true', help='Activer le traitement parallèle des lots')
-    parser.add_argument('--max-workers', type=int, default=None, help='Nombre de workers pour le mode parallèle (par défaut: optimal selon CPU/GPU/batchs)')
+def add_generation_arguments(parser):
     parser.add_argument('--force-rebuild', action='store_true', help='Forcer la régénération des lots')
     parser.add_argument('--batch-size', type=int, default=100, help='Taille des lots à générer')
     parser.add_argument('--num-batches', type=int, default=None, help='Nombre de lots à traiter (None = tous)')
+    parser.add_argument('--pretokenize', action='store_true', default=None, help="Écrire aussi les tokens des lots (input_ids, nb_tokens) pour les modèles de la config (défaut: config pretokenize.at_generation)")
+
+def add_translation_arguments(parser):
+    from pipeline.parallel import EXECUTORS
+    parser.add_argument('--parallel', action='store_true', help='Activer le traitement parallèle des lots')
+    parser.add_argument('--max-workers', type=int, default=None, help='Nombre de workers pour le mode parallèle (par défaut: optimal selon CPU/GPU/batchs)')
     parser.add_argument('--stop-after', type=str, default=None, choices=['preprocessing', 'translation', 'postprocessing', 'analysis'], help="Arrêter la pipeline après cette étape pour chaque lot")
     parser.add_argument('--batch-size-model', type=int, default=32, help='Taille des batchs envoyés au modèle de traduction')
     parser.add_argument('--monitoring-frequency', type=int, default=1, help='Fréquence des logs/monitoring (1=chaque batch, 2=1 batch sur 2, etc.)')
-    parser.add_argument('--alert-ram', type=int, default=90, help="Seuil d'alerte RAM (%)")
-    parser.add_argument('--alert-gpu', type=int, default=90, help="Seuil d'alerte GPU (%)")
+    parser.add_argument('--alert-ram', type=int, default=90, help="Seuil d'alerte RAM (%%)")
+    parser.add_argument('--alert-gpu', type=int, default=90, help="Seuil d'alerte GPU (%%)")
     parser.add_argument('--alert-time', type=float, default=10, help="Seuil d'alerte temps par lot (secondes)")
     parser.add_argument('--fp16', action='store_true', help='Activer le mode half-precision (FP16) pour la traduction (GPU uniquement)')
-    args = parser.parse_args()
-
-    # Calcul automatique du nombre optimal de workers si non spécifié
-    def compute_optimal_workers(num_batches=None):
-        try:
-            import torch
-            gpu_available = torch.cuda.is_available()
-        except ImportError:
-            gpu_available = False
-        cpu_count = os.cpu_count() or 2
-        # On limite à 1 worker si GPU, sinon on prend min(cpu_count, num_batches, 8)
-        if gpu_available:
-            # Pour la 4070 Super, un seul worker saturera le GPU (traduction batchée)
-            return 1
-        else:
-            # Pour CPU, on ne dépasse pas le nombre de batchs ni 8 threads (par sécurité)
-            if num_batches is not None:
-                return max(1, min(cpu_count, num_batches, 8))
-            else:
-                return max(1, min(cpu_count, 8))
+    parser.add_argument('--quantize', type=str, default=None, choices=['int8'], help="Quantification dynamique des couches linéaires pour l'inférence CPU (modèle converti une fois et mis en cache) (défaut: config quantize)")
+    parser.add_argument('--decoding-profile', type=str, default=None, help="Profil de décodage (config decoding_profiles) : fast (greedy), balanced, quality (défaut: config decoding_profile)")
+    parser.add_argument('--batching', type=str, default=None, choices=['fixed', 'token_budget'], help="Découpage des sous-batchs modèle : fixed (batch_size_model phrases) ou token_budget (tri par longueur, budget de tokens) (défaut: config batching_mode)")
+    parser.add_argument('--executor', type=str, default='thread', choices=EXECUTORS, help="Exécuteur du mode parallèle : thread (modèle partagé) ou process (un modèle par worker, cœurs répartis)")
+    parser.add_argument('--threads-per-worker', type=int, default=None, help='Threads PyTorch par worker en mode --executor process (par défaut: cœurs / workers)')
+    parser.add_argument('--pin-cpu', action='store_true', help="Fixer l'affinité CPU de chaque worker processus sur sa tranche de cœurs")
+    parser.add_argument('--no-translation-memory', action='store_true', help='Désactiver la mémoire de traduction (toutes les phrases passent par le modèle)')
+    parser.add_argument('--streaming', action='store_true', help='Traduire tous les lots à traiter comme un flux continu de phrases (lecture, traduction et écriture en parallèle)')
+    parser.add_argument('--max-tokens', type=int, default=None, help='Budget de tokens paddés par sous-batch en mode token_budget (défaut: config max_batch_tokens)')
+    parser.add_argument('--where', type=str, default=None, help="Filtre de lignes : seules les phrases qui le vérifient sont traduites (ex: \"has_negation and nb_words < 12\") ; lots partiels remis en attente")
+
+def add_daemon_argument(parser):
+    parser.add_argument('--daemon', action='store_true', help="Mode démon : logs dans le fichier uniquement, sans recopie sur la console (défaut: config logging.stdout_mirror)")
 
+def keep_top_level_values(parser, subparser):
+    """Options aussi acceptées avant la sous-commande : sans défaut dans la sous-commande, pour ne pas écraser la valeur déjà lue."""
+    top_level = {action.dest for action in parser._actions if action.dest != 'help'}
+    for action in subparser._actions:
+        if action.dest in top_level:
+            action.default = argparse.SUPPRESS
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pipeline de traduction modulaire (sans sous-commande : génération puis traduction)")
+    add_generation_arguments(parser)
+    add_translation_arguments(parser)
+    add_daemon_argument(parser)
+    subparsers = parser.add_subparsers(dest='command', metavar='{generate,translate,status,report,compare}')
+    generate_parser = subparsers.add_parser('generate', help='Générer les lots EN')
+    add_generation_arguments(generate_parser)
+    add_daemon_argument(generate_parser)
+    translate_parser = subparsers.add_parser('translate', help='Traduire les lots à traiter')
+    translate_parser.add_argument('--num-batches', type=int, default=None, help='Nombre de lots à traiter (None = tous)')
+    add_translation_arguments(translate_parser)
+    add_daemon_argument(translate_parser)
+    status_parser = subparsers.add_parser('status', help='Décompte des lots par statut')
+    status_parser.add_argument('--export', action='store_true', help='Réécrire aussi batch_info.parquet depuis le store des statuts')
+    subparsers.add_parser('report', help='Rapport des lots FR (CSV et histogramme des statuts)')
+    compare_parser = subparsers.add_parser('compare', help='Comparer les modèles de la config sur les mêmes lots (traductions et débits côte à côte)')
+    compare_parser.add_argument('--models', nargs='+', default=None, help='Noms des modèles à comparer (défaut: tous ceux de la config ; le premier sert de référence)')
+    compare_parser.add_argument('--batches', nargs='+', default=None, help='Lots EN à comparer (ex: en_batch_0001.parquet ; défaut: tous)')
+    compare_parser.add_argument('--num-batches', type=int, default=None, help='Nombre de lots à comparer (None = tous)')
+    compare_parser.add_argument('--batch-size-model', type=int, default=32, help='Taille des batchs envoyés aux modèles')
+    compare_parser.add_argument('--batching', type=str, default=None, choices=['fixed', 'token_budget'], help='Découpage des sous-batchs modèle (défaut: config batching_mode)')
+    compare_parser.add_argument('--max-tokens', type=int, default=None, help='Budget de tokens paddés par sous-batch en mode token_budget (défaut: config max_batch_tokens)')
+    compare_parser.add_argument('--fp16', action='store_true', help='Half-precision (GPU uniquement)')
+    compare_parser.add_argument('--quantize', type=str, default=None, choices=['int8'], help='Quantification dynamique (CPU) (défaut: config quantize)')
+    compare_parser.add_argument('--decoding-profile', type=str, default=None, help='Profil de décodage (défaut: config decoding_profile)')
+    compare_parser.add_argument('--translation-memory', action='store_true', help='Utiliser la mémoire de traduction (les débits ne mesurent alors plus les modèles seuls)')
+    add_daemon_argument(compare_parser)
+    # Sous-commandes : une option donnée avant elles (--num-batches 3 translate) est conservée
+    for subparser in subparsers.choices.values():
+        keep_top_level_values(parser, subparser)
+    return parser
+
+def resolve_workers(args):
+    """Calcul automatique du découpage workers x threads si non spécifié."""
+    from pipeline.parallel import compute_optimal_workers, get_available_cpus
     max_workers = args.max_workers
+    threads_per_worker = args.threads_per_worker
     if max_workers is None:
-        max_workers = compute_optimal_workers(args.num_batches)
-        print(f"[AUTO] Nombre optimal de workers détecté : {max_workers}")
+        max_workers, auto_threads = compute_optimal_workers(args.num_batches, args.executor, threads_per_worker)
+        threads_per_worker = threads_per_worker or auto_threads
+        print(f"[AUTO] Nombre optimal de workers détecté : {max_workers}" + (f" x {threads_per_worker} thread(s)" if threads_per_worker else ""))
+    elif args.executor == 'process' and threads_per_worker is None:
+        threads_per_worker = max(1, len(get_available_cpus()) // max_workers)
+    return max_workers, threads_per_worker
 
-    try:
-        main(
-            parallel=args.parallel,
-            max_workers=max_workers,
-            force_rebuild=args.force_rebuild,
-            batch_size=args.batch_size,
-            num_batches=args.num_batches,
-            stop_after=args.stop_after,
-            batch_size_model=args.batch_size_model,
-            monitoring_frequency=args.monitoring_frequency,
-            alert_ram=args.alert_ram,
-            alert_gpu=args.alert_gpu,
-            alert_time=args.alert_time,
-            fp16=args.fp16
+def translation_kwargs(args):
+    max_workers, threads_per_worker = resolve_workers(args)
+    return dict(
+        parallel=args.parallel,
+        max_workers=max_workers,
+        num_batches=args.num_batches,
+        stop_after=args.stop_after,
+        batch_size_model=args.batch_size_model,
+        monitoring_frequency=args.monitoring_frequency,
+        alert_ram=args.alert_ram,
+        alert_gpu=args.alert_gpu,
+        alert_time=args.alert_time,
+        fp16=args.fp16,
+        batching=args.batching,
+        max_tokens=args.max_tokens,
+        streaming=args.streaming,
+        executor=args.executor,
+        threads_per_worker=threads_per_worker,
+        pin_cpu=args.pin_cpu,
+        translation_memory=not args.no_translation_memory,
+        quantize=args.quantize,
+        decoding_profile=args.decoding_profile,
+        row_filter=args.where
+    )
+
+def show_status(export=False):
+    """Décompte des lots par statut, lu dans le store SQLite (aucune étape de la pipeline importée)."""
+    from utils.status_store import get_status_store
+    meta_path = os.path.join(get_abs_path_from_config(load_config(), 'meta_dir'), 'batch_info.parquet')
+    store = get_status_store(meta_path)
+    counts = store.count_by_status()
+    for status, n in sorted(counts.items()):
+        print(f"{status} : {n}")
+    print(f"total : {sum(counts.values())}")
+    if export:
+        print(f"Export : {store.export_parquet()}")
+    return counts
+
+def run_command(args):
+    if args.command == 'status':
+        return show_status(export=args.export)
+    if args.command == 'report':
+        setup_logger('logs')
+        from pipeline.reporting import generate_report
+        return generate_report()
+    if args.command == 'generate':
+        setup_logger('logs', stdout_mirror=False if args.daemon else None)
+        generate(batch_size=args.batch_size, force_rebuild=args.force_rebuild, num_batches=args.num_batches, pretokenize=args.pretokenize)
+        return None
+    if args.command == 'compare':
+        setup_logger('logs', stdout_mirror=False if args.daemon else None)
+        run_id = start_run()
+        from pipeline.model_comparison import compare_models
+        stats = compare_models(
+            model_names=args.models, batch_names=args.batches, num_batches=args.num_batches,
+            batch_size_model=args.batch_size_model, batching=args.batching, max_tokens=args.max_tokens,
+            fp16=args.fp16, quantize=args.quantize, decoding_profile=args.decoding_profile,
+            translation_memory=args.translation_memory
         )
+        end_run()
+        return stats
+    if args.command == 'translate':
+        options = translation_kwargs(args)
+        setup_logger('logs', stdout_mirror=False if args.daemon else None)
+        run_id = start_run()
+        translate(run_id=run_id, **options)
+        end_run()
+        return None
+    main(daemon=args.daemon, force_rebuild=args.force_rebuild, batch_size=args.batch_size, pretokenize=args.pretokenize, **translation_kwargs(args))
+    return None
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    try:
+        run_command(args)
     except Exception as e:
         log_error("Erreur critique dans la pipeline", exc=e)
         raise
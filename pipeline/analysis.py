@@ -1,16 +1,16 @@
 """
 Module d'analyse/statistiques pour la pipeline de traduction.
-Utilise la configuration centralisée.
+Utilise la configuration centralisée (lue à l'appel, pas à l'import).
 """
 import os
 from utils.core import log_info, log_execution_time
 from utils.config_loader import load_config, get_abs_path_from_config
 
-config = load_config()
 
-def analyze_batch(batch_name):
 @log_execution_time('Analyse lot')
-def analyze_batch(batch_name):
+def analyze_batch(batch_name, df=None):
+    """Analyse un lot (DataFrame en mémoire transmis par les étapes précédentes) et le retourne."""
+    config = load_config()
     batches_dir = get_abs_path_from_config(config, 'batches_dir')
     analysis_dir = get_abs_path_from_config(config, 'analysis_dir')
     batch_path = os.path.join(batches_dir, batch_name)
@@ -18,4 +18,4 @@ def analyze_batch(batch_name):
     # ... logique d'analyse à implémenter ...
     # Exemple d'utilisation de analysis_dir :
     # output_path = os.path.join(analysis_dir, f"analysis_{batch_name}")
-    return True
+    return df
@@ -0,0 +1,105 @@
+"""
+Moteurs d'inférence des modèles de traduction.
+Le moteur est choisi par modèle dans config.yaml (clé `backend`, sinon déduit de `type`) :
+- torch : transformers.MarianMTModel.generate (référence)
+- onnx : encodeur/décodeur exportés en ONNX avec cache des past-key-values, exécutés sur CPU
+  par onnxruntime (dépendance optionnelle : pip install "optimum[onnxruntime]")
+
+Chaque moteur fournit un chargeur (model_path, device, precision, model_name) -> (tokenizer, model)
+utilisé par le pool de modèles ; le modèle retourné expose generate(**inputs) comme MarianMTModel.
+"""
+import os
+import time
+from utils.core import log_info, log_error, ensure_dir_exists
+
+BACKENDS = ['torch', 'onnx']
+DEFAULT_BACKEND_BY_TYPE = {'marian': 'torch'}
+ONNX_EXPORT_DIR = 'onnx'
+ONNX_REQUIRED_FILES = ['encoder_model.onnx', 'decoder_model.onnx', 'decoder_with_past_model.onnx']
+
+
+def get_backend(model_info):
+    """Moteur d'inférence d'un modèle de la config : `backend`, sinon moteur par défaut de son `type`."""
+    backend = model_info.get('backend') or DEFAULT_BACKEND_BY_TYPE.get(model_info.get('type'), 'torch')
+    if backend not in BACKENDS:
+        raise ValueError(f"Moteur d'inférence inconnu pour {model_info['name']} : {backend} (attendu : {', '.join(BACKENDS)})")
+    return backend
+
+
+def get_backend_loader(backend):
+    """Chargeur (model_path, device, precision, model_name) -> (tokenizer, model) d'un moteur."""
+    if backend == 'torch':
+        from pipeline.model_pool import load_marian_model
+        return load_marian_model
+    if backend == 'onnx':
+        return load_onnx_marian_model
+    raise ValueError(f"Moteur d'inférence inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+
+
+# --- Moteur ONNX Runtime ---
+def get_onnx_export_dir(model_path):
+    """Dossier de l'export ONNX, à côté des fichiers du snapshot."""
+    return os.path.join(model_path, ONNX_EXPORT_DIR)
+
+
+def export_onnx_model(model_path):
+    """
+    Exporte le modèle en ONNX (encodeur, décodeur, décodeur avec past-key-values) si l'export
+    en cache est absent ou plus ancien que les poids du snapshot. Retourne le dossier de l'export.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from pipeline.model_pool import find_model_file, is_cache_up_to_date
+    export_dir = get_onnx_export_dir(model_path)
+    weights_path = find_model_file(model_path)
+    if all(is_cache_up_to_date(os.path.join(export_dir, f), weights_path) for f in ONNX_REQUIRED_FILES):
+        return export_dir
+    t0 = time.perf_counter()
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_path, export=True, use_cache=True)
+    # Écriture dans un dossier temporaire puis remplacement : pas d'export partiel en cas d'arrêt
+    tmp_dir = export_dir + f'.tmp{os.getpid()}'
+    ensure_dir_exists(tmp_dir)
+    model.save_pretrained(tmp_dir)
+    if os.path.isdir(export_dir):
+        import shutil
+        shutil.rmtree(export_dir)
+    os.replace(tmp_dir, export_dir)
+    log_info(f"Modèle exporté en ONNX en {time.perf_counter() - t0:.2f}s : {export_dir}")
+    return export_dir
+
+
+def load_onnx_marian_model(model_path, device='cpu', precision='fp32', model_name=None):
+    """Charge le tokenizer et le modèle ONNX (exporté une fois, puis lu depuis le cache). Retourne (tokenizer, model)."""
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        log_error("Le moteur onnx nécessite onnxruntime et optimum : pip install \"optimum[onnxruntime]\"", exc=e)
+        raise
+    from transformers import MarianTokenizer
+    from pipeline.model_pool import ensure_model_files
+    ensure_model_files(model_path, model_name or model_path)
+    if str(device) != 'cpu':
+        log_info(f"Moteur onnx : exécution sur CPU (device {device} ignoré).")
+    if precision != 'fp32':
+        log_info(f"Moteur onnx : précision {precision} non prise en charge, FP32 utilisé.")
+    try:
+        export_dir = export_onnx_model(model_path)
+        session_options = onnxruntime.SessionOptions()
+        # Même nombre de threads que PyTorch (réglé par worker en mode --executor process)
+        try:
+            import torch
+            session_options.intra_op_num_threads = torch.get_num_threads()
+        except ImportError:
+            pass
+        tokenizer = MarianTokenizer.from_pretrained(model_path)
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            export_dir,
+            use_cache=True,
+            provider='CPUExecutionProvider',
+            session_options=session_options
+        )
+        model.size_mb = sum(os.path.getsize(os.path.join(export_dir, f)) for f in ONNX_REQUIRED_FILES) / 1024 / 1024
+    except Exception as e:
+        log_error(f"Erreur lors du chargement du modèle ONNX : {model_path}", exc=e)
+        raise
+    return tokenizer, model
@@ -1,150 +1,209 @@
-
 import os
+import gzip
+import shutil
 import pandas as pd
 from utils.config_loader import load_config, get_abs_path_from_config
-from utils.core import ensure_dir_exists, log_info, log_error, log_execution_time
+from pipeline.negation import annotate_negation
+from utils.core import ensure_dir_exists, log_info, log_error, log_execution_time, SOURCE_EXTENSIONS, is_source_file
+
+
+def open_source_text(path):
+	"""Ouvre un fichier source en mode texte (.txt, .csv, éventuellement compressé .gz/.zst)."""
+	if path.endswith('.gz'):
+		return gzip.open(path, 'rt', encoding='utf-8')
+	if path.endswith('.zst'):
+		try:
+			import zstandard
+		except ImportError:
+			log_error("Le module 'zstandard' est requis pour lire les sources .zst.")
+			raise
+		return zstandard.open(path, 'rt', encoding='utf-8')
+	return open(path, encoding='utf-8')
+
+
+def source_stem(path):
+	"""Nom du fichier source sans extensions (negation_medical.txt.gz -> negation_medical)."""
+	name = os.path.basename(path)
+	for ext in sorted(SOURCE_EXTENSIONS, key=len, reverse=True):
+		if name.endswith(ext):
+			return name[:-len(ext)]
+	return os.path.splitext(name)[0]
+
+
+def iter_source_chunks(src_path, chunk_size):
+	"""
+	Lit un fichier source par morceaux de chunk_size lignes (DataFrames avec au moins la colonne 'en').
+	- .txt : une phrase par ligne non vide, avec line_number (rang de la phrase dans le fichier) et source_file
+	- .csv : colonnes d'origine conservées, colonne 'en' obligatoire
+	"""
+	name = os.path.basename(src_path)
+	if '.txt' in name:
+		lines = []
+		line_number = 0
+		with open_source_text(src_path) as f:
+			for line in f:
+				line = line.strip()
+				if not line:
+					continue
+				lines.append(line)
+				if len(lines) >= chunk_size:
+					yield pd.DataFrame({'en': lines, 'line_number': range(line_number + 1, line_number + len(lines) + 1), 'source_file': name})
+					line_number += len(lines)
+					lines = []
+		if lines:
+			yield pd.DataFrame({'en': lines, 'line_number': range(line_number + 1, line_number + len(lines) + 1), 'source_file': name})
+	elif '.csv' in name:
+		with open_source_text(src_path) as f:
+			for chunk in pd.read_csv(f, chunksize=chunk_size):
+				if 'en' not in chunk.columns:
+					log_error("Le CSV source doit contenir une colonne 'en'.")
+					raise ValueError("Le CSV source doit contenir une colonne 'en'.")
+				# On conserve toutes les colonnes d'origine
+				yield chunk
+	else:
+		log_error("Format de fichier source non supporté.")
+		raise ValueError("Format de fichier source non supporté.")
+
+
+def iter_source_batches(src_path, batch_size):
+	"""Regroupe les morceaux lus d'un fichier source en lots de batch_size phrases (le dernier peut être plus court)."""
+	buffer = []
+	buffered = 0
+	for chunk in iter_source_chunks(src_path, batch_size):
+		buffer.append(chunk)
+		buffered += len(chunk)
+		while buffered >= batch_size:
+			df = pd.concat(buffer, ignore_index=True)
+			yield df.iloc[:batch_size].reset_index(drop=True)
+			rest = df.iloc[batch_size:].reset_index(drop=True)
+			buffer = [rest] if len(rest) else []
+			buffered = len(rest)
+	if buffered:
+		yield pd.concat(buffer, ignore_index=True)
+
+
+def annotate_batch(batch):
+	"""Ajoute nb_words, nb_chars, negation_words, has_negation et la portée de la négation à un lot (une seule passe)."""
+	for col, values in annotate_negation(batch['en'].to_numpy()).items():
+		batch[col] = values
+	return batch
+
+
+def order_batch_columns(batch, source_cols):
+	"""Colonnes finales : id_phrase, en, line_number, has_negation, annotations, puis le reste."""
+	keep_cols = [c for c in source_cols if c not in ('source_file', 'start_idx', 'end_idx')]
+	extra_cols = ['has_negation', 'nb_words', 'nb_chars', 'negation_words', 'negation_scope', 'negation_scope_start', 'negation_scope_end']
+	extra_cols = [c for c in extra_cols if c not in keep_cols]
+	ordered_cols = []
+	for col in ['id_phrase', 'en', 'line_number', 'has_negation']:
+		if col in keep_cols:
+			ordered_cols.append(col)
+	ordered_cols += [c for c in extra_cols if c not in ordered_cols]
+	ordered_cols += [c for c in keep_cols if c not in ordered_cols]
+	return batch[ordered_cols]
+
 
 @log_execution_time('Génération lots EN')
-def generate_batches(batch_size=100, force_rebuild=False, num_batches=None):
-	# Détection de la portée de la négation (scope) : tout ce qui suit le premier mot de négation trouvé
-	def extract_scope(phrase, neg_words):
-		if not neg_words:
-			return ""
-		phrase_l = phrase.lower()
-		for neg in neg_words:
-			idx = phrase_l.find(neg)
-			if idx != -1:
-				# Prend tout ce qui suit le mot de négation (après l'espace suivant)
-				after = phrase[idx+len(neg):].lstrip()
-				return after if after else ""
-		return ""
+def generate_batches(batch_size=100, force_rebuild=False, num_batches=None, data_dir=None, batches_dir=None, meta_dir=None, pretokenize=None):
 	"""
-	Génère les lots à partir des données sources (txt/csv) dans data/raw/.
-	Chaque lot contient uniquement : id_phrase, batch_id, en
+	Génère les lots à partir de toutes les données sources dans data/raw/
+	(.txt/.csv, éventuellement compressés en .gz/.zst), en flux :
+	chaque fichier est lu par morceaux et un lot est écrit dès qu'il est plein,
+	la mémoire utilisée est donc bornée par la taille d'un lot et non par celle du corpus.
+	Les enregistrements meta sont ajoutés au fur et à mesure dans le store des statuts,
+	puis exportés dans batch_info.parquet.
 	Ne crée les lots que si aucun n'existe, sauf si force_rebuild=True.
+	Les dossiers sont ceux de la config, sauf s'ils sont passés en argument (benchmarks).
+	pretokenize (défaut : config pretokenize.at_generation) : écrit aussi les input_ids / nb_tokens
+	de chaque lot pour les tokenizers des modèles de la config (pipeline.pretokenize).
+	Layout dataset (storage.layout) : lots écrits dans un dossier de préparation puis intégrés au dataset EN
+	(un fichier par source, un row group par lot), les fichiers de préparation étant supprimés.
 	"""
+	from utils.meta_utils import register_batches, export_batch_info
+	from utils.batch_store import is_dataset_layout, get_dataset_dir, import_batch_files
 	config = load_config()
-	data_dir = get_abs_path_from_config(config, 'raw_data_dir')
-	batches_dir = get_abs_path_from_config(config, 'batches_dir')
-	meta_dir = get_abs_path_from_config(config, 'meta_dir')
+	data_dir = data_dir or get_abs_path_from_config(config, 'raw_data_dir')
+	batches_dir = batches_dir or get_abs_path_from_config(config, 'batches_dir')
+	meta_dir = meta_dir or get_abs_path_from_config(config, 'meta_dir')
 	ensure_dir_exists(batches_dir)
 	ensure_dir_exists(meta_dir)
 
+	dataset = is_dataset_layout(config)
+	dataset_dirs = [get_dataset_dir(config, side, batches_dir) for side in ('en', 'fr')]
+
 	# Vérifier s'il existe déjà des lots
 	existing_batches = [f for f in os.listdir(batches_dir) if f.endswith('.parquet')]
-	if existing_batches and not force_rebuild:
+	if (existing_batches or (dataset and os.path.isdir(dataset_dirs[0]) and os.listdir(dataset_dirs[0]))) and not force_rebuild:
 		log_info(f"Lots déjà présents dans {batches_dir}, génération ignorée.")
 		return
 	if force_rebuild:
 		for f in existing_batches:
 			os.remove(os.path.join(batches_dir, f))
+		for path in dataset_dirs:
+			shutil.rmtree(path, ignore_errors=True)
 		log_info("Lots existants supprimés (force_rebuild=True).")
+	# Layout dataset : lots écrits un par un dans le dossier de préparation, intégrés au dataset en fin de génération
+	output_dir = os.path.join(os.path.dirname(dataset_dirs[0]), '_staging') if dataset else batches_dir
+	ensure_dir_exists(output_dir)
+	from pipeline.pretokenize import get_pretokenize_config, load_pretokenizers
+	pretokenize_cfg = get_pretokenize_config(config)
+	if force_rebuild:
+		# Tokens des anciens lots : plus aucun lot ne leur correspond
+		shutil.rmtree(os.path.join(batches_dir, pretokenize_cfg['dirname']), ignore_errors=True)
+	if pretokenize is None:
+		pretokenize = pretokenize_cfg['enabled'] and pretokenize_cfg['at_generation']
+	pretokenizers = load_pretokenizers(config, batches_dir) if pretokenize else []
 
-	# Charger les phrases sources (on prend le premier fichier .txt trouvé)
-	files = [f for f in os.listdir(data_dir) if f.endswith('.txt') or f.endswith('.csv')]
+	# Tous les fichiers sources, dans l'ordre alphabétique
+	files = sorted(f for f in os.listdir(data_dir) if is_source_file(f))
 	if not files:
 		log_error(f"Aucun fichier source trouvé dans {data_dir}")
 		raise FileNotFoundError(f"Aucun fichier source trouvé dans {data_dir}")
-	src_path = os.path.join(data_dir, files[0])
-	if src_path.endswith('.txt'):
-		# On génère id_phrase, line_number, source_file
-		with open(src_path, encoding='utf-8') as f:
-			lines = [line.strip() for line in f if line.strip()]
-		df = pd.DataFrame({
-			'id_phrase': range(1, len(lines)+1),
-			'en': lines,
-			'line_number': range(1, len(lines)+1),
-			'source_file': os.path.basename(src_path)
-		})
-	elif src_path.endswith('.csv'):
-		df = pd.read_csv(src_path)
-		if 'en' not in df.columns:
-			log_error("Le CSV source doit contenir une colonne 'en'.")
-			raise ValueError("Le CSV source doit contenir une colonne 'en'.")
-		# On conserve toutes les colonnes d'origine
-	else:
-		log_error("Format de fichier source non supporté.")
-		raise ValueError("Format de fichier source non supporté.")
 
-	# Génération des lots
-	n = len(df)
-	meta_records = []
-	negation_keywords = [
-		'not', "n't", 'no', 'never', 'none', 'neither', 'nor', 'cannot', 'without', 'denies', 'deny', 'denied', 'refute', 'refutes', 'refuted', 'absence', 'lacks', 'lack', 'negative', 'negatives', 'negation', 'exclude', 'excluded', 'excludes', 'excluding'
-	]
+	meta_path = os.path.join(meta_dir, 'batch_info.parquet')
+	register_batches(meta_path, [], replace=True)
 	global_start = 1
-	batch_ranges = list(range(0, n, batch_size))
-	if num_batches is not None:
-		batch_ranges = batch_ranges[:num_batches]
-	for idx, start in enumerate(batch_ranges):
-		end = min(start + batch_size, n)
-		batch = df.iloc[start:end].copy()
-		batch['start_idx'] = global_start
-		batch['end_idx'] = global_start + len(batch) - 1
-		batch['nb_words'] = batch['en'].apply(lambda x: len(str(x).split()))
-		batch['nb_chars'] = batch['en'].apply(lambda x: len(str(x)))
-		# Détection négation simple
-		def detect_negation(phrase):
-			words = str(phrase).lower().split()
-			found = [w for w in negation_keywords if w in words]
-			return found
-		import numpy as np
-		def to_pylist(val):
-			if isinstance(val, list):
-				return val
-			if isinstance(val, np.ndarray):
-				return val.tolist()
-			return list(val)
-		batch['negation_words'] = batch['en'].apply(lambda x: to_pylist(detect_negation(x)))
-		batch['has_negation'] = batch['negation_words'].apply(lambda neg_list: len(neg_list) > 0)
-		def extract_scope_indices(phrase, neg_words):
-			if not neg_words:
-				return (None, None, "")
-			phrase_l = phrase.lower()
-			for neg in neg_words:
-				idx = phrase_l.find(neg)
-				if idx != -1:
-					start = idx + len(neg)
-					after = phrase[start:].lstrip()
-					nb_strip = len(phrase[start:]) - len(after)
-					scope_start = start + nb_strip
-					scope_end = len(phrase)
-					return (scope_start, scope_end, after if after else "")
-			return (None, None, "")
-		scope_info = [extract_scope_indices(phrase, negs) for phrase, negs in zip(batch['en'], batch['negation_words'])]
-		batch['negation_scope_start'] = [s[0] for s in scope_info]
-		batch['negation_scope_end'] = [s[1] for s in scope_info]
-		batch['negation_scope'] = [s[2] for s in scope_info]
-		# Colonnes finales : id_phrase, en, line_number, has_negation, puis le reste
-		keep_cols = [c for c in df.columns if c not in ('source_file', 'start_idx', 'end_idx')]
-		extra_cols = ['has_negation', 'nb_words', 'nb_chars', 'negation_words', 'negation_scope', 'negation_scope_start', 'negation_scope_end']
-		extra_cols = [c for c in extra_cols if c not in keep_cols]
-		ordered_cols = []
-		for col in ['id_phrase', 'en', 'line_number', 'has_negation']:
-			if col in keep_cols:
-				ordered_cols.append(col)
-		ordered_cols += [c for c in extra_cols if c not in ordered_cols]
-		ordered_cols += [c for c in keep_cols if c not in ordered_cols]
-		batch = batch[ordered_cols]
-		# Ajoute le nom du fichier source dans le nom du batch
-		src_file = os.path.splitext(os.path.basename(src_path))[0]
-		batch_filename = f"en_batch_{src_file}_{global_start:05d}_{global_start+len(batch)-1:05d}.parquet"
-		batch_path = os.path.join(batches_dir, batch_filename)
-		batch.to_parquet(batch_path, index=False)
-		log_info(f"Lot généré : {batch_path} ({len(batch)} phrases)")
-		meta_records.append({
-			'batch_id': batch_filename.replace('.parquet',''),
-			'batch_file': batch_filename,
-			'date_creation': pd.Timestamp.now().isoformat(),
-			'nb_phrases': len(batch),
-			'start_idx': global_start,
-			'end_idx': global_start+len(batch)-1,
-			'status': 'en_attente',
-			'commentaire': ''
-		})
-		global_start += len(batch)
+	n_batches = 0
+	for src_file_name in files:
+		if num_batches is not None and n_batches >= num_batches:
+			break
+		src_path = os.path.join(data_dir, src_file_name)
+		src_file = source_stem(src_path)
+		log_info(f"Lecture en flux de la source : {src_path}")
+		for batch in iter_source_batches(src_path, batch_size):
+			if num_batches is not None and n_batches >= num_batches:
+				break
+			source_cols = list(batch.columns)
+			if 'id_phrase' not in batch.columns:
+				batch.insert(0, 'id_phrase', range(global_start, global_start + len(batch)))
+				source_cols.insert(0, 'id_phrase')
+			batch['start_idx'] = global_start
+			batch['end_idx'] = global_start + len(batch) - 1
+			batch = order_batch_columns(annotate_batch(batch), source_cols)
+			# Ajoute le nom du fichier source dans le nom du batch
+			batch_filename = f"en_batch_{src_file}_{global_start:05d}_{global_start+len(batch)-1:05d}.parquet"
+			batch_path = os.path.join(output_dir, batch_filename)
+			batch.to_parquet(batch_path, index=False)
+			log_info(f"Lot généré : {batch_path} ({len(batch)} phrases)")
+			if pretokenizers:
+				from pipeline.pretokenize import pretokenize_batch
+				pretokenize_batch(batch_path, pretokenizers, sentences=batch['en'].astype(str).str.strip().tolist())
+			register_batches(meta_path, [{
+				'batch_id': batch_filename.replace('.parquet',''),
+				'batch_file': batch_filename,
+				'date_creation': pd.Timestamp.now().isoformat(),
+				'nb_phrases': len(batch),
+				'start_idx': global_start,
+				'end_idx': global_start+len(batch)-1,
+				'status': 'en_attente',
+				'commentaire': ''
+			}], replace=False)
+			global_start += len(batch)
+			n_batches += 1
+	if dataset:
+		staged = sorted(os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.endswith('.parquet'))
+		import_batch_files(staged, config, remove=True, dataset_root=os.path.dirname(dataset_dirs[0]))
+		shutil.rmtree(output_dir, ignore_errors=True)
 	# Sauvegarde du meta
-	meta_path = os.path.join(meta_dir, 'batch_info.parquet')
-	meta_df = pd.DataFrame(meta_records)
-	meta_df.to_parquet(meta_path, index=False)
-	log_info(f"Meta batch_info.parquet généré : {meta_path}")
+	export_batch_info(meta_path)
+	log_info(f"Meta batch_info.parquet généré : {meta_path} ({n_batches} lots, {global_start - 1} phrases)")
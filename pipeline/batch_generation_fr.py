@@ -2,16 +2,26 @@
 Génération des lots pour la traduction (fichiers fr_batch_XXXX.parquet et meta fr_batch_info.parquet)
 """
 import os
+import json
 import pandas as pd
 from utils.core import log_info, ensure_dir_exists, log_execution_time
+from utils.batch_store import read_batch_columns, write_batch
 from utils.config_loader import load_config, get_abs_path_from_config
+from utils.meta_utils import append_fr_meta_record
+
+# Colonnes conservées dans le batch FR
+FR_BATCH_COLUMNS = ['id_phrase', 'fr', 'nb_words', 'line_number']
+# Colonnes reprises du batch EN quand elles y figurent (nb_tokens : lot pré-tokenisé)
+FR_OPTIONAL_COLUMNS = ['nb_tokens']
 
 @log_execution_time('Génération lots FR')
-def generate_fr_batch(en_batch_path, fr_sentences):
+def generate_fr_batch(en_batch_path, fr_sentences, df=None, decoding_profile=None, decoding_params=None):
     """
     Crée un fichier batch de traduction à partir d'un batch source et d'une liste de phrases traduites.
     - en_batch_path : chemin du batch source (en_batch_XXXX.parquet)
-    - fr_sentences : liste de phrases traduites (même ordre)
+    - fr_sentences : liste de phrases traduites (même ordre) ; None pour une phrase en échec
+    - df : batch source déjà en mémoire (sinon relu depuis en_batch_path, colonnes utiles uniquement)
+    - decoding_profile / decoding_params : profil de décodage utilisé, enregistré dans le meta FR
     """
     config = load_config()
     batches_dir = get_abs_path_from_config(config, 'batches_dir')
@@ -20,7 +30,8 @@ def generate_fr_batch(en_batch_path, fr_sentences):
     ensure_dir_exists(meta_dir)
 
     # Charger le batch source
-    df = pd.read_parquet(en_batch_path)
+    if df is None:
+        df = read_batch_columns(en_batch_path, [c for c in FR_BATCH_COLUMNS if c != 'fr'], config)
     if len(df) != len(fr_sentences):
         raise ValueError("Le nombre de traductions ne correspond pas au nombre de phrases du batch source.")
 
@@ -28,7 +39,7 @@ def generate_fr_batch(en_batch_path, fr_sentences):
     df = df.copy()
     df['fr'] = fr_sentences
     # Ne conserve que les colonnes demandées pour le batch FR
-    keep_cols = ['id_phrase', 'fr', 'nb_words', 'line_number']
+    keep_cols = FR_BATCH_COLUMNS + [c for c in FR_OPTIONAL_COLUMNS if c in df.columns]
     # Détermine le nom du fichier batch FR
     en_batch_name = os.path.basename(en_batch_path)
     if en_batch_name.startswith('en_batch_') and en_batch_name.endswith('.parquet'):
@@ -36,24 +47,25 @@ def generate_fr_batch(en_batch_path, fr_sentences):
     else:
         fr_batch_name = 'fr_' + en_batch_name
     fr_batch_path = os.path.join(batches_dir, fr_batch_name)
-    df[keep_cols].to_parquet(fr_batch_path, index=False)
-    log_info(f"Lot de traduction généré : {fr_batch_path} ({len(df)} phrases)")
+    # Fichier du lot, ou fragment de la partition FR du dataset (storage.layout: dataset)
+    written_path = write_batch(fr_batch_path, df[keep_cols], config)
+    log_info(f"Lot de traduction généré : {written_path} ({len(df)} phrases)")
 
     # Création du meta record
+    nb_echecs = int(df['fr'].isna().sum())
     meta_path = os.path.join(meta_dir, 'fr_batch_info.parquet')
     meta_record = {
         'batch_id': fr_batch_name.replace('.parquet',''),
         'fr_batch_path': fr_batch_path,
         'date_creation': pd.Timestamp.now().isoformat(),
         'nb_phrases': len(df),
+        'nb_echecs': nb_echecs,
+        'decoding_profile': decoding_profile or '',
+        'decoding_params': json.dumps(decoding_params, sort_keys=True) if decoding_params else '',
         'status': 'en_attente',
-        'commentaire': ''
+        'commentaire': f"{nb_echecs} phrase(s) en échec (meta/failed_sentences)" if nb_echecs else ''
     }
-    if os.path.exists(meta_path):
-        meta_df = pd.read_parquet(meta_path)
-        meta_df = pd.concat([meta_df, pd.DataFrame([meta_record])], ignore_index=True)
-    else:
-        meta_df = pd.DataFrame([meta_record])
-    meta_df.to_parquet(meta_path, index=False)
-    log_info(f"Meta batch_info_fr.parquet mis à jour : {meta_path}")
+    # Ajout seul : un fragment par lot, fusionné dans fr_batch_info.parquet par compact_fr_batch_info
+    fragment_path = append_fr_meta_record(meta_dir, meta_record)
+    log_info(f"Meta FR ajouté : {fragment_path} (vue consolidée : {meta_path})")
     return fr_batch_path
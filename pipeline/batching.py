@@ -0,0 +1,137 @@
+"""
+Découpage des phrases en sous-batchs envoyés au modèle.
+- fixed : tranches de batch_size_model phrases dans l'ordre du fichier
+- token_budget : phrases triées par longueur, sous-batchs bornés par un budget de tokens paddés
+  (et à batch_size_model phrases au plus)
+Taille adaptative (AdaptiveBatchController) : réduite après une saturation mémoire, rétablie ensuite.
+"""
+import math
+import threading
+from utils.core import log_info
+
+BATCHING_MODES = ['fixed', 'token_budget']
+
+
+def estimate_token_lengths(sentences, nb_words=None, nb_chars=None):
+    """
+    Estime le nombre de tokens de chaque phrase (sans tokenizer).
+    Utilise nb_words/nb_chars du lot s'ils sont fournis, sinon les recalcule.
+    Estimation : max(nb_chars / 4, nb_words) + 1 token de fin de séquence.
+    """
+    if nb_chars is None:
+        nb_chars = [len(str(s)) for s in sentences]
+    if nb_words is None:
+        nb_words = [len(str(s).split()) for s in sentences]
+    return [max(math.ceil(int(c) / 4), int(w)) + 1 for c, w in zip(nb_chars, nb_words)]
+
+
+def build_fixed_batches(n, batch_size_model):
+    """Tranches contiguës de batch_size_model indices."""
+    return [list(range(i, min(i + batch_size_model, n))) for i in range(0, n, batch_size_model)]
+
+
+def build_token_budget_batches(lengths, max_tokens, max_sentences=None):
+    """
+    Trie les phrases par longueur et regroupe les indices en sous-batchs dont le
+    nombre de tokens paddés (nb phrases x longueur max) reste sous max_tokens,
+    avec au plus max_sentences phrases par sous-batch.
+    Une phrase plus longue que le budget forme un sous-batch à elle seule.
+    Retourne une liste de listes d'indices (dans l'ordre d'origine à restaurer par l'appelant).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    current_max = 0
+    for i in order:
+        new_max = max(current_max, lengths[i])
+        too_many = max_sentences is not None and len(current) >= max_sentences
+        if current and (new_max * (len(current) + 1) > max_tokens or too_many):
+            batches.append(current)
+            current = []
+            new_max = lengths[i]
+        current.append(i)
+        current_max = new_max
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batches(n, mode='fixed', batch_size_model=32, lengths=None, max_tokens=None):
+    """Construit les sous-batchs (listes d'indices) selon le mode demandé."""
+    if mode == 'fixed':
+        return build_fixed_batches(n, batch_size_model)
+    if mode == 'token_budget':
+        if lengths is None or max_tokens is None:
+            raise ValueError("Le mode 'token_budget' nécessite les longueurs des phrases et max_tokens.")
+        return build_token_budget_batches(lengths, max_tokens, batch_size_model)
+    raise ValueError(f"Mode de batching inconnu : {mode} (attendu : {', '.join(BATCHING_MODES)})")
+
+
+def padding_stats(attention_mask):
+    """Retourne (tokens réels, tokens paddés) d'un sous-batch tokenisé."""
+    return int(attention_mask.sum()), int(attention_mask.numel())
+
+
+class AdaptiveBatchController:
+    """
+    Taille adaptative des sous-batchs pour tout le processus.
+    Après une saturation mémoire (OOM), le facteur appliqué à batch_size_model / max_tokens est divisé par deux ;
+    il est doublé à nouveau après grow_after sous-batchs réussis consécutifs avec une marge mémoire suffisante
+    (mémoire utilisée sous headroom_pct %), sans dépasser les valeurs demandées.
+    """
+
+    def __init__(self, min_factor=1 / 64, grow_after=20, headroom_pct=70):
+        self.min_factor = min_factor
+        self.grow_after = grow_after
+        self.headroom_pct = headroom_pct
+        self.factor = 1.0
+        self.successes = 0
+        self.ooms = 0
+        self._lock = threading.Lock()
+
+    def limits(self, batch_size_model, max_tokens=None):
+        """Retourne (batch_size_model, max_tokens) effectifs."""
+        with self._lock:
+            factor = self.factor
+        return max(1, int(batch_size_model * factor)), (max(1, int(max_tokens * factor)) if max_tokens else max_tokens)
+
+    def record_oom(self):
+        with self._lock:
+            self.ooms += 1
+            self.successes = 0
+            if self.factor > self.min_factor:
+                self.factor = max(self.min_factor, self.factor / 2)
+                log_info(f"[ADAPTATIF] Saturation mémoire : taille des sous-batchs réduite à {self.factor:.0%}")
+
+    def record_success(self, memory_pct=None):
+        with self._lock:
+            if self.factor >= 1.0:
+                return
+            if memory_pct is not None and memory_pct > self.headroom_pct:
+                self.successes = 0
+                return
+            self.successes += 1
+            if self.successes >= self.grow_after:
+                self.factor = min(1.0, self.factor * 2)
+                self.successes = 0
+                log_info(f"[ADAPTATIF] Marge mémoire retrouvée : taille des sous-batchs remontée à {self.factor:.0%}")
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_batch_controller(config):
+    """Contrôleur adaptatif du processus (section `adaptive_batching` de la config), ou None s'il est désactivé."""
+    global _controller
+    cfg = config.get('adaptive_batching') or {}
+    if not cfg.get('enabled', True):
+        return None
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdaptiveBatchController(
+                min_factor=cfg.get('min_factor', 1 / 64),
+                grow_after=cfg.get('grow_after', 20),
+                headroom_pct=cfg.get('headroom_pct', 70),
+            )
+        return _controller
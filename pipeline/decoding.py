@@ -0,0 +1,46 @@
+"""
+Profils de décodage passés à model.generate (section `decoding_profiles` de config.yaml).
+Chaque profil fixe :
+- num_beams : 1 = décodage glouton (greedy), >1 = recherche en faisceau
+- max_new_tokens_ratio / max_new_tokens_offset : limite de tokens générés relative à la longueur
+  de l'entrée (ratio x tokens de la plus longue phrase du sous-batch + offset), plafonnée par max_length
+- early_stopping, length_penalty : paramètres de la recherche en faisceau
+"""
+
+DEFAULT_PROFILE = 'quality'
+
+# Profils par défaut, complétés ou remplacés par ceux de la config
+DEFAULT_PROFILES = {
+    'fast': {'num_beams': 1, 'max_new_tokens_ratio': 1.5, 'max_new_tokens_offset': 10, 'early_stopping': False, 'length_penalty': 1.0},
+    'balanced': {'num_beams': 2, 'max_new_tokens_ratio': 2.0, 'max_new_tokens_offset': 10, 'early_stopping': True, 'length_penalty': 1.0},
+    'quality': {'num_beams': 4, 'max_new_tokens_ratio': 2.0, 'max_new_tokens_offset': 20, 'early_stopping': True, 'length_penalty': 1.0},
+}
+
+
+def get_decoding_profile(config, name=None):
+    """Retourne (nom, paramètres) du profil demandé, sinon de `decoding_profile` dans la config."""
+    profiles = dict(DEFAULT_PROFILES)
+    profiles.update(config.get('decoding_profiles') or {})
+    name = name or config.get('decoding_profile') or DEFAULT_PROFILE
+    if name not in profiles:
+        raise ValueError(f"Profil de décodage inconnu : {name} (attendu : {', '.join(sorted(profiles))})")
+    profile = dict(DEFAULT_PROFILES.get(name, DEFAULT_PROFILES[DEFAULT_PROFILE]))
+    profile.update(profiles[name])
+    profile['max_length'] = config.get('max_length', 256)
+    return name, profile
+
+
+def build_generate_kwargs(profile, input_length):
+    """Arguments de model.generate pour un sous-batch dont la plus longue entrée fait input_length tokens."""
+    if not profile:
+        return {}
+    max_new_tokens = int(profile['max_new_tokens_ratio'] * input_length) + int(profile['max_new_tokens_offset'])
+    kwargs = {
+        'num_beams': int(profile['num_beams']),
+        'max_new_tokens': max(1, min(max_new_tokens, int(profile['max_length']))),
+        'do_sample': False,
+    }
+    if kwargs['num_beams'] > 1:
+        kwargs['early_stopping'] = bool(profile['early_stopping'])
+        kwargs['length_penalty'] = float(profile['length_penalty'])
+    return kwargs
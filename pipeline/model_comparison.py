@@ -0,0 +1,265 @@
+"""
+Mode comparaison : tous les modèles de la config (ou une sélection) sur les mêmes lots EN, en un seul passage.
+- modèles répartis en vagues dont la mémoire estimée (poids sur disque) tient dans le budget
+  (comparison.max_memory_mb, sinon model_pool.max_memory_mb, sinon la moitié de la RAM disponible) :
+  les modèles d'une vague sont résidents ensemble, puis évincés avant la vague suivante ;
+- lots traités par tranches de comparison.chunk_batches, vagues dans chaque tranche : un lot est lu et
+  prétraité une fois par vague, tokenisé une fois par tokenizer (modèles partageant les fichiers du
+  tokenizer : mêmes input_ids, fichier annexe de pipeline.pretokenize relu par les vagues suivantes),
+  écrit dès la fin de la vague puis libéré (mémoire bornée par un lot, quel que soit le corpus) ;
+- sorties : <batches_dir>/<comparison.dirname>/<lot EN>.parquet (id_phrase, en, une colonne fr_<modèle> par modèle)
+  et summary.csv (débit par modèle côte à côte, part des traductions identiques au premier modèle).
+Les statuts des lots et les lots FR de la pipeline ne sont pas modifiés.
+
+    python main_pipeline.py compare [--models A B] [--num-batches 2]
+"""
+import os
+import re
+import time
+from utils.core import log_info, log_error, ensure_dir_exists
+from utils.config_loader import load_config, get_abs_path_from_config
+from pipeline.model_pool import get_model_pool, find_model_file
+from pipeline.translation import get_model_path, get_engine, translate_sentences
+from pipeline.decoding import get_decoding_profile
+
+
+def get_comparison_config(config):
+    return dict({'dirname': 'comparison', 'max_memory_mb': None, 'chunk_batches': 16}, **(config.get('comparison') or {}))
+
+
+def model_column(model_info):
+    """Colonne des traductions d'un modèle : fr_<nom normalisé> (ex. fr_helsinki_nlp_opus_mt_en_fr)."""
+    return 'fr_' + re.sub(r'[^0-9a-z]+', '_', model_info['name'].lower()).strip('_')
+
+
+def select_models(config, model_names=None):
+    """Modèles à comparer (ordre de la config ; le premier sert de référence)."""
+    models = config['models']
+    if model_names:
+        unknown = set(model_names) - {m['name'] for m in models}
+        if unknown:
+            raise ValueError(f"Modèle(s) absent(s) de la config : {sorted(unknown)}")
+        models = [m for m in models if m['name'] in model_names]
+    columns = [model_column(m) for m in models]
+    if len(set(columns)) != len(columns):
+        raise ValueError(f"Noms de modèles en double après normalisation : {columns}")
+    return models
+
+
+def estimate_model_memory_mb(model_path, precision='fp32'):
+    """Mémoire estimée d'un modèle avant chargement : taille du fichier de poids (divisée par deux en FP16)."""
+    weights = find_model_file(model_path)
+    if weights is None:
+        return 0.0
+    size_mb = os.path.getsize(weights) / 1024 / 1024
+    return size_mb / 2 if precision == 'fp16' else size_mb
+
+
+def get_memory_budget_mb(config):
+    budget = get_comparison_config(config)['max_memory_mb'] or (config.get('model_pool') or {}).get('max_memory_mb')
+    if budget:
+        return budget
+    import psutil
+    return psutil.virtual_memory().available / 1024 / 1024 / 2
+
+
+def plan_waves(sizes_mb, budget_mb=None):
+    """
+    Répartit les modèles (dans l'ordre) en vagues dont la somme des tailles tient dans budget_mb.
+    Un modèle plus gros que le budget forme sa propre vague. Retourne des listes d'indices.
+    """
+    waves, current, used = [], [], 0.0
+    for i, size in enumerate(sizes_mb):
+        if current and budget_mb is not None and used + size > budget_mb:
+            waves.append(current)
+            current, used = [], 0.0
+        current.append(i)
+        used += size
+    if current:
+        waves.append(current)
+    return waves
+
+
+def get_shared_token_ids(cache, batch_path, sentences, tokenizer, model_path, config):
+    """
+    (input_ids, nb_tokens) d'un lot pour le tokenizer d'un modèle, calculés une fois par empreinte de tokenizer :
+    cache mémoire du job, sinon fichier annexe (pipeline.pretokenize), sinon tokenisation.
+    """
+    from pipeline.pretokenize import tokenizer_hash, get_batch_token_ids, tokenize_sentences
+    try:
+        key = (batch_path, tokenizer_hash(model_path))
+    except FileNotFoundError:
+        key = (batch_path, os.path.abspath(model_path))
+    if key not in cache:
+        token_ids = get_batch_token_ids(batch_path, sentences, tokenizer, model_path, config)
+        if token_ids is None:
+            input_ids = tokenize_sentences(tokenizer, sentences)
+            token_ids = input_ids, [len(ids) for ids in input_ids]
+        cache[key] = token_ids
+    return cache[key]
+
+
+def read_comparison_batch(batch_path):
+    """id_phrase et phrases EN prétraitées d'un lot (relu à chaque vague : rien n'est gardé en mémoire entre vagues)."""
+    from pipeline.preprocessing import preprocess_batch
+    df = preprocess_batch(os.path.basename(batch_path))
+    return df[[c for c in ('id_phrase', 'en') if c in df.columns]]
+
+
+def write_comparison_columns(out_path, df, columns, first_wave):
+    """
+    Écrit les colonnes fr_<modèle> d'une vague dans la sortie du lot (première vague : id_phrase, en et ses colonnes ;
+    vagues suivantes : colonnes ajoutées au fichier existant). Retourne le DataFrame écrit.
+    """
+    import pandas as pd
+    if not first_wave:
+        out = pd.read_parquet(out_path)
+        for column in columns:
+            out[column] = df[column].values
+        df = out
+    tmp_path = out_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
+    return df
+
+
+def run_comparison(batch_paths, models, device, config, out_dir, pool=None, budget_mb=None, batch_size_model=32, batching='fixed', max_tokens=None, fp16=False, quantize=None, decoding=None, translation_memory=False, chunk_batches=None):
+    """
+    Traduit chaque lot EN de batch_paths avec chaque modèle et écrit <out_dir>/<lot>.parquet (une colonne
+    fr_<modèle> par modèle) ; retourne les statistiques par modèle (ordre de models).
+    Mémoire bornée : lots traités par tranches de chunk_batches (comparison.chunk_batches), vagues de modèles
+    dans chaque tranche ; un lot est relu (en, tokens du fichier annexe) à chaque vague, écrit dès que les
+    traductions de la vague sont prêtes, puis libéré.
+    """
+    pool = pool or get_model_pool(config)
+    chunk_batches = chunk_batches or get_comparison_config(config)['chunk_batches']
+    model_paths = [get_model_path(m) for m in models]
+    engines = [get_engine(m, device, fp16, quantize, decoding) for m in models]
+    sizes = [estimate_model_memory_mb(path, precision) for path, (_, precision, _) in zip(model_paths, engines)]
+    waves = plan_waves(sizes, budget_mb)
+    log_info(f"[COMPARAISON] {len(models)} modèle(s), {len(batch_paths)} lot(s) par tranches de {chunk_batches}, {len(waves)} vague(s) (budget {budget_mb or 0:.0f}MB) : "
+             + " | ".join(', '.join(models[i]['name'] for i in wave) for wave in waves))
+    stats = [{
+        'model': m['name'], 'column': model_column(m), 'backend': backend, 'precision': precision,
+        'wave': next(n for n, wave in enumerate(waves) if i in wave), 'sentences': 0, 'tokens': 0,
+        'translate_s': 0.0, 'load_s': 0.0, 'size_mb': 0.0, 'failures': 0, 'identical': 0,
+    } for i, (m, (backend, precision, _)) in enumerate(zip(models, engines))]
+    reference = stats[0]['column'] if stats else None
+    ensure_dir_exists(out_dir)
+    for start in range(0, len(batch_paths), chunk_batches):
+        chunk = batch_paths[start:start + chunk_batches]
+        for n, wave in enumerate(waves):
+            entries, loaded = {}, []
+            try:
+                for i in wave:
+                    misses = pool.misses
+                    entries[i] = pool.get(model_paths[i], device, engines[i][1], models[i]['name'], engines[i][0])
+                    if pool.misses > misses:
+                        stats[i]['load_s'] += entries[i].load_time
+                        loaded.append(entries[i])
+                    stats[i]['size_mb'] = round(entries[i].size_mb, 1)
+                # Lot par lot : phrases et tokens partagés par les modèles résidents de la vague, libérés ensuite
+                for batch_path in chunk:
+                    df = read_comparison_batch(batch_path).copy()
+                    sentences = df['en'].tolist()
+                    token_cache = {}
+                    for i in wave:
+                        model_info, entry = models[i], entries[i]
+                        _, precision, generation_params = engines[i]
+                        input_ids, lengths = get_shared_token_ids(token_cache, batch_path, sentences, entry.tokenizer, model_paths[i], config)
+                        memory = None
+                        if translation_memory:
+                            from pipeline.translation_memory import get_translation_memory
+                            memory = get_translation_memory(config, model_info, precision, generation_params)
+                        failures = []
+                        t0 = time.perf_counter()
+                        df[stats[i]['column']] = translate_sentences(
+                            sentences, entry.tokenizer, entry.model, device,
+                            batch_size_model=batch_size_model,
+                            batching=batching,
+                            max_tokens=max_tokens,
+                            lengths=lengths,
+                            memory=memory,
+                            decoding=decoding,
+                            failures=failures,
+                            input_ids=input_ids
+                        )
+                        stats[i]['translate_s'] += time.perf_counter() - t0
+                        stats[i]['sentences'] += len(sentences)
+                        stats[i]['tokens'] += sum(lengths)
+                        stats[i]['failures'] += len(failures)
+                    out = write_comparison_columns(
+                        os.path.join(out_dir, os.path.basename(batch_path)), df,
+                        [stats[i]['column'] for i in wave], first_wave=n == 0
+                    )
+                    for i in wave:
+                        stats[i]['identical'] += int((out[stats[i]['column']] == out[reference]).sum())
+                    del df, out, token_cache
+            finally:
+                for entry in entries.values():
+                    pool.release(entry)
+                # Plusieurs vagues : modèles chargés par cette vague évincés avant la suivante
+                # (les autres modèles du pool du processus ne sont pas touchés)
+                if len(waves) > 1:
+                    for entry in loaded:
+                        pool.evict(entry)
+    for s in stats:
+        s['translate_s'] = round(s['translate_s'], 3)
+        s['load_s'] = round(s['load_s'], 3)
+        s['sentences_per_s'] = round(s['sentences'] / s['translate_s'], 1) if s['translate_s'] else None
+        s['tokens_per_s'] = round(s['tokens'] / s['translate_s'], 1) if s['translate_s'] else None
+        s['identical_to_reference'] = round(s.pop('identical') / s['sentences'], 4) if s['sentences'] else None
+    return stats
+
+
+def format_summary(stats):
+    """Tableau des modèles côte à côte (une ligne par modèle)."""
+    import pandas as pd
+    columns = ['model', 'backend', 'precision', 'wave', 'sentences_per_s', 'tokens_per_s', 'translate_s', 'load_s', 'size_mb', 'failures', 'identical_to_reference']
+    return pd.DataFrame(stats)[columns].to_string(index=False)
+
+
+def compare_models(model_names=None, batch_names=None, num_batches=None, batch_size_model=32, batching=None, max_tokens=None, fp16=False, quantize=None, decoding_profile=None, translation_memory=False):
+    """
+    Compare les modèles sur les lots EN (tous, ou batch_names / les num_batches premiers) ;
+    écrit les traductions par lot et summary.csv, retourne les statistiques par modèle.
+    """
+    from utils.core import get_best_device
+    config = load_config()
+    models = select_models(config, model_names)
+    batches_dir = get_abs_path_from_config(config, 'batches_dir')
+    if batch_names is None:
+        from utils.batch_store import list_en_batches
+        batch_names = [os.path.basename(p) for p in list_en_batches(config, batches_dir)]
+    if num_batches is not None:
+        batch_names = batch_names[:num_batches]
+    if not batch_names:
+        log_info("[COMPARAISON] Aucun lot EN à comparer.")
+        return []
+    device = get_best_device(config.get('device', 'cpu'))
+    decoding_name, decoding = get_decoding_profile(config, decoding_profile)
+    log_info(f"[COMPARAISON] Profil de décodage : {decoding_name}")
+
+    out_dir = os.path.join(batches_dir, get_comparison_config(config)['dirname'])
+    stats = run_comparison(
+        [os.path.join(batches_dir, name) for name in batch_names], models, device, config, out_dir,
+        budget_mb=get_memory_budget_mb(config),
+        batch_size_model=batch_size_model,
+        batching=batching or config.get('batching_mode', 'fixed'),
+        max_tokens=max_tokens or config.get('max_batch_tokens', 4096),
+        fp16=fp16,
+        quantize=quantize,
+        decoding=decoding,
+        translation_memory=translation_memory
+    )
+
+    import pandas as pd
+    summary_path = os.path.join(out_dir, 'summary.csv')
+    pd.DataFrame(stats).assign(decoding_profile=decoding_name, batches=len(batch_names)).to_csv(summary_path, index=False)
+    for line in format_summary(stats).splitlines():
+        log_info(f"[COMPARAISON] {line}")
+    failed = [s['model'] for s in stats if s['failures']]
+    if failed:
+        log_error(f"[COMPARAISON] Phrases en échec pour : {failed}")
+    log_info(f"[COMPARAISON] Traductions : {out_dir} ; synthèse : {summary_path}")
+    return stats
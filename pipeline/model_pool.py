@@ -0,0 +1,312 @@
+"""
+Pool de modèles de traduction partagé par tous les lots d'un même processus.
+Chaque modèle est chargé une seule fois par clé (chemin, device, précision) puis réutilisé.
+Les modèles inactifs sont évincés selon un plafond mémoire et un délai d'inactivité.
+"""
+import os
+import glob
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from utils.core import log_info, log_error, ensure_dir_exists
+
+REQUIRED_MODEL_FILES = [
+    'config.json',
+    'tokenizer_config.json',
+    'vocab.json',
+    'source.spm',
+    'target.spm'
+]
+
+
+def find_model_file(path):
+    """Recherche récursive du fichier de poids (pytorch_model.bin ou model.safetensors)."""
+    for ext in ("pytorch_model.bin", "model.safetensors"):
+        found = [f for f in glob.glob(os.path.join(path, "**", ext), recursive=True)]
+        if found:
+            return found[0]
+    return None
+
+
+def is_cache_up_to_date(cache_path, weights_path):
+    """Un fichier dérivé du modèle (quantifié, export ONNX) est à jour s'il existe et n'est pas plus ancien que les poids."""
+    if not os.path.isfile(cache_path):
+        return False
+    return weights_path is None or os.path.getmtime(cache_path) >= os.path.getmtime(weights_path)
+
+
+def ensure_model_files(model_path, model_name):
+    """
+    Vérifie la présence des fichiers essentiels du modèle.
+    Télécharge le modèle si le dossier est vide, lève FileNotFoundError sinon.
+    """
+    missing = [f for f in REQUIRED_MODEL_FILES if not os.path.isfile(os.path.join(model_path, f))]
+    model_file = find_model_file(model_path)
+    if not missing and model_file:
+        return
+    missing_files = missing.copy()
+    if not model_file:
+        missing_files.append('pytorch_model.bin/model.safetensors')
+    log_error(f"Fichiers manquants dans le dossier du modèle ({model_path}) : {', '.join(missing_files)}")
+    ensure_dir_exists(model_path)
+    # Si le dossier est vide, tente de télécharger, sinon lève une exception
+    if os.listdir(model_path):
+        raise FileNotFoundError(f"Fichiers manquants dans le dossier du modèle local ({model_path}) : {', '.join(missing_files)}. Aucun téléchargement car le dossier n'est pas vide.")
+    from transformers import MarianMTModel, MarianTokenizer
+    try:
+        tokenizer = MarianTokenizer.from_pretrained(model_name, cache_dir=model_path)
+        model = MarianMTModel.from_pretrained(model_name, cache_dir=model_path)
+        model.save_pretrained(model_path)
+        tokenizer.save_pretrained(model_path)
+        log_info(f"Modèle téléchargé et sauvegardé dans {model_path}")
+    except Exception as e:
+        log_error(f"Erreur lors du téléchargement du modèle MarianMT : {model_name}", exc=e)
+        raise FileNotFoundError(f"Impossible de télécharger le modèle {model_name} : {e}")
+
+
+def load_marian_model(model_path, device, precision='fp32', model_name=None):
+    """Charge le tokenizer et le modèle MarianMT sur le device demandé. Retourne (tokenizer, model)."""
+    from transformers import MarianMTModel, MarianTokenizer
+    ensure_model_files(model_path, model_name or model_path)
+    try:
+        tokenizer = MarianTokenizer.from_pretrained(model_path)
+        if precision == 'int8':
+            # Quantification dynamique : CPU uniquement, modèle converti une fois puis lu depuis le cache
+            from pipeline.quantization import load_quantized_model
+            model = load_quantized_model(model_path, 'int8')
+            model.eval()
+            return tokenizer, model
+        model = MarianMTModel.from_pretrained(model_path)
+        if precision == 'fp16':
+            model = model.half()
+            log_info("Modèle chargé en mode FP16 (half-precision)")
+        model.to(device)
+        model.eval()
+    except Exception as e:
+        log_error(f"Erreur lors du chargement du modèle MarianMT : {model_path}", exc=e)
+        raise
+    return tokenizer, model
+
+
+def _flatten_tensors(value):
+    if isinstance(value, (tuple, list)):
+        for v in value:
+            yield from _flatten_tensors(v)
+    elif hasattr(value, 'numel') and hasattr(value, 'element_size'):
+        yield value
+
+
+def estimate_model_size_mb(model):
+    """
+    Estime la mémoire occupée par les paramètres et buffers d'un modèle torch (en Mo).
+    Passe par le state_dict pour compter aussi les poids empaquetés des couches quantifiées.
+    """
+    if getattr(model, 'size_mb', None) is not None:
+        # Moteurs hors PyTorch (ex. ONNX) : taille renseignée par le chargeur
+        return model.size_mb
+    try:
+        if not hasattr(model, 'state_dict'):
+            tensors = list(model.parameters()) + list(model.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors) / 1024 / 1024
+        seen = set()
+        total = 0
+        for value in model.state_dict().values():
+            for t in _flatten_tensors(value):
+                # Poids partagés (embeddings liés) comptés une seule fois
+                ptr = t.data_ptr()
+                if ptr in seen:
+                    continue
+                seen.add(ptr)
+                total += t.numel() * t.element_size()
+        return total / 1024 / 1024
+    except Exception:
+        return 0.0
+
+
+class PooledModel:
+    """Entrée du pool : tokenizer, modèle et informations d'usage."""
+
+    def __init__(self, key, tokenizer, model, load_time, size_mb):
+        self.key = key
+        self.tokenizer = tokenizer
+        self.model = model
+        self.load_time = load_time
+        self.size_mb = size_mb
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+
+class ModelPool:
+    """
+    Pool de modèles thread-safe, clé = (chemin du modèle, device, précision, moteur).
+    - max_memory_mb : plafond mémoire des modèles résidents (None = illimité)
+    - idle_timeout : délai (s) après lequel un modèle inutilisé est évincé (None = jamais)
+    - loader : fonction (model_path, device, precision, model_name) -> (tokenizer, model) du moteur torch ;
+      les autres moteurs utilisent leur chargeur (pipeline.backends)
+    """
+
+    def __init__(self, max_memory_mb=None, idle_timeout=None, loader=None):
+        self.max_memory_mb = max_memory_mb
+        self.idle_timeout = idle_timeout
+        self.loader = loader or load_marian_model
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_load_time = 0.0
+
+    @staticmethod
+    def make_key(model_path, device, precision='fp32', backend='torch'):
+        return (os.path.abspath(model_path), str(device), precision, backend)
+
+    def _get_loader(self, backend):
+        if backend == 'torch':
+            return self.loader
+        from pipeline.backends import get_backend_loader
+        return get_backend_loader(backend)
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def _checkout(self, key):
+        """Retourne l'entrée existante (marquée en cours d'utilisation) ou None. Appelé sous self._lock."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+        return entry
+
+    def get(self, model_path, device, precision='fp32', model_name=None, backend='torch'):
+        """Retourne l'entrée du pool (chargée si besoin) et la marque en cours d'utilisation."""
+        key = self.make_key(model_path, device, precision, backend)
+        with self._lock:
+            self._evict_idle_locked()
+            entry = self._checkout(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+        # Un seul chargement par clé, même si plusieurs threads le demandent en même temps
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._checkout(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+            t0 = time.perf_counter()
+            tokenizer, model = self._get_loader(backend)(model_path, device, precision, model_name)
+            load_time = time.perf_counter() - t0
+            entry = PooledModel(key, tokenizer, model, load_time, estimate_model_size_mb(model))
+            entry.in_use = 1
+            with self._lock:
+                self.misses += 1
+                self.total_load_time += load_time
+                self._entries[key] = entry
+                self._evict_for_memory_locked()
+            log_info(f"[POOL] Modèle chargé en {load_time:.2f}s : {model_name or model_path} ({backend}, {device}, {precision}, {entry.size_mb:.0f}MB)")
+            return entry
+
+    def release(self, entry):
+        """Libère une entrée obtenue par get()."""
+        with self._lock:
+            entry.in_use = max(0, entry.in_use - 1)
+            entry.last_used = time.monotonic()
+            self._evict_for_memory_locked()
+
+    @contextmanager
+    def acquire(self, model_path, device, precision='fp32', model_name=None, backend='torch'):
+        """Context manager : `with pool.acquire(...) as entry: entry.model.generate(...)`."""
+        entry = self.get(model_path, device, precision, model_name, backend)
+        try:
+            yield entry
+        finally:
+            self.release(entry)
+
+    def _evict_locked(self, key):
+        entry = self._entries.pop(key)
+        self.evictions += 1
+        log_info(f"[POOL] Modèle évincé : {key[0]} ({key[3]}, {key[1]}, {key[2]})")
+        del entry.model
+        del entry.tokenizer
+
+    def _evict_idle_locked(self):
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry.in_use == 0 and now - entry.last_used > self.idle_timeout:
+                self._evict_locked(key)
+
+    def _evict_for_memory_locked(self):
+        if self.max_memory_mb is None:
+            return
+        # Éviction LRU des modèles inactifs tant que le plafond est dépassé
+        for key, entry in list(self._entries.items()):
+            if self.memory_mb() <= self.max_memory_mb:
+                break
+            if entry.in_use == 0:
+                self._evict_locked(key)
+
+    def memory_mb(self):
+        return sum(e.size_mb for e in self._entries.values())
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle_locked()
+
+    def evict(self, entry):
+        """Évince une entrée précise si elle est inactive (sans effet si elle est en cours d'utilisation ou déjà évincée)."""
+        with self._lock:
+            if self._entries.get(entry.key) is entry and entry.in_use == 0:
+                self._evict_locked(entry.key)
+
+    def clear(self):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.in_use == 0]:
+                self._evict_locked(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'resident_models': len(self._entries),
+                'resident_memory_mb': round(self.memory_mb(), 1),
+                'total_load_time_s': round(self.total_load_time, 3),
+            }
+
+    def log_stats(self):
+        s = self.stats()
+        log_info(f"[POOL] Chargements: {s['misses']} ({s['total_load_time_s']:.2f}s) | Réutilisations: {s['hits']} | Évictions: {s['evictions']} | Résidents: {s['resident_models']} ({s['resident_memory_mb']}MB)")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_model_pool(config=None):
+    """Retourne le pool de modèles du processus (créé au premier appel à partir de la section `model_pool` de la config)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if config is None:
+                from utils.config_loader import load_config
+                config = load_config()
+            pool_cfg = config.get('model_pool') or {}
+            _pool = ModelPool(
+                max_memory_mb=pool_cfg.get('max_memory_mb'),
+                idle_timeout=pool_cfg.get('idle_timeout'),
+            )
+        return _pool
+
+
+def has_model_pool():
+    """Indique si le pool du processus a déjà été créé (sans le créer)."""
+    return _pool is not None
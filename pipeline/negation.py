@@ -0,0 +1,102 @@
+"""
+Annotation des négations d'un lot de phrases EN en une seule passe.
+Chaque phrase est mise en minuscules et découpée une seule fois (str.split, en C) ;
+les mots de négation sont reconnus par intersection avec un ensemble précompilé,
+ce qui donne nb_words, negation_words et has_negation dans la même boucle.
+La portée n'est calculée que pour les phrases qui contiennent une négation.
+
+Résultat identique à l'implémentation d'origine (annotate_negation_reference),
+conservée pour les tests et le micro-benchmark (benchmarks/bench_negation.py).
+"""
+import numpy as np
+
+NEGATION_KEYWORDS = [
+    'not', "n't", 'no', 'never', 'none', 'neither', 'nor', 'cannot', 'without', 'denies', 'deny', 'denied', 'refute', 'refutes', 'refuted', 'absence', 'lacks', 'lack', 'negative', 'negatives', 'negation', 'exclude', 'excluded', 'excludes', 'excluding'
+]
+NEGATION_SET = frozenset(NEGATION_KEYWORDS)
+_KEYWORD_RANK = {k: i for i, k in enumerate(NEGATION_KEYWORDS)}
+
+
+def annotate_negation(sentences):
+    """
+    Annote une séquence de phrases (liste, tableau NumPy/Arrow ou Series).
+    Retourne un dict de colonnes : nb_words, nb_chars, negation_words, has_negation,
+    negation_scope_start, negation_scope_end, negation_scope.
+    Un mot de négation est un mot entier (séparé par des blancs), sans tenir compte de la casse.
+    La portée est le texte qui suit la première occurrence du premier mot de négation
+    trouvé (dans l'ordre de NEGATION_KEYWORDS), espaces de tête retirés.
+    """
+    if hasattr(sentences, 'to_pylist'):
+        sentences = sentences.to_pylist()
+    n = len(sentences)
+    nb_words = [0] * n
+    nb_chars = [0] * n
+    negation_words = [[] for _ in range(n)]
+    has_negation = np.zeros(n, dtype=bool)
+    scope_start = [None] * n
+    scope_end = [None] * n
+    scope = [""] * n
+    isdisjoint = NEGATION_SET.isdisjoint
+    for i, phrase in enumerate(sentences):
+        if not isinstance(phrase, str):
+            phrase = str(phrase)
+        lower = phrase.lower()
+        tokens = lower.split()
+        nb_words[i] = len(tokens)
+        nb_chars[i] = len(phrase)
+        if isdisjoint(tokens):
+            continue
+        words = sorted(NEGATION_SET.intersection(tokens), key=_KEYWORD_RANK.__getitem__)
+        negation_words[i] = words
+        has_negation[i] = True
+        start = lower.find(words[0]) + len(words[0])
+        after = phrase[start:].lstrip()
+        scope_start[i] = start + (len(phrase) - start - len(after))
+        scope_end[i] = len(phrase)
+        scope[i] = after
+    return {
+        'nb_words': nb_words,
+        'nb_chars': nb_chars,
+        'negation_words': negation_words,
+        'has_negation': has_negation,
+        'negation_scope_start': scope_start,
+        'negation_scope_end': scope_end,
+        'negation_scope': scope,
+    }
+
+
+def annotate_negation_reference(sentences):
+    """Implémentation d'origine (une passe apply par colonne), référence pour les tests et le benchmark."""
+    import pandas as pd
+    en = pd.Series(list(sentences), dtype=object)
+    nb_words = en.apply(lambda x: len(str(x).split()))
+    nb_chars = en.apply(lambda x: len(str(x)))
+
+    def detect_negation(phrase):
+        words = str(phrase).lower().split()
+        return [w for w in NEGATION_KEYWORDS if w in words]
+    negation_words = en.apply(detect_negation)
+    has_negation = negation_words.apply(lambda neg_list: len(neg_list) > 0)
+
+    def extract_scope_indices(phrase, neg_words):
+        if not neg_words:
+            return (None, None, "")
+        phrase_l = phrase.lower()
+        for neg in neg_words:
+            idx = phrase_l.find(neg)
+            if idx != -1:
+                start = idx + len(neg)
+                after = phrase[start:].lstrip()
+                nb_strip = len(phrase[start:]) - len(after)
+                return (start + nb_strip, len(phrase), after if after else "")
+        return (None, None, "")
+    scope_info = [extract_scope_indices(phrase, negs) for phrase, negs in zip(en, negation_words)]
+    return {
+        'nb_words': nb_words.tolist(),
+        'nb_chars': nb_chars.tolist(),
+        'negation_words': negation_words.tolist(),
+        'has_negation': has_negation.to_numpy(dtype=bool),
+        'negation_scope_start': [s[0] for s in scope_info],
+        'negation_scope_end': [s[1] for s in scope_info],
+        'negation_scope': [s[2] for s in scope_info],
+    }
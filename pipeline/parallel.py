@@ -1,8 +1,17 @@
 """
 Module de parallélisation du traitement des lots.
+- threads : ThreadPoolExecutor, un seul modèle partagé par le pool du processus
+- processus : ProcessPoolExecutor, chaque worker charge son modèle au démarrage
+  et dispose de sa part des cœurs CPU (torch.set_num_threads, affinité optionnelle)
 """
+import os
+import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from utils.core import log_info
+from utils.core import log_info, log_error
+
+# Exécuteurs du mode parallèle (choix de --executor)
+EXECUTORS = ['thread', 'process']
+
 
 def process_batches_in_parallel(batch_paths, process_func, max_workers=2):
     """Traite plusieurs lots en parallèle avec la fonction donnée."""
@@ -19,3 +28,193 @@ def process_batches_in_parallel(batch_paths, process_func, max_workers=2):
                 log_info(f"Erreur lors du traitement du lot {batch_path} : {e}")
                 results.append((batch_path, False))
     return results
+
+
+def get_available_cpus():
+    """Liste des cœurs utilisables par le processus (affinité courante si disponible)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def compute_optimal_workers(num_batches=None, executor='thread', threads_per_worker=None):
+    """
+    Calcule le découpage workers x threads.
+    Retourne (max_workers, threads_per_worker) ; threads_per_worker vaut None en mode thread
+    (les threads intra-op de PyTorch sont partagés par tout le processus).
+    """
+    try:
+        import torch
+        gpu_available = torch.cuda.is_available()
+    except ImportError:
+        gpu_available = False
+    cpu_count = len(get_available_cpus()) or 2
+    # On limite à 1 worker si GPU (un seul worker saturera le GPU, traduction batchée)
+    if gpu_available:
+        return 1, (cpu_count if executor == 'process' else None)
+    if executor != 'process':
+        # Pour CPU, on ne dépasse pas le nombre de batchs ni 8 threads (par sécurité)
+        if num_batches is not None:
+            return max(1, min(cpu_count, num_batches, 8)), None
+        return max(1, min(cpu_count, 8)), None
+    # Mode processus : quelques threads intra-op par worker (MarianMT passe mal à l'échelle au-delà),
+    # autant de workers que de tranches de cœurs disponibles
+    if threads_per_worker is None:
+        threads_per_worker = 4 if cpu_count >= 16 else 2 if cpu_count >= 4 else 1
+    workers = max(1, cpu_count // threads_per_worker)
+    if num_batches is not None:
+        workers = max(1, min(workers, num_batches))
+    # Les cœurs restants sont redistribués entre les workers
+    return workers, max(1, cpu_count // workers)
+
+
+def process_one_batch(batch_id, batch_path, meta_path, translation_options=None, stop_after=None, update_status=True, rows=None):
+    """
+    Enchaîne prétraitement, traduction, post-traitement et analyse pour un lot.
+    Retourne le statut final ('termine' ou 'erreur' ; 'en_attente' pour un lot traduit en partie),
+    ou None si un arrêt après une étape est demandé.
+    Si update_status=False, le statut n'est pas écrit (le processus principal s'en charge).
+    rows : positions des lignes à traduire (filtre de lignes, pipeline.row_filter), None = tout le lot.
+    """
+    from pipeline.row_filter import selection_status
+    from utils.meta_utils import update_batch_status, claim_batch
+    translation_options = translation_options or {}
+    batch_name = os.path.basename(batch_path)
+    if update_status and not claim_batch(meta_path, batch_id):
+        log_info(f"Lot {batch_id} déjà pris par un autre worker, ignoré.")
+        return None
+    try:
+        # Étape 1 : prétraitement
+        # Le lot circule en mémoire d'une étape à l'autre (écritures : points de reprise et lot FR)
+        from pipeline.preprocessing import preprocess_batch
+        df = preprocess_batch(batch_name, rows=rows)
+        if stop_after == 'preprocessing':
+            log_info(f"Arrêt demandé après prétraitement du lot {batch_id}.")
+            return None
+        # Étape 2 : traduction
+        from pipeline.translation import translate_batch
+        df = translate_batch(batch_name, df=df, rows=rows, **translation_options)
+        if stop_after == 'translation':
+            log_info(f"Arrêt demandé après traduction du lot {batch_id}.")
+            return None
+        # Étape 3 : post-traitement (à activer si besoin)
+        try:
+            from pipeline.postprocessing import postprocess_batch
+            df = postprocess_batch(batch_name, df=df)
+            if stop_after == 'postprocessing':
+                log_info(f"Arrêt demandé après post-traitement du lot {batch_id}.")
+                return None
+        except ImportError:
+            pass
+        # Étape 4 : analyse (à activer si besoin)
+        try:
+            from pipeline.analysis import analyze_batch
+            analyze_batch(batch_name, df=df)
+            if stop_after == 'analysis':
+                log_info(f"Arrêt demandé après analyse du lot {batch_id}.")
+                return None
+        except ImportError:
+            pass
+        # Lot traduit en partie : remis en attente pour une traduction complète ultérieure
+        status, commentaire = selection_status(rows)
+        if update_status:
+            update_batch_status(meta_path, batch_id, status, commentaire)
+        log_info(f"Lot {batch_id} prétraité, traduit et post-traité.")
+        return status
+    except Exception as e:
+        if update_status:
+            update_batch_status(meta_path, batch_id, 'erreur')
+        log_error(f"Erreur sur le lot {batch_id}", exc=e)
+        return 'erreur'
+
+
+def init_process_worker(slots, threads_per_worker=None, pin_cpu=False, fp16=False, log_path=None, log_level=logging.INFO, quantize=None, metrics_run_id=None, stdout_mirror=True):
+    """
+    Initialisation d'un worker processus : logs, métriques, répartition des cœurs et chargement unique du modèle.
+    slots : file partagée distribuant un numéro de worker (0..N-1) pour l'affinité CPU.
+    metrics_run_id : exécution dont le worker exporte ses métriques (fichiers suffixés par son pid).
+    stdout_mirror : recopie console des logs, comme dans le processus principal (False en mode démon).
+    """
+    if log_path:
+        from utils.core import install_log_handlers, read_logging_config
+        _, options = read_logging_config()
+        handler = logging.FileHandler(log_path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] [pid %(process)d] %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+        # Les workers écrivent dans le fichier de log du processus principal
+        install_log_handlers([handler], log_level, async_logging=options['async'], stdout_mirror=stdout_mirror, sample_every=options['sample_every'], max_per_second=options['max_per_second'])
+    if metrics_run_id:
+        from utils.config_loader import load_config
+        from utils.metrics import start_metrics_export
+        start_metrics_export(load_config(), metrics_run_id)
+    slot = slots.get()
+    cpus = get_available_cpus()
+    if pin_cpu and threads_per_worker and hasattr(os, 'sched_setaffinity'):
+        start = (slot * threads_per_worker) % len(cpus)
+        worker_cpus = [cpus[(start + k) % len(cpus)] for k in range(min(threads_per_worker, len(cpus)))]
+        os.sched_setaffinity(0, worker_cpus)
+        log_info(f"[WORKER {slot}] Affinité CPU : {worker_cpus}")
+    try:
+        import torch
+        if threads_per_worker:
+            torch.set_num_threads(threads_per_worker)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass
+        log_info(f"[WORKER {slot}] {torch.get_num_threads()} thread(s) PyTorch")
+    except ImportError:
+        pass
+    # Chargement du modèle une seule fois, réutilisé pour tous les lots du worker
+    from pipeline.translation import preload_model
+    preload_model(fp16=fp16, quantize=quantize)
+
+
+def _current_log_path():
+    from utils.core import get_log_handlers
+    for handler in get_log_handlers():
+        if isinstance(handler, logging.FileHandler):
+            return handler.baseFilename
+    return None
+
+
+def run_batches_in_processes(batch_items, meta_path, translation_options=None, stop_after=None, max_workers=2, threads_per_worker=None, pin_cpu=False, metrics_run_id=None, selection=None):
+    """
+    Traite les lots [(batch_id, chemin), ...] dans un ProcessPoolExecutor.
+    Les statuts sont écrits par le processus principal uniquement.
+    selection : {batch_id: positions des lignes à traduire} (filtre de lignes).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from utils.meta_utils import update_batch_status, claim_batch
+    from utils.core import get_stdout_mirror
+    from pipeline.row_filter import selection_status
+    translation_options = translation_options or {}
+    selection = selection or {}
+    # 'spawn' : pas de fork d'un processus ayant déjà initialisé PyTorch/OpenMP
+    ctx = multiprocessing.get_context('spawn')
+    slots = ctx.Queue()
+    for i in range(max_workers):
+        slots.put(i)
+    log_info(f"Traitement multi-processus activé ({max_workers} workers x {threads_per_worker or 'auto'} threads{', affinité CPU' if pin_cpu else ''})...")
+    initargs = (slots, threads_per_worker, pin_cpu, translation_options.get('fp16', False), _current_log_path(), logging.getLogger().level, translation_options.get('quantize'), metrics_run_id, get_stdout_mirror())
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, initializer=init_process_worker, initargs=initargs) as executor:
+        futures = {}
+        for batch_id, batch_path in batch_items:
+            if not claim_batch(meta_path, batch_id):
+                log_info(f"Lot {batch_id} déjà pris par un autre worker, ignoré.")
+                continue
+            futures[executor.submit(process_one_batch, batch_id, batch_path, meta_path, translation_options, stop_after, False, selection.get(batch_id))] = batch_id
+        for future in as_completed(futures):
+            batch_id = futures[future]
+            try:
+                status = future.result()
+            except Exception as exc:
+                log_error(f"Exception dans le traitement du lot {batch_id}: {exc}")
+                status = 'erreur'
+            if status == 'erreur':
+                update_batch_status(meta_path, batch_id, status)
+            elif status:
+                update_batch_status(meta_path, batch_id, *selection_status(selection.get(batch_id)))
+            results[batch_id] = status
+    return results
@@ -1,18 +1,25 @@
 """
 Module de post-traitement pour la pipeline de traduction.
-Utilise la configuration centralisée.
+Utilise la configuration centralisée (lue à l'appel, pas à l'import).
 """
 import os
 from utils.core import log_info, log_execution_time
+from utils.batch_store import read_batch_columns
 from utils.config_loader import load_config, get_abs_path_from_config
 
-config = load_config()
 
-def postprocess_batch(batch_name):
 @log_execution_time('Post-traitement')
-def postprocess_batch(batch_name):
-    batches_dir = get_abs_path_from_config(config, 'batches_dir')
+def postprocess_batch(batch_name, df=None):
+    """Post-traite un lot traduit (DataFrame en mémoire avec la colonne 'fr', relu du lot FR si absent) et le retourne."""
+    batches_dir = get_abs_path_from_config(load_config(), 'batches_dir')
     batch_path = os.path.join(batches_dir, batch_name)
     log_info(f"Post-traitement du lot : {batch_path}")
+    if df is None:
+        fr_batch_name = 'fr_' + batch_name[len('en_'):] if batch_name.startswith('en_') else 'fr_' + batch_name
+        fr_batch_path = os.path.join(batches_dir, fr_batch_name)
+        try:
+            df = read_batch_columns(fr_batch_path)
+        except FileNotFoundError:
+            pass
     # ... logique de post-traitement à implémenter ...
-    return True
+    return df
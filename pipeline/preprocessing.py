@@ -1,23 +1,39 @@
 """
 Module de prétraitement pour la pipeline de traduction.
-Utilise la configuration centralisée.
+Utilise la configuration centralisée (lue à l'appel, pas à l'import).
 """
 
 import os
 from utils.core import log_info, log_execution_time
-from utils.config_loader import load_config, get_abs_path_from_config
+from utils.batch_store import read_batch_columns, is_dataset_layout
+from utils.config_loader import load_config, get_abs_path_from_config, is_checkpoint
 
-config = load_config()
+
+# Colonnes utiles aux étapes suivantes (traduction, lot FR) : lecture projetée hors point de reprise
+STAGE_COLUMNS = ['id_phrase', 'en', 'line_number', 'nb_words', 'nb_chars']
 
 @log_execution_time('Prétraitement')
-def preprocess_batch(batch_name):
+def preprocess_batch(batch_name, df=None, rows=None):
+    """
+    Prétraite un lot et retourne le DataFrame en mémoire pour les étapes suivantes.
+    Le lot EN n'est réécrit que si 'preprocessing' est un point de reprise (save_intermediate).
+    rows : positions des lignes retenues (filtre de lignes) ; l'index du DataFrame retourné garde
+    la position de chaque ligne dans le lot.
+    """
+    config = load_config()
     batches_dir = get_abs_path_from_config(config, 'batches_dir')
     batch_path = os.path.join(batches_dir, batch_name)
     log_info(f"Prétraitement du lot : {batch_path}")
+    # Layout dataset : un lot est un row group du dataset EN, il n'est pas réécrit
+    save = is_checkpoint(config, 'preprocessing') and not is_dataset_layout(config)
 
-    import pandas as pd
-    # Lecture du lot
-    df = pd.read_parquet(batch_path)
+    # Lecture du lot (toutes les colonnes seulement si le lot doit être réécrit)
+    if df is None:
+        df = read_batch_columns(batch_path, None if save else STAGE_COLUMNS, config)
+    if rows is not None:
+        log_info(f"Filtre de lignes : {len(rows)}/{len(df)} phrase(s) retenue(s) dans {batch_name}")
+        if not save:
+            df = df.iloc[rows].copy()
 
     # Prétraitement minimal : strip et vérification non vide
     if 'en' not in df.columns:
@@ -27,6 +43,10 @@ def preprocess_batch(batch_name):
         raise ValueError(f"Des phrases vides ou nulles détectées dans le lot {batch_name}")
 
     # Sauvegarde (ici on écrase le lot, sinon choisis un autre dossier)
-    df.to_parquet(batch_path, index=False)
+    if save:
+        df.to_parquet(batch_path, index=False)
+    if rows is not None and save:
+        # Lot réécrit en entier, seules les lignes retenues passent aux étapes suivantes
+        df = df.iloc[rows].copy()
     log_info(f"Prétraitement terminé pour {batch_name}")
-    return True
+    return df
@@ -0,0 +1,197 @@
+"""
+Pré-tokenisation des lots EN : identifiants de tokens (input_ids, colonne Arrow list<int32>) et nombre
+réel de tokens (nb_tokens) calculés une fois par tokenizer, puis relus par la traduction (sous-batchs
+construits par simple padding, sans repasser par SentencePiece) et par le découpage token_budget
+(longueurs exactes au lieu de l'estimation nb_chars / nb_words).
+
+Fichiers annexes : <batches_dir>/tokens/<empreinte du tokenizer>/<lot EN>.parquet
+- l'empreinte couvre les fichiers du tokenizer du snapshot (source.spm, target.spm, vocab.json...) :
+  un tokenizer modifié donne un autre dossier, l'ancien cache n'est plus lu (--clean le supprime) ;
+- chaque fichier porte l'empreinte des phrases du lot : un lot régénéré ou modifié invalide son cache.
+Écrits à la génération des lots (pretokenize.at_generation ou generate --pretokenize), sinon à la
+première traduction du lot.
+
+    python -m pipeline.pretokenize [--force] [--clean]
+"""
+import os
+import shutil
+import hashlib
+from utils.core import log_info, log_error, ensure_dir_exists
+from utils.config_loader import load_config, get_abs_path_from_config
+
+TOKENIZER_FILES = (
+    'source.spm', 'target.spm', 'vocab.json', 'tokenizer.json', 'sentencepiece.bpe.model',
+    'tokenizer_config.json', 'special_tokens_map.json',
+)
+
+# Empreintes déjà calculées : chemin du snapshot -> (signature des fichiers, empreinte)
+_hashes = {}
+
+
+def get_pretokenize_config(config):
+    return dict({'enabled': False, 'at_generation': False, 'dirname': 'tokens'}, **(config.get('pretokenize') or {}))
+
+
+def tokenizer_hash(model_path):
+    """Empreinte (16 caractères hex) des fichiers du tokenizer d'un snapshot ; recalculée s'ils changent."""
+    files = [os.path.join(model_path, name) for name in TOKENIZER_FILES if os.path.isfile(os.path.join(model_path, name))]
+    if not files:
+        raise FileNotFoundError(f"Aucun fichier de tokenizer dans {model_path}")
+    signature = tuple((path, os.path.getmtime(path), os.path.getsize(path)) for path in files)
+    cached = _hashes.get(model_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    tok_hash = digest.hexdigest()[:16]
+    _hashes[model_path] = (signature, tok_hash)
+    return tok_hash
+
+
+def sentences_digest(sentences):
+    digest = hashlib.blake2b(digest_size=16)
+    for s in sentences:
+        digest.update(str(s).encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+
+def get_tokens_dir(model_path, config=None, batches_dir=None):
+    config = config or load_config()
+    batches_dir = batches_dir or get_abs_path_from_config(config, 'batches_dir')
+    return os.path.join(batches_dir, get_pretokenize_config(config)['dirname'], tokenizer_hash(model_path))
+
+
+def tokenize_sentences(tokenizer, sentences):
+    """input_ids de chaque phrase, sans padding (mêmes options que la traduction : troncature)."""
+    return tokenizer(list(sentences), truncation=True)['input_ids']
+
+
+def write_token_ids(path, input_ids, sentences):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.table({
+        'input_ids': pa.array(input_ids, type=pa.list_(pa.int32())),
+        'nb_tokens': pa.array([len(ids) for ids in input_ids], type=pa.int32()),
+    })
+    table = table.replace_schema_metadata({'sentences_digest': sentences_digest(sentences)})
+    ensure_dir_exists(os.path.dirname(path))
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_token_ids(path, sentences):
+    """(input_ids, nb_tokens) du fichier annexe, ou None s'il est absent ou ne correspond plus aux phrases du lot."""
+    if not os.path.isfile(path):
+        return None
+    import pyarrow.parquet as pq
+    try:
+        table = pq.read_table(path)
+    except Exception as e:
+        log_error(f"[TOKENS] Fichier annexe illisible, ignoré : {path}", exc=e)
+        return None
+    metadata = table.schema.metadata or {}
+    if table.num_rows != len(sentences) or metadata.get(b'sentences_digest', b'').decode() != sentences_digest(sentences):
+        return None
+    return table.column('input_ids').to_pylist(), table.column('nb_tokens').to_pylist()
+
+
+def get_token_ids_path(batch_path, model_path, config=None):
+    """Fichier annexe d'un lot pour le tokenizer du snapshot, ou None (pré-tokenisation désactivée, pas de tokenizer)."""
+    config = config or load_config()
+    if not get_pretokenize_config(config)['enabled']:
+        return None
+    try:
+        return os.path.join(get_tokens_dir(model_path, config), os.path.basename(batch_path))
+    except FileNotFoundError:
+        return None
+
+
+def read_batch_token_ids(batch_path, sentences, model_path, config=None):
+    """(input_ids, nb_tokens) d'un lot s'ils sont déjà en cache pour ce tokenizer, sinon None."""
+    path = get_token_ids_path(batch_path, model_path, config)
+    return read_token_ids(path, sentences) if path else None
+
+
+def get_batch_token_ids(batch_path, sentences, tokenizer, model_path, config=None):
+    """
+    input_ids et nb_tokens des phrases d'un lot pour ce tokenizer : relus du fichier annexe,
+    sinon calculés et enregistrés. Retourne None si la pré-tokenisation est désactivée.
+    """
+    path = get_token_ids_path(batch_path, model_path, config)
+    if path is None:
+        return None
+    cached = read_token_ids(path, sentences)
+    if cached is not None:
+        return cached
+    input_ids = tokenize_sentences(tokenizer, sentences)
+    try:
+        write_token_ids(path, input_ids, sentences)
+    except OSError as e:
+        log_error(f"[TOKENS] Échec de l'écriture de {path}", exc=e)
+    return input_ids, [len(ids) for ids in input_ids]
+
+
+def load_pretokenizers(config, batches_dir=None):
+    """Tokenizers des modèles de la config, un par empreinte : [(dossier des fichiers annexes, tokenizer)]."""
+    from transformers import MarianTokenizer
+    from pipeline.translation import get_model_path
+    tokenizers = {}
+    for model_info in config['models']:
+        model_path = get_model_path(model_info)
+        try:
+            tokens_dir = get_tokens_dir(model_path, config, batches_dir)
+            if tokens_dir not in tokenizers:
+                tokenizers[tokens_dir] = MarianTokenizer.from_pretrained(model_path)
+        except Exception as e:
+            log_error(f"[TOKENS] Tokenizer de {model_info['name']} non chargé, lots non pré-tokenisés pour ce modèle", exc=e)
+    return list(tokenizers.items())
+
+
+def pretokenize_batch(batch_path, pretokenizers, sentences=None, force=False):
+    """Écrit les fichiers annexes d'un lot EN pour chaque tokenizer ; retourne le nombre de fichiers écrits."""
+    if sentences is None:
+        from utils.batch_store import read_batch_columns
+        sentences = read_batch_columns(batch_path, ['en'])['en'].astype(str).str.strip().tolist()
+    written = 0
+    for tokens_dir, tokenizer in pretokenizers:
+        path = os.path.join(tokens_dir, os.path.basename(batch_path))
+        if not force and read_token_ids(path, sentences) is not None:
+            continue
+        write_token_ids(path, tokenize_sentences(tokenizer, sentences), sentences)
+        written += 1
+    return written
+
+
+def clean_token_dirs(config, keep):
+    """Supprime les caches de tokenizers qui ne sont plus ceux de la config."""
+    root = os.path.join(get_abs_path_from_config(config, 'batches_dir'), get_pretokenize_config(config)['dirname'])
+    removed = []
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if os.path.isdir(path) and path not in keep:
+                shutil.rmtree(path)
+                removed.append(name)
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+    from utils.batch_store import list_en_batches
+    parser = argparse.ArgumentParser(description="Pré-tokenisation des lots EN (fichiers annexes input_ids / nb_tokens)")
+    parser.add_argument('--force', action='store_true', help='Réécrire les fichiers annexes même s\'ils sont à jour')
+    parser.add_argument('--clean', action='store_true', help='Supprimer les caches des tokenizers absents de la config')
+    args = parser.parse_args()
+    config = load_config()
+    pretokenizers = load_pretokenizers(config)
+    batch_paths = list_en_batches(config)
+    written = sum(pretokenize_batch(path, pretokenizers, force=args.force) for path in batch_paths)
+    log_info(f"[TOKENS] {len(batch_paths)} lot(s), {len(pretokenizers)} tokenizer(s) : {written} fichier(s) annexe(s) écrit(s)")
+    if args.clean:
+        removed = clean_token_dirs(config, {tokens_dir for tokens_dir, _ in pretokenizers})
+        log_info(f"[TOKENS] {len(removed)} cache(s) obsolète(s) supprimé(s) : {removed}")
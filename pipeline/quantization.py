@@ -0,0 +1,59 @@
+"""
+Quantification dynamique int8 des modèles MarianMT pour l'inférence CPU.
+Les couches Linear sont converties en int8 (poids quantifiés, activations quantifiées à la volée).
+Le modèle quantifié est mis en cache sur disque à côté du snapshot (sous-dossier quantized/)
+pour ne pas refaire la conversion à chaque exécution ; le cache est reconstruit si les poids
+du snapshot sont plus récents ou si la version de torch change.
+"""
+import os
+import time
+from utils.core import log_info, log_error, ensure_dir_exists
+
+QUANTIZE_MODES = ['int8']
+QUANTIZED_DIR = 'quantized'
+
+
+def get_quantized_cache_path(model_path, mode='int8'):
+    """Chemin du modèle quantifié en cache pour ce snapshot et la version de torch installée."""
+    import torch
+    version = torch.__version__.replace('+', '_')
+    return os.path.join(model_path, QUANTIZED_DIR, f"marian_{mode}_dynamic_torch{version}.pt")
+
+
+def quantize_model(model, mode='int8'):
+    """Applique la quantification dynamique aux couches Linear d'un modèle FP32 (CPU)."""
+    import torch
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Mode de quantification inconnu : {mode} (attendu : {', '.join(QUANTIZE_MODES)})")
+    return torch.ao.quantization.quantize_dynamic(model.to('cpu').eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_quantized_model(model_path, mode='int8'):
+    """
+    Retourne le modèle MarianMT quantifié : depuis le cache disque s'il est à jour,
+    sinon quantifie le modèle FP32 et enregistre le résultat.
+    """
+    import torch
+    from transformers import MarianMTModel
+    from pipeline.model_pool import find_model_file, is_cache_up_to_date
+    cache_path = get_quantized_cache_path(model_path, mode)
+    if is_cache_up_to_date(cache_path, find_model_file(model_path)):
+        try:
+            model = torch.load(cache_path, map_location='cpu', weights_only=False)
+            log_info(f"Modèle {mode} chargé depuis le cache : {cache_path}")
+            return model.eval()
+        except Exception as e:
+            log_error(f"Cache du modèle quantifié illisible, reconstruction : {cache_path}", exc=e)
+    t0 = time.perf_counter()
+    model = quantize_model(MarianMTModel.from_pretrained(model_path), mode)
+    log_info(f"Modèle quantifié en {mode} en {time.perf_counter() - t0:.2f}s")
+    try:
+        ensure_dir_exists(os.path.dirname(cache_path))
+        tmp_path = cache_path + '.tmp'
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, cache_path)
+        log_info(f"Modèle quantifié mis en cache : {cache_path}")
+    except OSError as e:
+        # Snapshot en lecture seule : on continue sans cache
+        log_error(f"Impossible d'écrire le cache du modèle quantifié : {cache_path}", exc=e)
+    return model
@@ -1,27 +1,29 @@
 """
 Module de reporting et visualisation automatique.
+matplotlib/seaborn ne sont importés qu'à la génération du rapport.
 """
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
 from utils.core import log_info
+from utils.meta_utils import read_fr_batch_info
 
-import seaborn as sns
 from datetime import datetime
 
 RESULTS_DIR = os.path.join("analysis", "results")
-os.makedirs(RESULTS_DIR, exist_ok=True)
 META_DIR = os.path.join("translations", "meta")
 BATCH_META = os.path.join(META_DIR, "batch_info.parquet")
 FR_BATCH_META = os.path.join(META_DIR, "fr_batch_info.parquet")
 
 def generate_report():
-    # Lire les fichiers meta
-    if not os.path.exists(BATCH_META) or not os.path.exists(FR_BATCH_META):
+    # Lire les fichiers meta (meta FR : vue consolidée fichier compacté + fragments)
+    fr_batch_info = read_fr_batch_info(META_DIR)
+    if not os.path.exists(BATCH_META) or fr_batch_info is None:
         log_info("Fichiers meta manquants, rapport non généré.")
         return None
     batch_info = pd.read_parquet(BATCH_META)
-    fr_batch_info = pd.read_parquet(FR_BATCH_META)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    os.makedirs(RESULTS_DIR, exist_ok=True)
 
     # Statistiques globales
     n_batches = len(batch_info)
@@ -0,0 +1,168 @@
+"""
+Traitement sélectif des lots par filtre de lignes (translate --where "has_negation and nb_words < 12").
+
+Expression : comparaisons colonne / constante (==, !=, <, <=, >, >=, chaînées : 5 <= nb_words < 12),
+colonne booléenne seule (has_negation, not has_negation), and / or / not et parenthèses.
+Une valeur nulle ne vérifie aucune comparaison.
+
+Sélection en deux temps, avant toute traduction :
+- statistiques min/max des row groups (footer parquet du lot, ou row group du dataset) : un lot dont
+  aucune ligne ne peut vérifier le filtre est écarté sans lire ses données ;
+- lots restants : lecture des seules colonnes du filtre, positions des lignes retenues.
+Seules les lignes retenues sont traduites ; le lot FR ne contient qu'elles. Un lot traduit en partie est
+remis en attente (commentaire de statut) pour une traduction complète ultérieure.
+"""
+import ast
+import operator
+from utils.core import log_info
+from utils import metrics
+
+OPERATORS = {ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>='}
+NEGATED = {'==': '!=', '!=': '==', '<': '>=', '<=': '>', '>': '<=', '>=': '<'}
+# Constante à gauche : 10 > nb_words équivaut à nb_words < 10
+MIRRORED = {'==': '==', '!=': '!=', '<': '>', '<=': '>=', '>': '<', '>=': '<='}
+COMPARE = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+def parse_row_filter(text):
+    """
+    Arbre du filtre : ('and', [...]), ('or', [...]) ou ('cmp', colonne, opérateur, valeur),
+    les négations étant reportées sur les comparaisons. Lève ValueError si l'expression n'est pas reconnue.
+    """
+    try:
+        node = ast.parse(text.strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f"Filtre de lignes invalide : {text!r} ({e.msg})") from None
+    return _build(node, False, text)
+
+
+def _build(node, negated, text):
+    if isinstance(node, ast.BoolOp):
+        kind = 'and' if isinstance(node.op, ast.And) else 'or'
+        if negated:
+            kind = 'or' if kind == 'and' else 'and'
+        return (kind, [_build(value, negated, text) for value in node.values])
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return _build(node.operand, not negated, text)
+    if isinstance(node, ast.Name):
+        # Colonne booléenne seule : has_negation == True
+        return ('cmp', node.id, '!=' if negated else '==', True)
+    if isinstance(node, ast.Compare):
+        operands = [node.left] + node.comparators
+        comparisons = [_comparison(left, op, right, negated, text) for left, op, right in zip(operands, node.ops, operands[1:])]
+        if len(comparisons) == 1:
+            return comparisons[0]
+        return ('or' if negated else 'and', comparisons)
+    raise ValueError(f"Filtre de lignes non reconnu : {text!r} ({ast.dump(node)})")
+
+
+def _comparison(left, op, right, negated, text):
+    if type(op) not in OPERATORS:
+        raise ValueError(f"Opérateur non supporté dans le filtre {text!r} : {type(op).__name__}")
+    symbol = OPERATORS[type(op)]
+    if isinstance(left, ast.Constant) and isinstance(right, ast.Name):
+        left, right, symbol = right, left, MIRRORED[symbol]
+    if not (isinstance(left, ast.Name) and isinstance(right, ast.Constant) and isinstance(right.value, (bool, int, float, str))):
+        raise ValueError(f"Comparaison non supportée dans le filtre {text!r} : colonne et constante attendues")
+    return ('cmp', left.id, NEGATED[symbol] if negated else symbol, right.value)
+
+
+def filter_columns(tree):
+    """Colonnes lues par le filtre (ordre d'apparition)."""
+    if tree[0] == 'cmp':
+        return [tree[1]]
+    columns = []
+    for child in tree[1]:
+        columns += [c for c in filter_columns(child) if c not in columns]
+    return columns
+
+
+def may_match(tree, bounds):
+    """
+    False si aucune ligne ne peut vérifier le filtre d'après les bornes des colonnes
+    ({colonne: (min, max), ou None si la colonne n'a aucune valeur non nulle} ; colonne absente : inconnue).
+    """
+    kind = tree[0]
+    if kind == 'and':
+        return all(may_match(child, bounds) for child in tree[1])
+    if kind == 'or':
+        return any(may_match(child, bounds) for child in tree[1])
+    _, column, op, value = tree
+    if column not in bounds:
+        return True
+    if bounds[column] is None:
+        return False
+    low, high = bounds[column]
+    try:
+        if op == '==':
+            return low <= value <= high
+        if op == '!=':
+            return not (low == high == value)
+        if op in ('<', '<='):
+            return COMPARE[op](low, value)
+        return COMPARE[op](high, value)
+    except TypeError:
+        # Types non comparables (statistiques d'un autre type) : lot conservé, filtre appliqué à la lecture
+        return True
+
+
+def row_mask(tree, df):
+    """Masque booléen des lignes de df qui vérifient le filtre."""
+    kind = tree[0]
+    if kind in ('and', 'or'):
+        masks = [row_mask(child, df) for child in tree[1]]
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = (mask & other) if kind == 'and' else (mask | other)
+        return mask
+    _, column, op, value = tree
+    series = df[column]
+    return COMPARE[op](series, value).fillna(False).astype(bool) & series.notna()
+
+
+def select_batches(batch_items, row_filter, config=None, limit=None):
+    """
+    Lots et lignes à traduire pour le filtre row_filter, parmi batch_items [(batch_id, chemin du lot EN), ...].
+    limit : nombre de lots retenus au plus (--num-batches).
+    Retourne (lots retenus [(batch_id, chemin)], {batch_id: positions des lignes retenues, None si toutes}).
+    """
+    from utils.batch_store import read_batch_statistics, read_batch_columns
+    tree = parse_row_filter(row_filter)
+    columns = filter_columns(tree)
+    kept, selection = [], {}
+    pruned_stats = pruned_rows = 0
+    rows_total = rows_selected = rows_pruned_stats = 0
+    for batch_id, batch_path in batch_items:
+        if limit is not None and len(kept) >= limit:
+            break
+        nb_rows, bounds = read_batch_statistics(batch_path, columns, config)
+        rows_total += nb_rows
+        if not may_match(tree, bounds):
+            pruned_stats += 1
+            rows_pruned_stats += nb_rows
+            continue
+        mask = row_mask(tree, read_batch_columns(batch_path, columns, config))
+        rows = [int(i) for i in mask.to_numpy().nonzero()[0]]
+        if not rows:
+            pruned_rows += 1
+            continue
+        kept.append((batch_id, batch_path))
+        selection[batch_id] = None if len(rows) == len(mask) else rows
+        rows_selected += len(rows)
+    examined = pruned_stats + pruned_rows + len(kept)
+    metrics.inc('row_filter_batches_total', len(kept), outcome='selected')
+    metrics.inc('row_filter_batches_total', pruned_stats, outcome='pruned_stats')
+    metrics.inc('row_filter_batches_total', pruned_rows, outcome='pruned_rows')
+    metrics.inc('row_filter_rows_total', rows_selected, outcome='selected')
+    metrics.inc('row_filter_rows_total', rows_total - rows_selected, outcome='pruned')
+    log_info(f"[FILTRE] {row_filter} : {len(kept)}/{examined} lot(s) retenu(s), {pruned_stats} écarté(s) sur statistiques "
+             f"({rows_pruned_stats} phrase(s) non lue(s)), {pruned_rows} après lecture des colonnes {columns} ; "
+             f"{rows_selected}/{rows_total} phrase(s) à traduire, {rows_total - rows_selected} écartée(s)")
+    return kept, selection
+
+
+def selection_status(rows):
+    """(statut, commentaire) d'un lot traité : terminé, ou remis en attente après une traduction partielle."""
+    if rows is None:
+        return 'termine', ''
+    return 'en_attente', f"traduction partielle (filtre de lignes) : {len(rows)} phrase(s)"
@@ -0,0 +1,438 @@
+"""
+Serveur local de traduction pour les phrases ponctuelles (hors lots), en asyncio.
+- modèles de la liste `models` de la config chargés une fois au démarrage et gardés chauds
+  (pool de modèles, mémoire de traduction partagée avec la pipeline) ;
+- micro-batching : les phrases des requêtes en attente sont regroupées et envoyées au modèle dès que
+  max_batch_size phrases attendent ou que la plus ancienne attend depuis max_wait_ms ;
+  chaque requête attend ses propres futures ;
+- contrôle d'admission : au plus max_queue phrases en attente par modèle, au-delà réponse 503 immédiate
+  (Retry-After) plutôt qu'une file qui grossit sans fin ;
+- HTTP/1.1 minimal (JSON, connexions persistantes) sur localhost ou sur une socket Unix, sans dépendance externe.
+
+    python -m pipeline.server serve [--port 8765 | --unix-socket /tmp/traduction.sock]
+    python -m pipeline.server translate "No acute distress." "Patient denies chest pain."
+    curl -s localhost:8765/translate -d '{"texts": ["No acute distress."]}'
+
+Routes : POST /translate {"texts": [...] | "text": "...", "model": nom?} -> {"model", "translations"} ;
+GET /health -> état des files par modèle.
+"""
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.core import log_info, log_error
+from utils.config_loader import load_config
+from utils import metrics
+
+MAX_BODY_BYTES = 1 << 20
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+DEFAULT_SERVER = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'unix_socket': None,
+    'max_batch_size': 32,
+    'max_wait_ms': 10,
+    'max_queue': 1024,
+}
+
+
+class ServerBusy(Exception):
+    """File du modèle pleine : la requête est refusée (503)."""
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def get_server_config(config):
+    return dict(DEFAULT_SERVER, **(config.get('server') or {}))
+
+
+class MicroBatcher:
+    """
+    File de phrases d'un modèle, vidée par paquets de max_batch_size (ou après max_wait_ms).
+    translate : fonction bloquante liste de phrases -> liste de traductions, exécutée dans un thread dédié.
+    """
+
+    def __init__(self, translate, max_batch_size=32, max_wait_ms=10, max_queue=1024, name='model'):
+        self.translate = translate
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.name = name
+        self._items = deque()
+        self._wakeup = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'server-{name}')
+        self.stats = {'requests': 0, 'sentences': 0, 'batches': 0, 'rejected': 0}
+
+    def start(self):
+        """Démarre la boucle de vidage (dans la boucle asyncio courante)."""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    def queued(self):
+        return len(self._items)
+
+    async def submit(self, texts):
+        """Met les phrases en file et retourne leurs traductions ; ServerBusy si la file est pleine."""
+        if len(self._items) + len(texts) > self.max_queue:
+            self.stats['rejected'] += 1
+            metrics.inc('server_rejected_total', model=self.name)
+            raise ServerBusy(f"File pleine pour {self.name} ({len(self._items)} phrase(s) en attente)")
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        futures = [loop.create_future() for _ in texts]
+        self._items.extend((text, future, now) for text, future in zip(texts, futures))
+        self.stats['requests'] += 1
+        self._wakeup.set()
+        return await asyncio.gather(*futures)
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        while not self._items:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        # Attente de phrases supplémentaires jusqu'au paquet complet ou à l'échéance de la plus ancienne
+        deadline = self._items[0][2] + self.max_wait
+        while len(self._items) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                break
+        batch = [self._items.popleft() for _ in range(min(self.max_batch_size, len(self._items)))]
+        # Requêtes abandonnées (client déconnecté) : leurs phrases ne partent pas au modèle
+        return [item for item in batch if not item[1].done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            self.stats['batches'] += 1
+            self.stats['sentences'] += len(batch)
+            metrics.inc('server_batches_total', model=self.name)
+            metrics.inc('server_sentences_total', len(batch), model=self.name)
+            try:
+                results = await loop.run_in_executor(self._executor, self.translate, [text for text, _, _ in batch])
+            except Exception as e:
+                log_error(f"[SERVEUR] Échec de traduction d'un paquet de {len(batch)} phrase(s) ({self.name})", exc=e)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), fr in zip(batch, results):
+                if not future.done():
+                    future.set_result(fr)
+
+
+class WarmTranslator:
+    """Modèle chargé au démarrage et réservé dans le pool tant que le serveur tourne (jamais évincé)."""
+
+    def __init__(self, model_info, config, device, fp16=False, quantize=None, decoding_profile=None, translation_memory=True, batch_size_model=32):
+        from pipeline.model_pool import get_model_pool
+        from pipeline.translation import get_model_path, get_engine
+        from pipeline.translation_memory import get_translation_memory
+        from pipeline.decoding import get_decoding_profile
+        self.name = model_info['name']
+        self.device = device
+        self.batch_size_model = batch_size_model
+        self.decoding_name, self.decoding = get_decoding_profile(config, decoding_profile)
+        backend, precision, generation_params = get_engine(model_info, device, fp16, quantize, self.decoding)
+        self.memory = get_translation_memory(config, model_info, precision, generation_params) if translation_memory else None
+        self.pool = get_model_pool(config)
+        self.entry = self.pool.get(get_model_path(model_info), device, precision, self.name, backend)
+
+    def __call__(self, texts):
+        from pipeline.translation import translate_sentences
+        return translate_sentences(
+            texts, self.entry.tokenizer, self.entry.model, self.device,
+            batch_size_model=self.batch_size_model, memory=self.memory, decoding=self.decoding
+        )
+
+    def close(self):
+        self.pool.release(self.entry)
+
+
+def load_translators(config, fp16=False, quantize=None, decoding_profile=None, translation_memory=True, batch_size_model=32):
+    """Charge les modèles de la config ; un modèle introuvable est signalé et ignoré."""
+    from utils.core import get_best_device
+    device = get_best_device(config.get('device', 'cpu'))
+    translators = {}
+    for model_info in config['models']:
+        try:
+            translators[model_info['name']] = WarmTranslator(model_info, config, device, fp16, quantize, decoding_profile, translation_memory, batch_size_model)
+        except Exception as e:
+            log_error(f"[SERVEUR] Modèle {model_info['name']} non chargé", exc=e)
+    if not translators:
+        raise RuntimeError("Aucun modèle de la config n'a pu être chargé.")
+    return translators
+
+
+class TranslationServer:
+    """
+    Serveur HTTP de traduction. translators : {nom du modèle: fonction liste de phrases -> traductions},
+    le premier modèle sert par défaut.
+    """
+
+    def __init__(self, translators, max_batch_size=32, max_wait_ms=10, max_queue=1024):
+        self.translators = translators
+        self.default_model = next(iter(translators))
+        self.max_queue = max_queue
+        self.batchers = {
+            name: MicroBatcher(translate, max_batch_size, max_wait_ms, max_queue, name)
+            for name, translate in translators.items()
+        }
+        self._server = None
+        self.address = None
+
+    async def start(self, host='127.0.0.1', port=8765, unix_socket=None):
+        for batcher in self.batchers.values():
+            batcher.start()
+        if unix_socket:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+            self.address = unix_socket
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        log_info(f"[SERVEUR] En écoute sur {self.address} : {', '.join(self.batchers)}")
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        for translate in self.translators.values():
+            if hasattr(translate, 'close'):
+                translate.close()
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'default_model': self.default_model,
+            'models': {name: dict(b.stats, queued=b.queued(), max_queue=b.max_queue) for name, b in self.batchers.items()},
+        }
+
+    async def translate(self, payload):
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Corps JSON attendu : {\"texts\": [...]} ou {\"text\": \"...\"}")
+        texts = payload.get('texts')
+        if texts is None and 'text' in payload:
+            texts = [payload['text']]
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise RequestError(400, "'texts' doit être une liste de chaînes")
+        name = payload.get('model') or self.default_model
+        batcher = self.batchers.get(name)
+        if batcher is None:
+            raise RequestError(404, f"Modèle inconnu : {name}")
+        if len(texts) > self.max_queue:
+            raise RequestError(413, f"{len(texts)} phrases : au plus {self.max_queue} par requête")
+        t0 = time.perf_counter()
+        translations = await batcher.submit(texts) if texts else []
+        metrics.observe('server_request_latency_seconds', time.perf_counter() - t0, model=name)
+        return {'model': name, 'translations': translations}
+
+    async def _dispatch(self, method, path, body):
+        if path == '/health':
+            return 200, self.health()
+        if path != '/translate':
+            raise RequestError(404, f"Route inconnue : {path}")
+        if method != 'POST':
+            raise RequestError(405, "POST attendu")
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(400, "JSON invalide")
+        return 200, await self.translate(payload)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await read_http_message(reader, request=True)
+                if request is None:
+                    break
+                (method, path), headers, body = request
+                try:
+                    status, payload = await self._dispatch(method, path, body)
+                except RequestError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except ServerBusy as e:
+                    status, payload = 503, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except RequestError as e:
+            writer.write(http_response(e.status, {'error': str(e)}, keep_alive=False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def read_http_message(reader, request=True):
+    """Lit une requête ((méthode, chemin), en-têtes, corps) ou une réponse (statut, en-têtes, corps) ; None en fin de connexion."""
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) < 2:
+        raise RequestError(400, "Ligne de requête invalide")
+    start = (parts[0].upper(), parts[1].split('?')[0]) if request else int(parts[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"Corps de {length} octets : au plus {MAX_BODY_BYTES}")
+    body = await reader.readexactly(length) if length else b''
+    return start, headers, body
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if status == 503:
+        head.append("Retry-After: 1")
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+class ServerClient:
+    """Client du serveur sur une connexion persistante : `await client.translate([...])`."""
+
+    def __init__(self, host='127.0.0.1', port=8765, unix_socket=None):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        if self.unix_socket:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.unix_socket)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def request(self, method, path, payload=None):
+        """Retourne (statut HTTP, réponse JSON)."""
+        if self._writer is None:
+            await self.connect()
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        self._writer.write(head.encode('latin-1') + body)
+        await self._writer.drain()
+        response = await read_http_message(self._reader, request=False)
+        if response is None:
+            raise ConnectionError("Connexion fermée par le serveur")
+        status, _, data = response
+        return status, json.loads(data or b'null')
+
+    async def translate(self, texts, model=None):
+        status, data = await self.request('POST', '/translate', {'texts': list(texts), 'model': model})
+        if status == 503:
+            raise ServerBusy(data.get('error'))
+        if status != 200:
+            raise RuntimeError(f"Erreur {status} du serveur : {data.get('error')}")
+        return data['translations']
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+async def serve(translators, host='127.0.0.1', port=8765, unix_socket=None, max_batch_size=32, max_wait_ms=10, max_queue=1024):
+    """Démarre le serveur et le fait tourner jusqu'à interruption."""
+    server = TranslationServer(translators, max_batch_size, max_wait_ms, max_queue)
+    await server.start(host, port, unix_socket)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    config = load_config()
+    server_cfg = get_server_config(config)
+    parser = argparse.ArgumentParser(prog='python -m pipeline.server', description="Serveur local de traduction (micro-batching)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_serve = sub.add_parser('serve', help='Démarre le serveur')
+    p_serve.add_argument('--host', default=server_cfg['host'])
+    p_serve.add_argument('--port', type=int, default=server_cfg['port'])
+    p_serve.add_argument('--unix-socket', default=server_cfg['unix_socket'], help='Écouter sur une socket Unix plutôt que host:port')
+    p_serve.add_argument('--max-batch-size', type=int, default=server_cfg['max_batch_size'], help='Phrases par paquet envoyé au modèle')
+    p_serve.add_argument('--max-wait-ms', type=float, default=server_cfg['max_wait_ms'], help="Attente maximale d'une phrase avant l'envoi d'un paquet incomplet")
+    p_serve.add_argument('--max-queue', type=int, default=server_cfg['max_queue'], help='Phrases en attente par modèle au-delà desquelles les requêtes sont refusées (503)')
+    p_serve.add_argument('--decoding-profile', default=None, help='Profil de décodage (défaut: config decoding_profile)')
+    p_serve.add_argument('--fp16', action='store_true')
+    p_serve.add_argument('--quantize', default=None, choices=['int8'])
+    p_serve.add_argument('--no-translation-memory', action='store_true')
+    p_translate = sub.add_parser('translate', help='Traduit des phrases via un serveur démarré')
+    p_translate.add_argument('texts', nargs='+')
+    p_translate.add_argument('--model', default=None)
+    p_translate.add_argument('--host', default=server_cfg['host'])
+    p_translate.add_argument('--port', type=int, default=server_cfg['port'])
+    p_translate.add_argument('--unix-socket', default=server_cfg['unix_socket'])
+    args = parser.parse_args(argv)
+
+    if args.command == 'translate':
+        async def translate_remote():
+            client = ServerClient(args.host, args.port, args.unix_socket)
+            try:
+                return await client.translate(args.texts, args.model)
+            finally:
+                await client.close()
+        for fr in asyncio.run(translate_remote()):
+            print(fr)
+        return 0
+
+    from datetime import datetime
+    from utils.core import setup_logger
+    from utils.metrics import start_metrics_export, stop_metrics_export
+    setup_logger('logs')
+    start_metrics_export(config, 'server_' + datetime.now().strftime('%Y%m%d_%H%M%S'))
+    translators = load_translators(config, args.fp16, args.quantize, args.decoding_profile, not args.no_translation_memory, args.max_batch_size)
+    try:
+        asyncio.run(serve(translators, args.host, args.port, args.unix_socket, args.max_batch_size, args.max_wait_ms, args.max_queue))
+    except KeyboardInterrupt:
+        log_info("[SERVEUR] Arrêt demandé.")
+    finally:
+        stop_metrics_export()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
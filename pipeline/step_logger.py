@@ -1,23 +1,55 @@
 """
 Module de logging structuré par étape et par lot.
+Les loggers sont mis en cache (un seul FileHandler par fichier) ; au-delà de MAX_OPEN_STEP_LOGGERS,
+le moins récemment utilisé est fermé pour ne pas accumuler de descripteurs de fichiers.
 """
 import logging
 import os
+import threading
+from collections import OrderedDict
 from utils.core import ensure_dir_exists
 
+MAX_OPEN_STEP_LOGGERS = 64
+
+_step_loggers = OrderedDict()
+_step_loggers_lock = threading.Lock()
+
+
 def get_step_logger(logs_dir, step_name, batch_id=None):
-    """Crée un logger structuré pour une étape et un lot donné."""
-    ensure_dir_exists(logs_dir)
+    """Crée (ou retourne depuis le cache) un logger structuré pour une étape et un lot donné."""
     log_file = f"{step_name}"
     if batch_id:
         log_file += f"_batch_{batch_id}"
     log_file += ".log"
-    log_path = os.path.join(logs_dir, log_file)
-    logger = logging.getLogger(f"{step_name}_{batch_id}")
-    handler = logging.FileHandler(log_path)
-    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
-    handler.setFormatter(formatter)
-    if not logger.hasHandlers():
+    log_path = os.path.abspath(os.path.join(logs_dir, log_file))
+    with _step_loggers_lock:
+        logger = _step_loggers.get(log_path)
+        if logger is not None:
+            _step_loggers.move_to_end(log_path)
+            return logger
+        ensure_dir_exists(logs_dir)
+        logger = logging.getLogger(f"{step_name}_{batch_id}")
+        _close_handlers(logger)
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
         logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
+        logger.setLevel(logging.INFO)
+        _step_loggers[log_path] = logger
+        while len(_step_loggers) > MAX_OPEN_STEP_LOGGERS:
+            _, evicted = _step_loggers.popitem(last=False)
+            _close_handlers(evicted)
     return logger
+
+
+def close_step_loggers():
+    """Ferme les fichiers de tous les loggers d'étape (fin d'exécution)."""
+    with _step_loggers_lock:
+        for logger in _step_loggers.values():
+            _close_handlers(logger)
+        _step_loggers.clear()
+
+
+def _close_handlers(logger):
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
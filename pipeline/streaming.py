@@ -0,0 +1,268 @@
+"""
+Traduction en flux continu sur l'ensemble des lots à traiter.
+Trois étapes reliées par des files bornées :
+- lecteur : prétraite chaque lot EN et pousse ses phrases dans la file d'entrée
+- modèle : traduit les phrases par paquets, sans attendre les frontières de fichiers
+- écrivain : regroupe les traductions par lot, écrit le fr_batch_*.parquet et met à jour le statut
+Filtre de lignes (selection) : seules les lignes retenues de chaque lot entrent dans le flux.
+"""
+import os
+import queue
+import threading
+from utils.core import log_info, log_error, log_execution_time
+from utils.config_loader import load_config
+
+from utils.meta_utils import update_batch_status, claim_batch
+
+_END = object()
+
+
+class _PendingBatch:
+    """Traductions en attente d'un lot EN (remplies dans le désordre par l'étape modèle)."""
+
+    def __init__(self, batch_id, batch_path, df, checkpoint=None, rows=None):
+        self.batch_id = batch_id
+        self.batch_path = batch_path
+        self.df = df
+        self.checkpoint = checkpoint
+        self.rows = rows
+        # Position de chaque phrase dans le lot (clé des points de reprise)
+        self.positions = df.index.tolist()
+        n = len(df)
+        self.fr = [None] * n
+        self.remaining = n
+        self.failures = []
+        if checkpoint is not None:
+            # Reprise : phrases déjà traduites avant l'interruption du flux
+            local = {position: i for i, position in enumerate(self.positions)}
+            for position, fr in checkpoint.load().items():
+                idx = local.get(position)
+                if idx is not None and self.fr[idx] is None:
+                    self.fr[idx] = fr
+                    self.remaining -= 1
+
+
+def _read_stage(batch_items, meta_path, sentence_queue, pending, pending_lock, done_queue, make_checkpoint=None, load_tokens=None, selection=None):
+    """
+    Lit les lots un par un et pousse leurs phrases restant à traduire (batch_id, index, texte, longueur, input_ids).
+    load_tokens(chemin du lot, phrases) : tokens pré-calculés du lot ou None (longueur estimée, input_ids None).
+    selection : {batch_id: positions des lignes à traduire} (filtre de lignes).
+    """
+    from pipeline.preprocessing import preprocess_batch
+    from pipeline.batching import estimate_token_lengths
+    try:
+        for batch_id, batch_path in batch_items:
+            batch_name = os.path.basename(batch_path)
+            if not claim_batch(meta_path, batch_id):
+                log_info(f"[STREAM] Lot {batch_id} déjà pris par un autre worker, ignoré.")
+                continue
+            rows = (selection or {}).get(batch_id)
+            try:
+                df = preprocess_batch(batch_name, rows=rows)
+                sentences = df['en'].tolist()
+                # Lot filtré : le fichier annexe des tokens couvre tout le lot, longueurs estimées
+                token_ids = load_tokens(batch_path, sentences) if load_tokens and rows is None else None
+                if token_ids is not None:
+                    input_ids, lengths = token_ids
+                    df['nb_tokens'] = lengths
+                else:
+                    input_ids = [None] * len(sentences)
+                    lengths = estimate_token_lengths(
+                        sentences,
+                        nb_words=df['nb_words'].tolist() if 'nb_words' in df.columns else None,
+                        nb_chars=df['nb_chars'].tolist() if 'nb_chars' in df.columns else None
+                    )
+            except Exception as e:
+                update_batch_status(meta_path, batch_id, 'erreur')
+                log_error(f"[STREAM] Erreur de lecture du lot {batch_id}", exc=e)
+                continue
+            entry = _PendingBatch(batch_id, batch_path, df, make_checkpoint(batch_id) if make_checkpoint else None, rows)
+            if entry.remaining == 0:
+                done_queue.put(entry)
+                continue
+            if entry.remaining < len(sentences):
+                log_info(f"[REPRISE] Lot {batch_id} : {len(sentences) - entry.remaining} phrase(s) déjà traduite(s), {entry.remaining} restante(s)")
+            with pending_lock:
+                pending[batch_id] = entry
+            for idx, (text, length, ids) in enumerate(zip(sentences, lengths, input_ids)):
+                if entry.fr[idx] is None:
+                    sentence_queue.put((batch_id, idx, text, length, ids))
+    finally:
+        sentence_queue.put(_END)
+
+
+def _collect_chunk(sentence_queue, chunk_size):
+    """Récupère jusqu'à chunk_size phrases : attend la première, puis prend ce qui est déjà disponible."""
+    items = []
+    finished = False
+    item = sentence_queue.get()
+    while True:
+        if item is _END:
+            finished = True
+            break
+        items.append(item)
+        if len(items) >= chunk_size:
+            break
+        try:
+            item = sentence_queue.get_nowait()
+        except queue.Empty:
+            break
+    return items, finished
+
+
+def _write_stage(done_queue, meta_path, stop_after, decoding_name=None, decoding=None):
+    """Écrit chaque lot dès que toutes ses phrases sont traduites, puis met à jour son statut."""
+    from pipeline.batch_generation_fr import generate_fr_batch
+    from pipeline.translation import record_batch_failures
+    from pipeline.row_filter import selection_status
+    while True:
+        entry = done_queue.get()
+        if entry is _END:
+            return
+        batch_name = os.path.basename(entry.batch_path)
+        try:
+            df = entry.df
+            df['fr'] = entry.fr
+            record_batch_failures(entry.batch_path, df, entry.failures)
+            generate_fr_batch(entry.batch_path, entry.fr, df=df, decoding_profile=decoding_name, decoding_params=decoding)
+            if stop_after != 'translation':
+                try:
+                    from pipeline.postprocessing import postprocess_batch
+                    df = postprocess_batch(batch_name, df=df)
+                except ImportError:
+                    pass
+            if stop_after not in ('translation', 'postprocessing'):
+                try:
+                    from pipeline.analysis import analyze_batch
+                    analyze_batch(batch_name, df=df)
+                except ImportError:
+                    pass
+            # Lot filtré : points de reprise conservés pour la traduction complète ultérieure
+            if entry.checkpoint is not None and entry.rows is None:
+                entry.checkpoint.clear()
+            update_batch_status(meta_path, entry.batch_id, *selection_status(entry.rows))
+            log_info(f"[STREAM] Lot {entry.batch_id} traduit et écrit.")
+        except Exception as e:
+            update_batch_status(meta_path, entry.batch_id, 'erreur')
+            log_error(f"[STREAM] Erreur d'écriture du lot {entry.batch_id}", exc=e)
+
+
+@log_execution_time('Traduction en flux')
+def translate_stream(batch_items, meta_path, batch_size_model=32, monitoring_frequency=1, alert_ram=90, alert_gpu=90, alert_time=10, fp16=False, batching=None, max_tokens=None, stop_after=None, chunk_size=None, queue_size=None, translation_memory=True, quantize=None, decoding_profile=None, selection=None):
+    """
+    Traduit tous les lots de batch_items [(batch_id, chemin du lot EN), ...] comme un seul flux de phrases.
+    Le modèle traite des paquets de chunk_size phrases qui peuvent chevaucher plusieurs lots.
+    selection : {batch_id: positions des lignes à traduire} (filtre de lignes), lots entiers par défaut.
+    """
+    from pipeline.model_pool import get_model_pool
+    from pipeline.translation_memory import get_translation_memory
+    from pipeline.translation import translate_sentences, get_model_path, get_engine, get_checkpoint
+    from pipeline.pretokenize import read_batch_token_ids
+    from pipeline.decoding import get_decoding_profile
+    from utils.core import get_best_device
+    config = load_config()
+    stream_cfg = config.get('streaming') or {}
+    chunk_size = chunk_size or stream_cfg.get('chunk_size', 256)
+    queue_size = queue_size or stream_cfg.get('queue_size', 4096)
+    batching = batching or config.get('batching_mode', 'fixed')
+    max_tokens = max_tokens or config.get('max_batch_tokens', 4096)
+
+    model_info = config['models'][0]
+    model_path = get_model_path(model_info)
+    device = get_best_device(config.get('device', 'cpu'))
+    decoding_name, decoding = get_decoding_profile(config, decoding_profile)
+    backend, precision, generation_params = get_engine(model_info, device, fp16, quantize, decoding)
+    memory = get_translation_memory(config, model_info, precision, generation_params) if translation_memory else None
+    log_info(f"[STREAM] {len(batch_items)} lot(s) en flux, paquets de {chunk_size} phrases, file de {queue_size} phrases, profil de décodage {decoding_name}.")
+
+    sentence_queue = queue.Queue(maxsize=queue_size)
+    done_queue = queue.Queue(maxsize=max(2, queue_size // max(chunk_size, 1)))
+    pending = {}
+    pending_lock = threading.Lock()
+
+    def make_checkpoint(batch_id):
+        return get_checkpoint(batch_id, model_info, precision, generation_params)
+
+    def load_tokens(batch_path, sentences):
+        return read_batch_token_ids(batch_path, sentences, model_path, config)
+
+    reader = threading.Thread(target=_read_stage, args=(batch_items, meta_path, sentence_queue, pending, pending_lock, done_queue, make_checkpoint, load_tokens, selection), name='stream-reader', daemon=True)
+    writer = threading.Thread(target=_write_stage, args=(done_queue, meta_path, stop_after, decoding_name, decoding), name='stream-writer', daemon=True)
+    reader.start()
+    writer.start()
+
+    n_sentences = 0
+    finished = False
+    try:
+        with get_model_pool(config).acquire(model_path, device, precision, model_info['name'], backend) as entry:
+            while not finished:
+                items, finished = _collect_chunk(sentence_queue, chunk_size)
+                if not items:
+                    continue
+                failures = []
+
+                def progress(indices, fr_texts, items=items):
+                    # Points de reprise regroupés par lot d'origine
+                    by_batch = {}
+                    for i, fr in zip(indices, fr_texts):
+                        batch_id, idx = items[i][0], items[i][1]
+                        by_batch.setdefault(batch_id, ([], []))
+                        by_batch[batch_id][0].append(idx)
+                        by_batch[batch_id][1].append(fr)
+                    for batch_id, (idxs, frs) in by_batch.items():
+                        with pending_lock:
+                            batch_entry = pending.get(batch_id)
+                        if batch_entry is not None and batch_entry.checkpoint is not None:
+                            batch_entry.checkpoint.save([batch_entry.positions[i] for i in idxs], frs)
+
+                # Tokens pré-calculés seulement si tout le paquet en dispose
+                input_ids = [item[4] for item in items]
+                if any(ids is None for ids in input_ids):
+                    input_ids = None
+                fr_texts = translate_sentences(
+                    [item[2] for item in items],
+                    entry.tokenizer,
+                    entry.model,
+                    device,
+                    batch_size_model=batch_size_model,
+                    monitoring_frequency=monitoring_frequency,
+                    alert_ram=alert_ram,
+                    alert_gpu=alert_gpu,
+                    alert_time=alert_time,
+                    batching=batching,
+                    max_tokens=max_tokens,
+                    lengths=[item[3] for item in items],
+                    memory=memory,
+                    decoding=decoding,
+                    failures=failures,
+                    progress=progress,
+                    input_ids=input_ids
+                )
+                n_sentences += len(items)
+                failed = {f['index']: f for f in failures}
+                # Remise des traductions à leur lot ; un lot complet part à l'écriture
+                for pos, ((batch_id, idx, *_), fr_text) in enumerate(zip(items, fr_texts)):
+                    with pending_lock:
+                        batch_entry = pending[batch_id]
+                        batch_entry.fr[idx] = fr_text
+                        if pos in failed:
+                            batch_entry.failures.append(dict(failed[pos], index=idx))
+                        batch_entry.remaining -= 1
+                        complete = batch_entry.remaining == 0
+                        if complete:
+                            del pending[batch_id]
+                    if complete:
+                        done_queue.put(batch_entry)
+    finally:
+        # En cas d'arrêt de l'étape modèle, vide la file pour débloquer le lecteur
+        while not finished:
+            finished = sentence_queue.get() is _END
+        reader.join()
+        done_queue.put(_END)
+        writer.join()
+        if pending:
+            log_error(f"[STREAM] Lots incomplets en fin de flux : {sorted(pending)}")
+            for batch_id in pending:
+                update_batch_status(meta_path, batch_id, 'erreur')
+    log_info(f"[STREAM] Flux terminé : {n_sentences} phrases traduites.")
+    return n_sentences
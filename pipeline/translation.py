@@ -1,47 +1,496 @@
 """
 Module de traduction pour la pipeline de traduction.
-Utilise la configuration centralisée.
+Utilise la configuration centralisée (lue à l'appel, pas à l'import) ;
+torch n'est importé qu'au premier besoin (chargement du modèle, FP16).
 """
 import os
-import pandas as pd
-from transformers import MarianMTModel, MarianTokenizer
-from utils.core import log_info, log_error, ensure_dir_exists, log_execution_time
+import sys
+from utils.core import log_info, log_error, log_execution_time
+from utils.batch_store import read_batch_columns
 from utils.config_loader import load_config, get_abs_path_from_config
+from pipeline.model_pool import get_model_pool
+from pipeline.batching import build_batches, estimate_token_lengths, padding_stats, get_batch_controller
+from pipeline.translation_memory import get_translation_memory
+from pipeline.backends import get_backend
+from pipeline.decoding import get_decoding_profile, build_generate_kwargs
+from utils import metrics
 import psutil
 import traceback
 import time
-try:
-    import torch
-except ImportError:
-    torch = None
+from itertools import islice
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
-config = load_config()
+# Étages d'un sous-batch (durées cumulées dans le rapport monitoring et translation_stage_seconds) ;
+# *_wait : attente du thread principal sur un étage exécuté par un thread annexe
+STAGES = ('tokenize', 'tokenize_wait', 'generate', 'decode', 'decode_wait')
+
+
+def get_torch(load=False):
+    """Module torch s'il est déjà importé (load=True : l'importe au besoin), None sinon ou s'il n'est pas installé."""
+    torch = sys.modules.get('torch')
+    if torch is None and load:
+        try:
+            import torch
+        except ImportError:
+            return None
+    return torch
+
+
+def get_model_path(model_info):
+    """Chemin absolu du snapshot local d'un modèle de la config."""
+    model_dir = get_abs_path_from_config(load_config(), 'models_dir')
+    return os.path.join(model_dir, model_info['path'])
+
+
+def get_precision(device, fp16=False, quantize=None, backend='torch'):
+    """Mode de précision effectif : int8 (quantification dynamique) uniquement sur CPU, FP16 uniquement sur GPU, FP32 sinon."""
+    if backend != 'torch':
+        # Les autres moteurs (onnx) tournent en FP32
+        return 'fp32'
+    if quantize:
+        if str(device) == 'cpu':
+            return quantize
+        log_info(f"Quantification {quantize} ignorée sur {device} (CPU uniquement).")
+    torch = get_torch(load=fp16)
+    if fp16 and torch and str(device).startswith('cuda') and torch.cuda.is_available():
+        return 'fp16'
+    return 'fp32'
+
+
+def get_engine(model_info, device, fp16=False, quantize=None, decoding=None):
+    """
+    Moteur et précision effectifs d'un modèle : retourne (backend, precision, generation_params),
+    generation_params (moteur, profil de décodage) complétant la clé de la mémoire de traduction.
+    """
+    backend = get_backend(model_info)
+    precision = get_precision(device, fp16, quantize or load_config().get('quantize'), backend)
+    generation_params = {'decoding': decoding} if decoding else {}
+    if backend != 'torch':
+        generation_params['backend'] = backend
+    return backend, precision, generation_params or None
+
+
+def preload_model(fp16=False, quantize=None):
+    """Charge le modèle de traduction dans le pool du processus (ex. au démarrage d'un worker)."""
+    from utils.core import get_best_device
+    config = load_config()
+    model_info = config['models'][0]
+    device = get_best_device(config.get('device', 'cpu'))
+    pool = get_model_pool(config)
+    backend, precision, _ = get_engine(model_info, device, fp16, quantize)
+    pool.release(pool.get(get_model_path(model_info), device, precision, model_info['name'], backend))
+
+
+def is_oom_error(exc):
+    """Saturation mémoire GPU/CPU (OutOfMemoryError, MemoryError ou RuntimeError 'out of memory')."""
+    if isinstance(exc, MemoryError):
+        return True
+    torch = get_torch()
+    if torch and isinstance(exc, getattr(torch.cuda, 'OutOfMemoryError', ())):
+        return True
+    return isinstance(exc, RuntimeError) and 'out of memory' in str(exc).lower()
+
+
+def get_memory_pct(device):
+    """Mémoire utilisée (%) sur le device : GPU si cuda, RAM sinon."""
+    try:
+        torch = get_torch()
+        if torch and str(device).startswith('cuda') and torch.cuda.is_available():
+            return 100 * torch.cuda.memory_allocated() / torch.cuda.get_device_properties(0).total_memory
+        return psutil.virtual_memory().percent
+    except Exception:
+        return None
+
+
+def get_overlap_config(config):
+    return dict({'enabled': 'auto', 'prefetch': 2}, **(config.get('translation_overlap') or {}))
+
+
+def overlap_enabled(overlap):
+    """Étages sur threads annexes : enabled true/false, ou auto (seulement avec plus d'un CPU disponible)."""
+    if overlap['enabled'] == 'auto':
+        from pipeline.parallel import get_available_cpus
+        return len(get_available_cpus()) > 1
+    return bool(overlap['enabled'])
+
+
+def submit_stage(pool, fn, *args):
+    """Exécute fn sur le thread de l'étage, ou immédiatement (Future déjà résolue) sans thread annexe."""
+    if pool is not None:
+        return pool.submit(fn, *args)
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def format_stage_times(stage_times, threaded=True):
+    """Ligne du rapport monitoring : durée cumulée par étage, attente du thread principal entre parenthèses."""
+    line = (f"Étages : tokenisation {stage_times['tokenize']:.2f}s, generate {stage_times['generate']:.2f}s, "
+            f"décodage {stage_times['decode']:.2f}s")
+    if threaded:
+        line += f" (attente tokenisation {stage_times['tokenize_wait']:.2f}s, décodage {stage_times['decode_wait']:.2f}s ; étages recouverts)"
+    return line
+
+
+def translate_sentences(en_sentences, tokenizer, model, device, batch_size_model=32, monitoring_frequency=1, alert_ram=90, alert_gpu=90, alert_time=10, batching='fixed', max_tokens=None, lengths=None, memory=None, decoding=None, failures=None, progress=None, input_ids=None, overlap=None):
+    """
+    Traduit une liste de phrases par sous-batchs et retourne les traductions (même ordre).
+    - batching='fixed' : sous-batchs de batch_size_model phrases dans l'ordre d'origine
+    - batching='token_budget' : phrases triées par longueur (lengths, estimées si absentes),
+      sous-batchs bornés à max_tokens tokens paddés, ordre d'origine restauré en sortie
+    - memory : mémoire de traduction ; les doublons et les phrases déjà traduites ne passent pas par le modèle
+    - decoding : profil de décodage (pipeline.decoding), sinon paramètres par défaut du modèle
+    - failures : liste complétée par {'index', 'en', 'error'} pour chaque phrase en échec
+    - progress : appelée avec (indices, traductions) après chaque sous-batch traduit (points de reprise)
+    - input_ids : identifiants de tokens pré-calculés (pipeline.pretokenize) ; les sous-batchs sont alors
+      simplement paddés, sans retokenisation
+    - overlap : réglages des étages recouverts ({'enabled', 'prefetch'}) ; à défaut, section
+      translation_overlap de la config
+
+    Un sous-batch en erreur est coupé en deux et relancé jusqu'à isoler les phrases fautives ;
+    une phrase qui échoue seule vaut None dans le résultat (jamais une chaîne vide).
+    Après une saturation mémoire, la taille des sous-batchs est réduite pour la suite de l'exécution
+    (contrôleur adaptatif, section adaptive_batching de la config).
+    Tokenisation du sous-batch suivant et décodage du précédent tournent sur des threads annexes pendant
+    le generate du sous-batch courant (section translation_overlap de la config).
+    """
+    if failures is None:
+        failures = []
+    if memory is not None:
+        keys = [memory.make_key(s) for s in en_sentences]
+        known = memory.get_many(set(keys))
+        # Une seule traduction par phrase source inconnue (déduplication dans le lot)
+        first_pos = {}
+        for pos, key in enumerate(keys):
+            if key not in known and key not in first_pos:
+                first_pos[key] = pos
+        todo = list(first_pos.values())
+        hits = len(en_sentences) - sum(1 for k in keys if k not in known)
+        metrics.inc('translation_memory_lookups_total', len(en_sentences))
+        metrics.inc('translation_memory_hits_total', hits)
+        log_info(f"[TM] {len(en_sentences)} phrases : {hits} en mémoire, {len(todo)} unique(s) à traduire", throttle=True)
+        errors = {}
+        if todo:
+            todo_failures = []
+            todo_progress = None
+            if progress is not None:
+                # Une traduction vaut pour toutes les occurrences de la phrase dans le lot
+                positions = {}
+                for pos, key in enumerate(keys):
+                    positions.setdefault(key, []).append(pos)
+
+                def todo_progress(indices, fr_texts):
+                    expanded = [(pos, fr) for i, fr in zip(indices, fr_texts) for pos in positions[keys[todo[i]]]]
+                    progress([pos for pos, _ in expanded], [fr for _, fr in expanded])
+            fr_texts = translate_sentences(
+                [en_sentences[p] for p in todo], tokenizer, model, device,
+                batch_size_model=batch_size_model,
+                monitoring_frequency=monitoring_frequency,
+                alert_ram=alert_ram,
+                alert_gpu=alert_gpu,
+                alert_time=alert_time,
+                batching=batching,
+                max_tokens=max_tokens,
+                lengths=[lengths[p] for p in todo] if lengths is not None else None,
+                decoding=decoding,
+                failures=todo_failures,
+                progress=todo_progress,
+                input_ids=[input_ids[p] for p in todo] if input_ids is not None else None,
+                overlap=overlap
+            )
+            # Les échecs ne sont pas mémorisés
+            memory.put_many({keys[p]: (en_sentences[p], fr) for p, fr in zip(todo, fr_texts) if fr is not None})
+            known.update({keys[p]: fr for p, fr in zip(todo, fr_texts)})
+            errors = {keys[todo[f['index']]]: f['error'] for f in todo_failures}
+        for pos, key in enumerate(keys):
+            if key in errors:
+                failures.append({'index': pos, 'en': en_sentences[pos], 'error': errors[key]})
+        return [known[key] for key in keys]
 
-@log_execution_time('Traduction')
-def translate_batch(batch_name, batch_size_model=32, monitoring_frequency=1, alert_ram=90, alert_gpu=90, alert_time=10, fp16=False):
     monitoring_stats = {
         'ram_used_mb': [],
         'ram_total_mb': [],
         'gpu_used_mb': [],
         'gpu_total_mb': [],
         'batch_times': [],
-        'num_batches': 0
+        'num_batches': 0,
+        'real_tokens': 0,
+        'padded_tokens': 0,
+        'stage_times': dict.fromkeys(STAGES, 0.0)
     }
+    if batching == 'token_budget' and lengths is None:
+        lengths = [len(ids) for ids in input_ids] if input_ids is not None else estimate_token_lengths(en_sentences)
+    torch = get_torch()
+    config = load_config()
+    controller = get_batch_controller(config)
+    size_limit, token_limit = controller.limits(batch_size_model, max_tokens) if controller else (batch_size_model, max_tokens)
+    pending = deque(build_batches(len(en_sentences), batching, size_limit, lengths, token_limit))
+    translations = [None] * len(en_sentences)
+    if batching == 'token_budget':
+        log_info(f"Traduction par batchs triés par longueur, budget {token_limit} tokens paddés ({len(pending)} sous-batchs, total: {len(en_sentences)} phrases)", throttle=True)
+    else:
+        log_info(f"Traduction par batchs de taille {size_limit} (total: {len(en_sentences)} phrases)", throttle=True)
+
+    # Trois étages : tokenisation des sous-batchs suivants et décodage des précédents sur des threads
+    # annexes pendant le generate du sous-batch courant (au plus prefetch sous-batchs d'avance / en attente)
+    overlap = dict(get_overlap_config(config), **(overlap or {}))
+    prefetch = max(int(overlap['prefetch']), 1)
+    threaded = len(pending) > 1 and overlap_enabled(overlap)
+    tokenize_pool = ThreadPoolExecutor(1, thread_name_prefix='tokenize') if threaded else None
+    decode_pool = ThreadPoolExecutor(1, thread_name_prefix='decode') if threaded else None
+    prepared = {}  # sous-batch (tuple d'indices) -> Future (inputs, durée)
+    to_decode = deque()  # (n° de sous-batch, indices, Future (traductions, durée))
+    stage_times = monitoring_stats['stage_times']
+
+    def tokenize(indices):
+        t = time.perf_counter()
+        if input_ids is not None:
+            inputs = tokenizer.pad({'input_ids': [input_ids[j] for j in indices]}, return_tensors="pt")
+        else:
+            inputs = tokenizer([en_sentences[j] for j in indices], return_tensors="pt", padding=True, truncation=True)
+        return inputs, time.perf_counter() - t
+
+    def decode(translated):
+        t = time.perf_counter()
+        return tokenizer.batch_decode(translated, skip_special_tokens=True), time.perf_counter() - t
+
+    def record_stage(stage, seconds):
+        stage_times[stage] += seconds
+        metrics.observe('translation_stage_seconds', seconds, stage=stage)
+
+    def handle_error(batch_num, indices, e):
+        if is_oom_error(e):
+            log_error(f"OOM GPU/CPU sur le batch {batch_num} ({len(indices)} phrases)", exc=e)
+            metrics.inc('oom_total')
+            if controller:
+                controller.record_oom()
+            if torch and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        else:
+            log_error(f"Erreur de traduction pour le batch {batch_num} ({len(indices)} phrases)", exc=e)
+            log_error(traceback.format_exc())
+        if len(indices) > 1:
+            # Découpage en deux et nouvel essai, jusqu'à isoler les phrases en échec
+            half = len(indices) // 2
+            pending.appendleft(indices[half:])
+            pending.appendleft(indices[:half])
+            log_info(f"Sous-batch {batch_num} découpé en {half} + {len(indices) - half} phrases et relancé.", throttle=True)
+        else:
+            failures.append({'index': indices[0], 'en': en_sentences[indices[0]], 'error': f"{type(e).__name__}: {e}"})
+            metrics.inc('translation_failures_total')
+            log_error(f"Phrase en échec (index {indices[0]}) : {en_sentences[indices[0]][:80]}")
+
+    def finish_decode():
+        """Récupère le décodage le plus ancien (ordre des sous-batchs) et enregistre ses traductions."""
+        batch_num, indices, future = to_decode.popleft()
+        t = time.perf_counter()
+        try:
+            fr_texts, decode_time = future.result()
+            record_stage('decode_wait', time.perf_counter() - t)
+            record_stage('decode', decode_time)
+            for j, fr_text in zip(indices, fr_texts):
+                translations[j] = fr_text
+            if progress is not None:
+                progress(indices, fr_texts)
+            metrics.inc('sentences_translated_total', len(indices))
+        except Exception as e:
+            handle_error(batch_num, indices, e)
+
+    batch_num = 0
+    try:
+        while pending or to_decode:
+            if not pending:
+                # Plus rien à générer : décodages restants (un échec peut remettre des sous-batchs dans pending)
+                finish_decode()
+                continue
+            indices = pending.popleft()
+            # Taille réduite entre-temps par le contrôleur : redécoupage du sous-batch avant envoi
+            if controller and len(indices) > 1:
+                size_limit, token_limit = controller.limits(batch_size_model, max_tokens)
+                sub_lengths = [lengths[j] for j in indices] if lengths is not None else None
+                too_big = len(indices) > size_limit or (batching == 'token_budget' and max(sub_lengths) * len(indices) > token_limit)
+                if too_big:
+                    parts = build_batches(len(indices), batching, size_limit, sub_lengths, token_limit)
+                    pending.extendleft(reversed([[indices[k] for k in part] for part in parts]))
+                    continue
+            batch_num += 1
+            t0 = time.perf_counter()
+            future = prepared.pop(tuple(indices), None) or submit_stage(tokenize_pool, tokenize, indices)
+            if tokenize_pool is not None:
+                # Tokenisation des sous-batchs suivants pendant ce generate ; les préparations devenues
+                # inutiles (redécoupage, échec) sont abandonnées
+                upcoming = [tuple(nxt) for nxt in islice(pending, prefetch)]
+                for key in [k for k in prepared if k not in upcoming]:
+                    prepared.pop(key).cancel()
+                for key in upcoming:
+                    if key not in prepared:
+                        prepared[key] = tokenize_pool.submit(tokenize, list(key))
+            try:
+                t_wait = time.perf_counter()
+                inputs, tokenize_time = future.result()
+                record_stage('tokenize_wait', time.perf_counter() - t_wait)
+                record_stage('tokenize', tokenize_time)
+                real_tokens, padded_tokens = padding_stats(inputs['attention_mask'])
+                monitoring_stats['real_tokens'] += real_tokens
+                monitoring_stats['padded_tokens'] += padded_tokens
+                inputs = {k: v.to(device) for k, v in inputs.items()}
+                t_generate = time.perf_counter()
+                translated = model.generate(**inputs, **build_generate_kwargs(decoding, inputs['input_ids'].shape[1]))
+                record_stage('generate', time.perf_counter() - t_generate)
+                to_decode.append((batch_num, indices, submit_stage(decode_pool, decode, translated)))
+                if controller:
+                    controller.record_success(get_memory_pct(device))
+                metrics.inc('tokens_real_total', real_tokens)
+                metrics.inc('tokens_padded_total', padded_tokens)
+                metrics.set_gauge('padding_efficiency', real_tokens / max(padded_tokens, 1))
+                if (monitoring_stats['num_batches'] % monitoring_frequency) == 0:
+                    log_info(f"Batch traduit : {len(indices)} phrases (efficacité padding {real_tokens / max(padded_tokens, 1):.1%}).", throttle=True)
+            except Exception as e:
+                handle_error(batch_num, indices, e)
+            # Au plus prefetch sous-batchs en attente de décodage
+            while len(to_decode) > (prefetch if decode_pool is not None else 0):
+                finish_decode()
+            batch_time = time.perf_counter() - t0
+            monitoring_stats['batch_times'].append(batch_time)
+            monitoring_stats['num_batches'] += 1
+            metrics.observe('sub_batch_latency_seconds', batch_time)
+            metrics.inc('sub_batches_total')
+            # Monitoring/logs moins fréquents
+            if (monitoring_stats['num_batches'] % monitoring_frequency) == 0:
+                ram = psutil.virtual_memory()
+                ram_used = ram.used // 1024 // 1024
+                ram_total = ram.total // 1024 // 1024
+                ram_pct = 100 * ram_used / ram_total
+                monitoring_stats['ram_used_mb'].append(ram_used)
+                monitoring_stats['ram_total_mb'].append(ram_total)
+                metrics.set_gauge('ram_used_mb', ram_used)
+                if ram_pct > alert_ram:
+                    metrics.inc('alerts_total', kind='ram')
+                    log_error(f"ALERTE: RAM utilisée {ram_pct:.1f}% > seuil {alert_ram}%")
+                if torch and torch.cuda.is_available():
+                    try:
+                        gpu_mem = torch.cuda.memory_allocated() // 1024 // 1024
+                        gpu_total = torch.cuda.get_device_properties(0).total_memory // 1024 // 1024
+                        gpu_pct = 100 * gpu_mem / gpu_total
+                        monitoring_stats['gpu_used_mb'].append(gpu_mem)
+                        monitoring_stats['gpu_total_mb'].append(gpu_total)
+                        metrics.set_gauge('gpu_used_mb', gpu_mem)
+                        log_info(f"GPU: {gpu_mem}MB / {gpu_total}MB", throttle=True)
+                        if gpu_pct > alert_gpu:
+                            metrics.inc('alerts_total', kind='gpu')
+                            log_error(f"ALERTE: GPU utilisé {gpu_pct:.1f}% > seuil {alert_gpu}%")
+                    except Exception as e:
+                        log_error("Erreur monitoring GPU", exc=e)
+                log_info(f"RAM: {ram_used}MB / {ram_total}MB", throttle=True)
+                log_info(f"Lots traités: {monitoring_stats['num_batches']} (restants : {len(pending)})", throttle=True)
+                if len(monitoring_stats['batch_times']) >= 2:
+                    avg_time = sum(monitoring_stats['batch_times'])/len(monitoring_stats['batch_times'])
+                    log_info(f"Temps moyen par lot: {avg_time:.2f}s", throttle=True)
+                if batch_time > alert_time:
+                    metrics.inc('alerts_total', kind='time')
+                    log_error(f"ALERTE: Temps par lot {batch_time:.2f}s > seuil {alert_time}s")
+    finally:
+        for pool in (tokenize_pool, decode_pool):
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    if failures:
+        log_error(f"{len(failures)} phrase(s) en échec après découpage des sous-batchs")
+    # Mini-rapport monitoring à la fin
+    try:
+        log_info("--- Rapport monitoring ---")
+        log_info(f"RAM max utilisée: {max(monitoring_stats['ram_used_mb'])}MB / {monitoring_stats['ram_total_mb'][0]}MB")
+        if monitoring_stats['gpu_used_mb']:
+            log_info(f"GPU max utilisé: {max(monitoring_stats['gpu_used_mb'])}MB / {monitoring_stats['gpu_total_mb'][0]}MB")
+        log_info(f"Temps moyen par lot: {sum(monitoring_stats['batch_times'])/len(monitoring_stats['batch_times']):.2f}s")
+        log_info(f"Nombre de lots: {monitoring_stats['num_batches']}")
+        if monitoring_stats['padded_tokens']:
+            log_info(f"Efficacité padding ({batching}): {monitoring_stats['real_tokens']}/{monitoring_stats['padded_tokens']} tokens réels/paddés ({monitoring_stats['real_tokens'] / monitoring_stats['padded_tokens']:.1%})")
+        log_info(format_stage_times(stage_times, threaded))
+    except Exception as e:
+        log_error("Erreur lors du rapport monitoring", exc=e)
+
+    return translations
+
+
+class BatchCheckpoint:
+    """Points de reprise d'un lot dans le store des statuts (traductions des sous-batchs terminés)."""
+
+    def __init__(self, store, batch_id, model_key):
+        self.store = store
+        self.batch_id = batch_id
+        self.model_key = model_key
+
+    def load(self):
+        return self.store.load_progress(self.batch_id, self.model_key)
 
+    def save(self, indices, fr_texts):
+        try:
+            self.store.save_progress(self.batch_id, zip(indices, fr_texts), self.model_key)
+        except Exception as e:
+            # Un point de reprise manqué ne doit pas interrompre la traduction
+            log_error(f"[REPRISE] Échec de l'enregistrement du point de reprise du lot {self.batch_id}", exc=e)
+
+    def clear(self):
+        self.store.clear_progress(self.batch_id)
+
+
+def get_checkpoint(batch_id, model_info, precision='fp32', generation_params=None):
+    """Points de reprise du lot (section status_store.checkpoint de la config), ou None si désactivés."""
+    config = load_config()
+    if not (config.get('status_store') or {}).get('checkpoint', True):
+        return None
+    from utils.status_store import get_status_store
+    from pipeline.translation_memory import make_model_key
+    meta_dir = get_abs_path_from_config(config, 'meta_dir')
+    if not os.path.isdir(meta_dir):
+        return None
+    meta_path = os.path.join(meta_dir, 'batch_info.parquet')
+    return BatchCheckpoint(get_status_store(meta_path), batch_id, make_model_key(model_info, precision, generation_params))
+
+
+def record_batch_failures(batch_path, df, failures):
+    """Enregistre à part les phrases en échec d'un lot (meta_dir/failed_sentences/<batch_id>.parquet)."""
+    from utils.meta_utils import record_failed_sentences
+    batch_id = os.path.basename(batch_path).replace('.parquet', '')
+    records = [{
+        'id_phrase': df['id_phrase'].iloc[f['index']] if 'id_phrase' in df.columns else None,
+        'en': f['en'],
+        'error': f['error'],
+    } for f in failures]
+    failed_path = record_failed_sentences(get_abs_path_from_config(load_config(), 'meta_dir'), batch_id, records)
+    if failed_path:
+        log_error(f"{len(records)} phrase(s) en échec dans le lot {batch_id} : {failed_path}")
+
+
+@log_execution_time('Traduction')
+def translate_batch(batch_name, df=None, batch_size_model=32, monitoring_frequency=1, alert_ram=90, alert_gpu=90, alert_time=10, fp16=False, batching=None, max_tokens=None, translation_memory=True, quantize=None, decoding_profile=None, rows=None):
+    """
+    Traduit un lot (ou ses lignes rows, filtre de lignes ; df déjà réduit à ces lignes le cas échéant),
+    écrit le lot FR et retourne le DataFrame avec la colonne 'fr'.
+    """
+    config = load_config()
     batches_dir = get_abs_path_from_config(config, 'batches_dir')
     batch_path = os.path.join(batches_dir, batch_name)
     models = config['models']
     model_info = models[0]  # Utilise le premier modèle de la liste
-    model_dir = get_abs_path_from_config(config, 'models_dir')
-    model_path = os.path.join(model_dir, model_info['path'])
+    model_path = get_model_path(model_info)
     from utils.core import get_best_device
     device_cfg = config.get('device', 'cpu')
     device = get_best_device(device_cfg)
     log_info(f"Traduction du lot : {batch_path} avec le modèle {model_info['name']}")
 
-    # Charger le batch
+    # Charger le batch, sauf s'il est transmis en mémoire par le prétraitement (colonnes utiles uniquement)
     try:
-        df = pd.read_parquet(batch_path)
+        if df is None:
+            from pipeline.preprocessing import STAGE_COLUMNS
+            df = read_batch_columns(batch_path, STAGE_COLUMNS, config)
+            if rows is not None:
+                df = df.iloc[rows].copy()
     except Exception as e:
         log_error(f"Erreur lors du chargement du batch : {batch_path}", exc=e)
         raise
@@ -50,137 +499,88 @@ def translate_batch(batch_name, batch_size_model=32, monitoring_frequency=1, ale
         log_error(f"Colonne 'en' absente dans le batch : {batch_path}")
         raise ValueError(f"Colonne 'en' absente dans le batch : {batch_path}")
 
-    # Vérifier la présence des fichiers essentiels du modèle
-    import glob
-    # Recherche récursive du modèle (pytorch_model.bin ou model.safetensors)
-    def find_model_file(path):
-        for ext in ("pytorch_model.bin", "model.safetensors"):
-            found = [f for f in glob.glob(os.path.join(path, "**", ext), recursive=True)]
-            if found:
-                return found[0]
-        return None
+    # Découpage en sous-batchs : CLI, sinon config (batching_mode / max_batch_tokens)
+    batching = batching or config.get('batching_mode', 'fixed')
+    max_tokens = max_tokens or config.get('max_batch_tokens', 4096)
 
-    required_files = [
-        'config.json',
-        'tokenizer_config.json',
-        'vocab.json',
-        'source.spm',
-        'target.spm'
-    ]
-    missing = [f for f in required_files if not os.path.isfile(os.path.join(model_path, f))]
-    model_file = find_model_file(model_path)
-    if missing or not model_file:
-        missing_files = missing.copy()
-        if not model_file:
-            missing_files.append('pytorch_model.bin/model.safetensors')
-        log_error(f"Fichiers manquants dans le dossier du modèle ({model_path}) : {', '.join(missing_files)}")
-        # Crée le dossier modèle si besoin
-        from utils.core import ensure_dir_exists
-        ensure_dir_exists(model_path)
-        # Si le dossier est vide, tente de télécharger, sinon lève une exception
-        if not os.listdir(model_path):
-            try:
-                tokenizer = MarianTokenizer.from_pretrained(model_info['name'], cache_dir=model_path)
-                model = MarianMTModel.from_pretrained(model_info['name'], cache_dir=model_path)
-                model.save_pretrained(model_path)
-                tokenizer.save_pretrained(model_path)
-                log_info(f"Modèle téléchargé et sauvegardé dans {model_path}")
-            except Exception as e:
-                log_error(f"Erreur lors du téléchargement du modèle MarianMT : {model_info['name']}", exc=e)
-                raise FileNotFoundError(f"Impossible de télécharger le modèle {model_info['name']} : {e}")
-        else:
-            raise FileNotFoundError(f"Fichiers manquants dans le dossier du modèle local ({model_path}) : {', '.join(missing_files)}. Aucun téléchargement car le dossier n'est pas vide.")
-    # Charger le modèle MarianMT
-    try:
-        tokenizer = MarianTokenizer.from_pretrained(model_path)
-        model = MarianMTModel.from_pretrained(model_path)
-        if fp16 and torch and torch.cuda.is_available():
-            model = model.half()
-            log_info("Modèle chargé en mode FP16 (half-precision)")
-        model.to(device)
-    except Exception as e:
-        log_error(f"Erreur lors du chargement du modèle MarianMT : {model_path}", exc=e)
-        raise
-
-    # Traduction par batchs (tout le lot ou sous-batchs)
-    # batch_size_model est maintenant passé en argument (CLI/config)
+    # Modèle MarianMT partagé par tous les lots du processus (chargé une seule fois)
     en_sentences = df['en'].tolist()
-    translations = []
-    log_info(f"Traduction par batchs de taille {batch_size_model} (total: {len(en_sentences)} phrases)")
+    decoding_name, decoding = get_decoding_profile(config, decoding_profile)
+    log_info(f"Profil de décodage : {decoding_name} ({decoding['num_beams']} faisceau(x))")
+    backend, precision, generation_params = get_engine(model_info, device, fp16, quantize, decoding)
+    memory = get_translation_memory(config, model_info, precision, generation_params) if translation_memory else None
 
-    for i in range(0, len(en_sentences), batch_size_model):
-        batch_sents = en_sentences[i:i+batch_size_model]
-        t0 = time.time()
-        try:
-            inputs = tokenizer(batch_sents, return_tensors="pt", padding=True, truncation=True)
-            inputs = {k: v.to(device) for k, v in inputs.items()}
-            translated = model.generate(**inputs)
-            fr_texts = tokenizer.batch_decode(translated, skip_special_tokens=True)
-            translations.extend(fr_texts)
-            if (monitoring_stats['num_batches'] % monitoring_frequency) == 0:
-                log_info(f"Batch traduit : {len(batch_sents)} phrases.")
-        except RuntimeError as e:
-            if 'out of memory' in str(e).lower():
-                log_error(f"OOM GPU/CPU sur le batch {i//batch_size_model+1}", exc=e)
-            else:
-                log_error(f"Erreur critique sur le batch {i//batch_size_model+1}", exc=e)
-            log_error(traceback.format_exc())
-            translations.extend([""] * len(batch_sents))
-        except Exception as e:
-            log_error(f"Erreur de traduction pour le batch {i//batch_size_model+1}", exc=e)
-            log_error(traceback.format_exc())
-            translations.extend([""] * len(batch_sents))
-        t1 = time.time()
-        batch_time = t1 - t0
-        monitoring_stats['batch_times'].append(batch_time)
-        monitoring_stats['num_batches'] += 1
-        # Monitoring/logs moins fréquents
-        if (monitoring_stats['num_batches'] % monitoring_frequency) == 0:
-            ram = psutil.virtual_memory()
-            ram_used = ram.used // 1024 // 1024
-            ram_total = ram.total // 1024 // 1024
-            ram_pct = 100 * ram_used / ram_total
-            monitoring_stats['ram_used_mb'].append(ram_used)
-            monitoring_stats['ram_total_mb'].append(ram_total)
-            if ram_pct > alert_ram:
-                log_error(f"ALERTE: RAM utilisée {ram_pct:.1f}% > seuil {alert_ram}%")
-            if torch and torch.cuda.is_available():
-                try:
-                    gpu_mem = torch.cuda.memory_allocated() // 1024 // 1024
-                    gpu_total = torch.cuda.get_device_properties(0).total_memory // 1024 // 1024
-                    gpu_pct = 100 * gpu_mem / gpu_total
-                    monitoring_stats['gpu_used_mb'].append(gpu_mem)
-                    monitoring_stats['gpu_total_mb'].append(gpu_total)
-                    log_info(f"GPU: {gpu_mem}MB / {gpu_total}MB")
-                    if gpu_pct > alert_gpu:
-                        log_error(f"ALERTE: GPU utilisé {gpu_pct:.1f}% > seuil {alert_gpu}%")
-                except Exception as e:
-                    log_error("Erreur monitoring GPU", exc=e)
-            log_info(f"RAM: {ram_used}MB / {ram_total}MB")
-            log_info(f"Lots traités: {monitoring_stats['num_batches']} / {((len(en_sentences)-1)//batch_size_model)+1}")
-            if len(monitoring_stats['batch_times']) >= 2:
-                avg_time = sum(monitoring_stats['batch_times'])/len(monitoring_stats['batch_times'])
-                log_info(f"Temps moyen par lot: {avg_time:.2f}s")
-            if batch_time > alert_time:
-                log_error(f"ALERTE: Temps par lot {batch_time:.2f}s > seuil {alert_time}s")
+    # Reprise : seules les phrases absentes des points de reprise du lot sont traduites
+    # (points de reprise indexés par la position de la phrase dans le lot, filtre de lignes ou non)
+    batch_id = os.path.basename(batch_path).replace('.parquet', '')
+    checkpoint = get_checkpoint(batch_id, model_info, precision, generation_params)
+    translations = [None] * len(en_sentences)
+    todo = list(range(len(en_sentences)))
+    progress = None
+    if checkpoint is not None:
+        positions = df.index.tolist()
+        local = {position: i for i, position in enumerate(positions)}
+        done = checkpoint.load()
+        for idx, fr in done.items():
+            if idx in local:
+                translations[local[idx]] = fr
+        todo = [i for i in todo if translations[i] is None]
+        if done:
+            log_info(f"[REPRISE] Lot {batch_id} : {len(en_sentences) - len(todo)} phrase(s) déjà traduite(s), {len(todo)} restante(s)")
+
+        def progress(indices, fr_texts):
+            checkpoint.save([positions[todo[i]] for i in indices], fr_texts)
+
+    failures = []
+    with get_model_pool(config).acquire(model_path, device, precision, model_info['name'], backend) as entry:
+        # Tokens pré-calculés (fichier annexe du lot pour ce tokenizer) : longueurs exactes et pas de retokenisation.
+        # Lot filtré : le fichier annexe couvre tout le lot, les lignes retenues sont tokenisées à la volée
+        from pipeline.pretokenize import get_batch_token_ids
+        token_ids = get_batch_token_ids(batch_path, en_sentences, entry.tokenizer, model_path, config) if rows is None else None
+        input_ids = lengths = None
+        if token_ids is not None:
+            input_ids, lengths = token_ids
+            df['nb_tokens'] = lengths
+        elif batching == 'token_budget':
+            lengths = estimate_token_lengths(
+                en_sentences,
+                nb_words=df['nb_words'].tolist() if 'nb_words' in df.columns else None,
+                nb_chars=df['nb_chars'].tolist() if 'nb_chars' in df.columns else None
+            )
+        todo_translations = translate_sentences(
+            [en_sentences[i] for i in todo],
+            entry.tokenizer,
+            entry.model,
+            device,
+            batch_size_model=batch_size_model,
+            monitoring_frequency=monitoring_frequency,
+            alert_ram=alert_ram,
+            alert_gpu=alert_gpu,
+            alert_time=alert_time,
+            batching=batching,
+            max_tokens=max_tokens,
+            lengths=[lengths[i] for i in todo] if lengths is not None else None,
+            memory=memory,
+            decoding=decoding,
+            failures=failures,
+            progress=progress,
+            input_ids=[input_ids[i] for i in todo] if input_ids is not None else None
+        )
+    for i, fr in zip(todo, todo_translations):
+        translations[i] = fr
+    failures = [dict(f, index=todo[f['index']]) for f in failures]
+    record_batch_failures(batch_path, df, failures)
 
     # Vérifier que l'ordre est conservé et la taille correcte
     assert len(translations) == len(df), "Le nombre de traductions ne correspond pas au nombre de phrases."
     df['fr'] = translations
 
-    # Mini-rapport monitoring à la fin
-    try:
-        log_info("--- Rapport monitoring ---")
-        log_info(f"RAM max utilisée: {max(monitoring_stats['ram_used_mb'])}MB / {monitoring_stats['ram_total_mb'][0]}MB")
-        if monitoring_stats['gpu_used_mb']:
-            log_info(f"GPU max utilisé: {max(monitoring_stats['gpu_used_mb'])}MB / {monitoring_stats['gpu_total_mb'][0]}MB")
-        log_info(f"Temps moyen par lot: {sum(monitoring_stats['batch_times'])/len(monitoring_stats['batch_times']):.2f}s")
-        log_info(f"Nombre de lots: {monitoring_stats['num_batches']}")
-    except Exception as e:
-        log_error("Erreur lors du rapport monitoring", exc=e)
-
     # Générer le batch fr et le meta associé
     from pipeline.batch_generation_fr import generate_fr_batch
     en_batch_path = batch_path
     fr_sentences = df['fr'].tolist()
-    generate_fr_batch(en_batch_path, fr_sentences)
+    generate_fr_batch(en_batch_path, fr_sentences, df=df, decoding_profile=decoding_name, decoding_params=decoding)
+    # Lot filtré : points de reprise conservés, la traduction complète ultérieure repart des lignes déjà traduites
+    if checkpoint is not None and rows is None:
+        checkpoint.clear()
+    return df
@@ -0,0 +1,259 @@
+"""
+Mémoire de traduction persistante (SQLite) avec cache LRU en mémoire.
+Clé = hash(phrase source normalisée, modèle/snapshot, précision, paramètres de génération) :
+une phrase déjà traduite avec la même configuration n'est plus envoyée au modèle.
+
+Utilisation en ligne de commande :
+    python -m pipeline.translation_memory stats
+    python -m pipeline.translation_memory invalidate        # entrées d'un snapshot différent de config.yaml
+    python -m pipeline.translation_memory invalidate --all  # vide toute la mémoire
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from utils.core import log_info, ensure_dir_exists
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tm (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    model_snapshot TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tm_last_access ON tm(last_access);
+CREATE INDEX IF NOT EXISTS idx_tm_model ON tm(model_name, model_snapshot);
+"""
+
+
+def normalize_source(text):
+    """Normalisation de la phrase source : NFC, espaces de bord retirés, espaces internes fusionnés."""
+    return ' '.join(unicodedata.normalize('NFC', str(text)).split())
+
+
+def get_model_snapshot(model_info):
+    """Identifiant du snapshot d'un modèle de la config (dernier élément de son chemin)."""
+    return os.path.basename(os.path.normpath(model_info['path']))
+
+
+def make_model_key(model_info, precision='fp32', generation_params=None):
+    """Empreinte de la configuration de traduction (modèle, snapshot, précision, paramètres de génération)."""
+    payload = {
+        'name': model_info['name'],
+        'snapshot': get_model_snapshot(model_info),
+        'precision': precision,
+        'generation': generation_params or {},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class TranslationMemory:
+    """
+    Mémoire de traduction pour une configuration de modèle donnée.
+    - db_path : fichier SQLite (partagé entre configurations et entre exécutions)
+    - max_entries : nombre maximal d'entrées sur disque (éviction des moins récemment utilisées)
+    - lru_size : taille du cache en mémoire devant SQLite
+    """
+
+    def __init__(self, db_path, model_info, precision='fp32', generation_params=None, max_entries=None, lru_size=50000):
+        ensure_dir_exists(os.path.dirname(os.path.abspath(db_path)))
+        self.db_path = db_path
+        self.model_name = model_info['name']
+        self.model_snapshot = get_model_snapshot(model_info)
+        self.model_key = make_model_key(model_info, precision, generation_params)
+        self.max_entries = max_entries
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        # Nombre d'entrées, compté une fois à l'ouverture puis tenu à jour (majorant : une traduction
+        # remplacée compte comme un ajout ; recompté seulement quand il dépasse max_entries)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0] if max_entries else 0
+        self.lookups = 0
+        self.lru_hits = 0
+        self.disk_hits = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def make_key(self, text):
+        return hashlib.sha256(f"{self.model_key}\x1f{normalize_source(text)}".encode('utf-8')).hexdigest()
+
+    def _lru_put(self, key, translation):
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys):
+        """Retourne {clé: traduction} pour les clés présentes (cache LRU puis SQLite)."""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            self.lookups += len(keys)
+            missing = []
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                else:
+                    missing.append(key)
+            self.lru_hits += len(found)
+            now = time.time()
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(f"SELECT key, translation FROM tm WHERE key IN ({placeholders})", chunk).fetchall()
+                for key, translation in rows:
+                    found[key] = translation
+                    self._lru_put(key, translation)
+                self.disk_hits += len(rows)
+                if rows:
+                    self._conn.executemany("UPDATE tm SET last_access = ? WHERE key = ?", [(now, key) for key, _ in rows])
+            self._conn.commit()
+        return found
+
+    def put_many(self, entries):
+        """Enregistre {clé: (source, traduction)} et applique la limite de taille."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tm (key, source, translation, model_name, model_snapshot, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(key, source, translation, self.model_name, self.model_snapshot, now, now) for key, (source, translation) in entries.items()]
+            )
+            for key, (_, translation) in entries.items():
+                self._lru_put(key, translation)
+            self.stored += len(entries)
+            self._count += len(entries)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        if not self.max_entries or self._count <= self.max_entries:
+            return
+        # Majorant dépassé : compte exact (remplacements, ajouts d'autres processus) avant d'évincer
+        self._count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+        if self._count <= self.max_entries:
+            return
+        # Éviction par paquet (10 % sous la limite) pour ne pas la déclencher à chaque insertion
+        n_evict = self._count - int(self.max_entries * 0.9)
+        self._conn.execute("DELETE FROM tm WHERE key IN (SELECT key FROM tm ORDER BY last_access LIMIT ?)", (n_evict,))
+        self._lru.clear()
+        self._count -= n_evict
+        self.evicted += n_evict
+
+    def stats(self):
+        with self._lock:
+            hits = self.lru_hits + self.disk_hits
+            return {
+                'lookups': self.lookups,
+                'lru_hits': self.lru_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.lookups - hits,
+                'hit_rate': round(hits / self.lookups, 4) if self.lookups else 0.0,
+                'stored': self.stored,
+                'evicted': self.evicted,
+            }
+
+    def log_stats(self):
+        s = self.stats()
+        log_info(f"[TM] {self.model_name} : {s['lookups']} recherches, taux de succès {s['hit_rate']:.1%} (LRU {s['lru_hits']}, disque {s['disk_hits']}), {s['stored']} ajouts, {s['evicted']} évictions")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def invalidate(db_path, models, all_entries=False):
+    """
+    Supprime les entrées obsolètes : celles dont le snapshot ne correspond plus à la config
+    pour un modèle configuré, ou toutes les entrées si all_entries=True. Retourne le nombre supprimé.
+    """
+    if not os.path.isfile(db_path):
+        return 0
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.executescript(SCHEMA)
+        if all_entries:
+            deleted = conn.execute("DELETE FROM tm").rowcount
+        else:
+            deleted = 0
+            for model_info in models:
+                deleted += conn.execute(
+                    "DELETE FROM tm WHERE model_name = ? AND model_snapshot != ?",
+                    (model_info['name'], get_model_snapshot(model_info))
+                ).rowcount
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    log_info(f"[TM] {deleted} entrée(s) supprimée(s) de {db_path}")
+    return deleted
+
+
+_memories = {}
+_memories_lock = threading.Lock()
+
+
+def get_tm_path(config):
+    from utils.config_loader import get_abs_path_from_config
+    tm_cfg = config.get('translation_memory') or {}
+    return os.path.join(get_abs_path_from_config(config, 'meta_dir'), tm_cfg.get('filename', 'translation_memory.sqlite'))
+
+
+def get_translation_memory(config, model_info, precision='fp32', generation_params=None):
+    """Mémoire de traduction du processus pour cette configuration, ou None si désactivée dans la config."""
+    tm_cfg = config.get('translation_memory') or {}
+    if not tm_cfg.get('enabled', False):
+        return None
+    model_key = make_model_key(model_info, precision, generation_params)
+    with _memories_lock:
+        if model_key not in _memories:
+            _memories[model_key] = TranslationMemory(
+                get_tm_path(config),
+                model_info,
+                precision=precision,
+                generation_params=generation_params,
+                max_entries=tm_cfg.get('max_entries'),
+                lru_size=tm_cfg.get('lru_size', 50000),
+            )
+        return _memories[model_key]
+
+
+def log_all_stats():
+    with _memories_lock:
+        memories = list(_memories.values())
+    for memory in memories:
+        memory.log_stats()
+
+
+if __name__ == "__main__":
+    import argparse
+    from utils.config_loader import load_config
+    parser = argparse.ArgumentParser(description="Gestion de la mémoire de traduction")
+    parser.add_argument('command', choices=['stats', 'invalidate'], help="stats : contenu de la mémoire ; invalidate : purge des entrées obsolètes")
+    parser.add_argument('--all', action='store_true', help='Avec invalidate : supprimer toutes les entrées')
+    args = parser.parse_args()
+    config = load_config()
+    db_path = get_tm_path(config)
+    if args.command == 'invalidate':
+        invalidate(db_path, config['models'], all_entries=args.all)
+    elif os.path.isfile(db_path):
+        conn = sqlite3.connect(db_path)
+        for name, snapshot, n in conn.execute("SELECT model_name, model_snapshot, COUNT(*) FROM tm GROUP BY model_name, model_snapshot"):
+            print(f"{name} @ {snapshot} : {n} entrée(s)")
+        conn.close()
+    else:
+        print(f"Aucune mémoire de traduction : {db_path}")
@@ -0,0 +1,132 @@
+import time
+import threading
+import pytest
+
+torch = pytest.importorskip('torch')
+
+import pipeline.translation as translation
+from pipeline.batching import AdaptiveBatchController
+
+
+class FakeTokenizer:
+    """Encode chaque phrase par son numéro dans un vocabulaire partagé."""
+
+    def __init__(self):
+        self.vocab = []
+
+    def __call__(self, sentences, **kwargs):
+        ids = []
+        for s in sentences:
+            if s not in self.vocab:
+                self.vocab.append(s)
+            ids.append([self.vocab.index(s), 0, 0])
+        ids = torch.tensor(ids, dtype=torch.long)
+        return {'input_ids': ids, 'attention_mask': torch.ones_like(ids)}
+
+    def pad(self, encoded, return_tensors=None):
+        ids = torch.tensor([[ids[0], 0, 0] for ids in encoded['input_ids']], dtype=torch.long)
+        self.padded = getattr(self, 'padded', 0) + len(ids)
+        return {'input_ids': ids, 'attention_mask': torch.ones_like(ids)}
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return [f"fr:{self.vocab[int(row[0])]}" for row in outputs]
+
+
+class FakeModel:
+    """OOM au-delà de max_batch phrases ; la phrase 'poison' échoue toujours."""
+
+    def __init__(self, tokenizer, max_batch=4):
+        self.tokenizer = tokenizer
+        self.max_batch = max_batch
+        self.calls = []
+
+    def generate(self, input_ids, attention_mask, **kwargs):
+        self.calls.append(len(input_ids))
+        if len(input_ids) > self.max_batch:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        if any(self.tokenizer.vocab[int(i)] == 'poison' for i in input_ids[:, 0]):
+            raise ValueError("phrase intraduisible")
+        return input_ids
+
+
+def test_split_and_retry_isolates_failures(monkeypatch):
+    controller = AdaptiveBatchController(grow_after=1000)
+    monkeypatch.setattr(translation, 'get_batch_controller', lambda config: controller)
+    sentences = [f"s{i}" for i in range(14)] + ['poison'] + [f"t{i}" for i in range(5)]
+    tokenizer = FakeTokenizer()
+    model = FakeModel(tokenizer, max_batch=4)
+    failures = []
+    out = translation.translate_sentences(sentences, tokenizer, model, 'cpu', batch_size_model=16, failures=failures)
+    assert out[14] is None, "Une phrase en échec vaut None, pas une chaîne vide"
+    assert [f['index'] for f in failures] == [14] and failures[0]['en'] == 'poison'
+    assert all(fr == f"fr:{s}" for s, fr in zip(sentences, out) if s != 'poison'), "Les autres phrases doivent être traduites"
+    assert controller.ooms >= 1 and controller.factor < 1.0, "La taille des sous-batchs doit être réduite après un OOM"
+    # Les sous-batchs suivants partent directement à la taille réduite
+    calls_before = len(model.calls)
+    translation.translate_sentences([f"u{i}" for i in range(8)], tokenizer, model, 'cpu', batch_size_model=16)
+    assert max(model.calls[calls_before:]) <= 4
+
+
+def test_controller_grows_back_with_headroom():
+    controller = AdaptiveBatchController(grow_after=2, headroom_pct=70)
+    controller.record_oom()
+    controller.record_oom()
+    assert controller.limits(32, 4096) == (8, 1024)
+    controller.record_success(memory_pct=95)
+    controller.record_success(memory_pct=95)
+    assert controller.factor == 0.25, "Pas de remontée sans marge mémoire"
+    controller.record_success(memory_pct=40)
+    controller.record_success(memory_pct=40)
+    assert controller.factor == 0.5
+    for _ in range(10):
+        controller.record_success(memory_pct=40)
+    assert controller.limits(32) == (32, None), "La taille ne dépasse jamais la valeur demandée"
+
+
+def test_progress_reports_each_sub_batch(monkeypatch):
+    monkeypatch.setattr(translation, 'get_batch_controller', lambda config: AdaptiveBatchController(grow_after=1000))
+    tokenizer = FakeTokenizer()
+    model = FakeModel(tokenizer, max_batch=4)
+    sentences = [f"p{i}" for i in range(6)] + ['poison'] + [f"q{i}" for i in range(3)]
+    saved = {}
+    out = translation.translate_sentences(
+        sentences, tokenizer, model, 'cpu', batch_size_model=4,
+        progress=lambda indices, fr_texts: saved.update(zip(indices, fr_texts))
+    )
+    assert saved == {i: fr for i, fr in enumerate(out) if fr is not None}, "Chaque sous-batch traduit est remis au point de reprise"
+
+
+def test_overlapped_stages_keep_order(monkeypatch):
+    monkeypatch.setattr(translation, 'get_batch_controller', lambda config: None)
+    monkeypatch.setattr(translation, 'get_overlap_config', lambda config: {'enabled': True, 'prefetch': 2})
+    events = []
+
+    class TracingTokenizer(FakeTokenizer):
+        def __call__(self, sentences, **kwargs):
+            events.append(('tokenize', sentences[0], threading.current_thread().name))
+            return super().__call__(sentences, **kwargs)
+
+        def batch_decode(self, outputs, skip_special_tokens=True):
+            events.append(('decode', None, threading.current_thread().name))
+            return super().batch_decode(outputs)
+
+    class SlowModel(FakeModel):
+        def generate(self, input_ids, attention_mask, **kwargs):
+            events.append(('generate', self.tokenizer.vocab[int(input_ids[0, 0])], threading.current_thread().name))
+            time.sleep(0.05)
+            events.append(('generated', self.tokenizer.vocab[int(input_ids[0, 0])], threading.current_thread().name))
+            return super().generate(input_ids, attention_mask, **kwargs)
+
+    tokenizer = TracingTokenizer()
+    sentences = [f"w{i}" for i in range(8)] + ['poison']
+    failures = []
+    out = translation.translate_sentences(sentences, tokenizer, SlowModel(tokenizer, max_batch=8), 'cpu', batch_size_model=2, failures=failures)
+    assert out == [f"fr:{s}" for s in sentences[:-1]] + [None] and [f['index'] for f in failures] == [8]
+    main = threading.current_thread().name
+    assert all(thread != main for stage, _, thread in events if stage in ('tokenize', 'decode')), "Tokenisation et décodage sur les threads annexes"
+    order = [(stage, first) for stage, first, _ in events]
+    assert order.index(('tokenize', 'w2')) < order.index(('generated', 'w0')), "Le sous-batch suivant est tokenisé pendant le generate du courant"
+
+    events.clear()
+    assert translation.translate_sentences(sentences[:-1], tokenizer, SlowModel(tokenizer), 'cpu', batch_size_model=2, overlap={'enabled': False}) == out[:-1]
+    assert {thread for _, _, thread in events} == {main}, "overlap={'enabled': False} : tout sur le thread principal, config inchangée"
@@ -0,0 +1,40 @@
+import pytest
+from pipeline.backends import get_backend
+from pipeline.translation import get_precision
+
+
+def test_backend_from_config():
+    assert get_backend({'name': 'm', 'type': 'marian'}) == 'torch', "Moteur par défaut d'un modèle marian : torch"
+    assert get_backend({'name': 'm', 'type': 'marian', 'backend': 'onnx'}) == 'onnx'
+    with pytest.raises(ValueError):
+        get_backend({'name': 'm', 'type': 'marian', 'backend': 'tensorrt'})
+
+
+def test_onnx_runs_in_fp32():
+    assert get_precision('cpu', quantize='int8', backend='onnx') == 'fp32', "Le moteur onnx ne prend pas en charge int8/fp16"
+
+
+def test_onnx_export_matches_torch_and_is_reused(tmp_path):
+    pytest.importorskip('optimum.onnxruntime')
+    import os
+    import shutil
+    from benchmarks.tiny_model import build_tiny_model
+    from pipeline.backends import load_onnx_marian_model, get_onnx_export_dir, ONNX_REQUIRED_FILES
+    from pipeline.model_pool import load_marian_model
+    model_path = str(tmp_path / 'tiny')
+    shutil.copytree(build_tiny_model(), model_path)
+    sentences = ['No acute distress.', 'Patient denies chest pain and fever.']
+
+    tokenizer, model = load_marian_model(model_path, 'cpu', 'fp32')
+    inputs = tokenizer(sentences, return_tensors='pt', padding=True)
+    expected = tokenizer.batch_decode(model.generate(**inputs, num_beams=1, max_new_tokens=16), skip_special_tokens=True)
+
+    onnx_tokenizer, onnx_model = load_onnx_marian_model(model_path)
+    export_dir = get_onnx_export_dir(model_path)
+    assert all(os.path.isfile(os.path.join(export_dir, f)) for f in ONNX_REQUIRED_FILES), "Export ONNX dans <snapshot>/onnx"
+    outputs = onnx_model.generate(**onnx_tokenizer(sentences, return_tensors='pt', padding=True), num_beams=1, max_new_tokens=16)
+    assert onnx_tokenizer.batch_decode(outputs, skip_special_tokens=True) == expected, "Mêmes traductions que le moteur torch"
+
+    mtimes = {f: os.path.getmtime(os.path.join(export_dir, f)) for f in ONNX_REQUIRED_FILES}
+    load_onnx_marian_model(model_path)
+    assert {f: os.path.getmtime(os.path.join(export_dir, f)) for f in ONNX_REQUIRED_FILES} == mtimes, "Export en cache réutilisé"
@@ -0,0 +1,56 @@
+import gzip
+import pandas as pd
+from pipeline.batch_generation_en import iter_source_batches, source_stem, annotate_batch
+from utils.core import is_source_file
+
+
+def test_source_files_and_stems():
+    assert is_source_file('a.txt') and is_source_file('a.csv.gz') and is_source_file('a.txt.zst')
+    assert not is_source_file('a.parquet')
+    assert source_stem('/x/negation_medical.txt.gz') == 'negation_medical'
+    assert source_stem('corpus.csv') == 'corpus'
+
+
+def test_txt_and_gz_batches_are_streamed(tmp_path):
+    lines = [f"Sentence {i} is not here." for i in range(1, 26)]
+    txt = tmp_path / 'a.txt'
+    txt.write_text('\n'.join(lines[:10]) + '\n\n' + '\n'.join(lines[10:]) + '\n', encoding='utf-8')
+    gz = tmp_path / 'a.txt.gz'
+    with gzip.open(gz, 'wt', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    for path in (txt, gz):
+        batches = list(iter_source_batches(str(path), 10))
+        assert [len(b) for b in batches] == [10, 10, 5], "Lots de 10 phrases attendus, le dernier plus court"
+        assert batches[2]['line_number'].tolist() == list(range(21, 26)), "line_number doit suivre le rang de la phrase"
+        assert batches[1]['en'].tolist() == lines[10:20]
+
+
+def test_csv_batches_keep_columns(tmp_path):
+    path = tmp_path / 'b.csv'
+    pd.DataFrame({'en': [f"No pain {i}" for i in range(7)], 'origine': 'x'}).to_csv(path, index=False)
+    batches = list(iter_source_batches(str(path), 3))
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert list(batches[0].columns) == ['en', 'origine'], "Les colonnes d'origine du CSV doivent être conservées"
+    annotated = annotate_batch(batches[0])
+    assert annotated['has_negation'].all(), "'no' doit être détecté comme négation"
+    assert annotated['negation_scope'].iloc[0] == 'pain 0'
+
+
+def test_negation_engine_matches_reference():
+    from pipeline.negation import annotate_negation, annotate_negation_reference
+    sentences = [
+        "Patient denies chest pain.",
+        "Nothing abnormal, not even fever.",
+        "Without pain, no fever",
+        "NO   acute distress",
+        "Knowledge of another history",
+        "He can't walk and n't is odd",
+        "",
+        "No",
+        123,
+    ]
+    ref = annotate_negation_reference(sentences)
+    new = annotate_negation(sentences)
+    for col in ref:
+        assert list(ref[col]) == list(new[col]), f"Colonne {col} différente de l'implémentation d'origine"
+    assert new['negation_words'][2] == ['no', 'without'], "Ordre des mots de négation = ordre de NEGATION_KEYWORDS"
@@ -0,0 +1,53 @@
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils.batch_store import import_batch_files, read_batch_columns, write_batch, compact_fr_dataset, list_en_batches, get_dataset_dir
+
+
+def make_batches(batches_dir):
+    paths = []
+    for start, scope in ((1, [None, None]), (3, [4, None]), (5, [1, 2])):
+        df = pd.DataFrame({
+            'id_phrase': [start, start + 1],
+            'en': [f"sentence {start}", f"sentence {start + 1}"],
+            'negation_scope_start': pd.Series(scope, dtype=object),
+        })
+        path = os.path.join(batches_dir, f"en_batch_medical_{start:05d}_{start + 1:05d}.parquet")
+        df.to_parquet(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def test_import_reads_batches_as_row_groups(tmp_path):
+    config = {'batches_dir': str(tmp_path), 'storage': {'layout': 'dataset'}}
+    paths = make_batches(str(tmp_path))
+    assert import_batch_files(paths, config, remove=True) == 3
+    assert not any(os.path.exists(p) for p in paths), "Fichiers importés supprimés (--remove)"
+    part = os.path.join(get_dataset_dir(config, 'en', str(tmp_path)), 'source=medical', 'part-0.parquet')
+    assert pq.ParquetFile(part).metadata.num_row_groups == 3, "Un row group par lot"
+    assert list_en_batches(config, str(tmp_path)) == paths, "Lots logiques listés depuis le footer du dataset"
+
+    df = read_batch_columns(paths[1], ['id_phrase', 'negation_scope_start', 'absente'], config)
+    assert list(df.columns) == ['id_phrase', 'negation_scope_start'], "Projection sur les colonnes existantes"
+    assert df['id_phrase'].tolist() == [3, 4] and df['negation_scope_start'].iloc[0] == 4
+
+
+def test_fr_fragments_are_compacted_into_matching_partition(tmp_path):
+    config = {'batches_dir': str(tmp_path), 'storage': {'layout': 'dataset'}}
+    import_batch_files(make_batches(str(tmp_path)), config, remove=True)
+    fr_path = os.path.join(str(tmp_path), 'fr_batch_medical_00003_00004.parquet')
+    write_batch(fr_path, pd.DataFrame({'id_phrase': [3, 4], 'fr': ['phrase 3', None]}), config)
+    write_batch(os.path.join(str(tmp_path), 'fr_batch_medical_00001_00002.parquet'), pd.DataFrame({'id_phrase': [1, 2], 'fr': [None, None]}), config)
+    fr = read_batch_columns(fr_path, ['fr'], config)['fr']
+    assert fr.iloc[0] == 'phrase 3' and pd.isna(fr.iloc[1]), "Lot FR lisible avant compaction"
+
+    assert compact_fr_dataset(config, str(tmp_path)) == 2
+    # Lot retraduit : le nouveau fragment prime, puis remplace son row group à la compaction
+    write_batch(fr_path, pd.DataFrame({'id_phrase': [3, 4], 'fr': ['phrase 3', 'phrase 4']}), config)
+    assert read_batch_columns(fr_path, ['fr'], config)['fr'].tolist() == ['phrase 3', 'phrase 4']
+    compact_fr_dataset(config, str(tmp_path))
+    fr_dir = os.path.join(get_dataset_dir(config, 'fr', str(tmp_path)), 'source=medical')
+    assert os.listdir(fr_dir) == ['part-0.parquet']
+    assert pq.ParquetFile(os.path.join(fr_dir, 'part-0.parquet')).metadata.num_row_groups == 2
+    assert read_batch_columns(fr_path, ['id_phrase', 'fr'], config)['fr'].tolist() == ['phrase 3', 'phrase 4']
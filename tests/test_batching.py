@@ -0,0 +1,35 @@
+from pipeline.batching import build_batches, build_token_budget_batches, estimate_token_lengths
+
+
+def test_fixed_batches_keep_file_order():
+    batches = build_batches(7, 'fixed', batch_size_model=3)
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_token_budget_respects_padded_budget():
+    lengths = [200, 10, 12, 11, 9, 10, 13, 8]
+    batches = build_token_budget_batches(lengths, max_tokens=64)
+    # Chaque indice apparaît exactement une fois
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    for b in batches:
+        padded = len(b) * max(lengths[i] for i in b)
+        assert padded <= 64 or len(b) == 1, f"Budget dépassé pour le sous-batch {b}"
+    # La phrase longue est isolée au lieu de forcer le padding des courtes
+    assert [0] in batches
+
+
+def test_token_budget_groups_similar_lengths():
+    lengths = [5, 50, 6, 49, 7, 48]
+    batches = build_token_budget_batches(lengths, max_tokens=150)
+    assert batches == [[0, 2, 4], [5, 3, 1]]
+
+
+def test_token_budget_bounded_by_batch_size_model():
+    lengths = [4] * 10
+    assert build_batches(10, 'token_budget', batch_size_model=3, lengths=lengths, max_tokens=1000) == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]], \
+        "batch_size_model borne aussi le nombre de phrases par generate en mode token_budget"
+
+
+def test_estimate_token_lengths_uses_batch_columns():
+    lengths = estimate_token_lengths(['a b c', 'x' * 40], nb_words=[3, 1], nb_chars=[5, 40])
+    assert lengths == [4, 11]
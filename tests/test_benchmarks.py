@@ -0,0 +1,33 @@
+from benchmarks.results import compare_results, metric_direction
+from benchmarks.bench_io import parse_scale, run as run_io
+from benchmarks.bench_translation import percentile
+
+
+def make_result(metrics, batch_size=32):
+    return {'suite': 'translation', 'name': 'translate_sentences', 'params': {'batch_size': batch_size}, 'metrics': metrics}
+
+
+def test_compare_flags_regressions():
+    baseline = [make_result({'sentences_per_s': 100.0, 'latency_p95_ms': 50.0, 'sub_batches': 8})]
+    current = [
+        make_result({'sentences_per_s': 85.0, 'latency_p95_ms': 52.0, 'sub_batches': 4}),
+        make_result({'sentences_per_s': 10.0}, batch_size=8),
+    ]
+    rows = {r['metric']: r for r in compare_results(baseline, current, threshold=0.10)}
+    assert set(rows) == {'sentences_per_s', 'latency_p95_ms'}, "Seules les métriques de débit/durée des mêmes paramètres sont comparées"
+    assert rows['sentences_per_s']['regression'] and rows['sentences_per_s']['change'] == -0.15
+    assert not rows['latency_p95_ms']['regression'], "Une latence 4 % plus haute reste sous le seuil"
+    assert metric_direction('total_s') == -1 and metric_direction('appends_per_s') == 1
+
+
+def test_scales_and_percentiles():
+    assert parse_scale('10k') == 10_000 and parse_scale('1M') == 1_000_000 and parse_scale('500') == 500
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+
+
+def test_io_suite_small_scale():
+    results = run_io(['300'], batch_size=100)
+    by_name = {r['name']: r['metrics'] for r in results}
+    assert set(by_name) == {'batch_generation', 'status_updates', 'fr_meta_appends'}
+    assert by_name['status_updates']['batches'] == 3 and by_name['fr_meta_appends']['batches'] == 3
@@ -1,6 +1,6 @@
 import unittest
 import os
-from utils.config_loader import load_config
+from utils.config_loader import load_config, check_checkpoint_stages
 from utils.core import check_dir_exists, check_file_exists
 
 class TestConfigAndStructure(unittest.TestCase):
@@ -29,6 +29,12 @@ class TestConfigAndStructure(unittest.TestCase):
 			self.assertIn('path', model)
 			self.assertIn('type', model)
 
+	def test_save_intermediate_stages(self):
+		check_checkpoint_stages({'save_intermediate': ['preprocessing']})
+		check_checkpoint_stages({'save_intermediate': False})
+		with self.assertRaises(ValueError, msg="Étape inconnue dans save_intermediate"):
+			check_checkpoint_stages({'save_intermediate': ['preprocessing', 'tokenisation']})
+
 	def test_utils_import(self):
 		# Vérifie que les utilitaires sont importables et fonctionnels
 		check_dir_exists(self.config['logs_dir'])
@@ -0,0 +1,23 @@
+import pytest
+from pipeline.decoding import get_decoding_profile, build_generate_kwargs
+
+
+def test_profiles_from_config():
+    config = {'max_length': 64, 'decoding_profile': 'balanced', 'decoding_profiles': {'fast': {'num_beams': 1}}}
+    name, profile = get_decoding_profile(config)
+    assert name == 'balanced' and profile['num_beams'] == 2
+    name, profile = get_decoding_profile(config, 'fast')
+    assert profile['num_beams'] == 1 and profile['max_new_tokens_ratio'] == 1.5, "Un profil partiel est complété par les valeurs par défaut"
+    with pytest.raises(ValueError):
+        get_decoding_profile(config, 'inconnu')
+
+
+def test_generate_kwargs():
+    _, fast = get_decoding_profile({'max_length': 64}, 'fast')
+    kwargs = build_generate_kwargs(fast, 20)
+    assert kwargs == {'num_beams': 1, 'max_new_tokens': 40, 'do_sample': False}, "Greedy : pas de paramètres de faisceau"
+    _, quality = get_decoding_profile({'max_length': 64}, 'quality')
+    kwargs = build_generate_kwargs(quality, 30)
+    assert kwargs['num_beams'] == 4 and kwargs['early_stopping'] is True
+    assert kwargs['max_new_tokens'] == 64, "La limite de tokens générés est plafonnée par max_length"
+    assert build_generate_kwargs(None, 10) == {}, "Sans profil, paramètres par défaut du modèle"
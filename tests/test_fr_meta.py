@@ -0,0 +1,37 @@
+import os
+from utils.meta_utils import append_fr_meta_record, read_fr_batch_info, compact_fr_batch_info, FR_META_FILE
+
+
+def record(batch_id, nb=100, commentaire=''):
+    return {
+        'batch_id': batch_id,
+        'fr_batch_path': f'/tmp/{batch_id}.parquet',
+        'date_creation': '2025-08-15T00:00:00',
+        'nb_phrases': nb,
+        'status': 'en_attente',
+        'commentaire': commentaire
+    }
+
+
+def test_append_read_and_compact(tmp_path):
+    meta_dir = str(tmp_path)
+    assert read_fr_batch_info(meta_dir) is None
+    for i in range(3):
+        append_fr_meta_record(meta_dir, record(f'fr_batch_{i}'))
+    df = read_fr_batch_info(meta_dir)
+    assert df['batch_id'].tolist() == ['fr_batch_0', 'fr_batch_1', 'fr_batch_2']
+    assert compact_fr_batch_info(meta_dir) == 3
+    assert os.path.isfile(os.path.join(meta_dir, FR_META_FILE))
+    assert compact_fr_batch_info(meta_dir) == 0
+    # Nouveaux fragments après compaction : la vue consolidée combine les deux
+    append_fr_meta_record(meta_dir, record('fr_batch_3'))
+    assert len(read_fr_batch_info(meta_dir)) == 4
+
+
+def test_retranslated_batch_replaces_its_row(tmp_path):
+    meta_dir = str(tmp_path)
+    append_fr_meta_record(meta_dir, record('fr_batch_0', commentaire='v1'))
+    compact_fr_batch_info(meta_dir)
+    append_fr_meta_record(meta_dir, record('fr_batch_0', commentaire='v2'))
+    df = read_fr_batch_info(meta_dir)
+    assert len(df) == 1 and df['commentaire'].iloc[0] == 'v2'
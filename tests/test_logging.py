@@ -0,0 +1,72 @@
+import logging
+import utils.core as core
+from utils.core import LogThrottle, install_log_handlers, stop_log_listener, log_info, log_error
+import pipeline.step_logger as step_logger
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def restore_root(saved_handlers, saved_level):
+    stop_log_listener()
+    root = logging.getLogger()
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+    core._log_state.update(print_mirror=True, stdout_mirror=True, throttle=None)
+
+
+def test_throttle_sampling_and_rate():
+    sampler = LogThrottle(sample_every=3)
+    assert [sampler.allow('k') for _ in range(7)] == [0, None, None, 2, None, None, 2]
+    limiter = LogThrottle(max_per_second=2)
+    assert [limiter.allow('k') for _ in range(5)] == [0, 0, None, None, None]
+    assert limiter.allow('autre') == 0, "La limite s'applique par point d'appel"
+
+
+def test_async_logging_with_throttle(capsys):
+    root = logging.getLogger()
+    saved = (list(root.handlers), root.level)
+    handler = ListHandler()
+    try:
+        install_log_handlers([handler], logging.INFO, async_logging=True, stdout_mirror=True, max_per_second=2)
+        for i in range(5):
+            log_info(f"sous-batch {i}", throttle=True)
+        log_info("message unique")
+        log_error("erreur")
+        stop_log_listener()
+    finally:
+        restore_root(*saved)
+    assert handler.messages == ["sous-batch 0", "sous-batch 1", "message unique", "erreur"], "Les messages répétitifs au-delà du débit sont omis, pas les autres"
+    out = capsys.readouterr().out
+    assert "[INFO] message unique" in out and "[ERREUR] erreur" in out, "La recopie stdout passe par le thread d'écriture"
+
+
+def test_daemon_mode_has_no_stdout(capsys):
+    root = logging.getLogger()
+    saved = (list(root.handlers), root.level)
+    handler = ListHandler()
+    try:
+        install_log_handlers([handler], logging.INFO, async_logging=False, stdout_mirror=False)
+        log_info("silencieux")
+    finally:
+        restore_root(*saved)
+    assert handler.messages == ["silencieux"] and capsys.readouterr().out == ""
+
+
+def test_step_loggers_are_cached_and_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(step_logger, 'MAX_OPEN_STEP_LOGGERS', 2)
+    try:
+        first = step_logger.get_step_logger(str(tmp_path), 'traduction', 'b1')
+        assert step_logger.get_step_logger(str(tmp_path), 'traduction', 'b1') is first
+        assert len(first.handlers) == 1, "Un seul FileHandler par logger d'étape"
+        step_logger.get_step_logger(str(tmp_path), 'traduction', 'b2')
+        step_logger.get_step_logger(str(tmp_path), 'traduction', 'b3')
+        assert first.handlers == [], "Le logger le moins récemment utilisé est fermé"
+    finally:
+        step_logger.close_step_loggers()
@@ -0,0 +1,56 @@
+import json
+from utils.metrics import MetricsRegistry, MetricsExporter, REGISTRY
+from utils.core import log_execution_time
+
+
+def test_registry_and_prometheus_format():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc('sentences_translated_total', 32)
+    registry.inc('sentences_translated_total', 8)
+    registry.inc('alerts_total', kind='ram')
+    registry.set_gauge('padding_efficiency', 0.75)
+    for value in (0.05, 0.5, 0.5, 3.0):
+        registry.observe('sub_batch_latency_seconds', value)
+    series = {s['name']: s for s in registry.snapshot()}
+    assert series['sentences_translated_total']['value'] == 40
+    hist = series['sub_batch_latency_seconds']
+    assert hist['buckets'] == {'0.1': 1, '1.0': 3, '+Inf': 4} and hist['count'] == 4, "Les buckets sont cumulés comme dans Prometheus"
+    text = registry.to_prometheus({'run_id': 'r1'})
+    assert '# TYPE trans_sent_sub_batch_latency_seconds histogram' in text
+    assert 'trans_sent_sub_batch_latency_seconds_bucket{le="1.0",run_id="r1"} 3' in text
+    assert 'trans_sent_alerts_total{kind="ram",run_id="r1"} 1' in text
+    assert 'trans_sent_padding_efficiency{run_id="r1"} 0.75' in text
+    registry.enabled = False
+    registry.inc('sentences_translated_total', 100)
+    assert {s['name']: s for s in registry.snapshot()}['sentences_translated_total']['value'] == 40, "Registre désactivé : aucune mise à jour"
+
+
+def test_exporter_writes_prom_and_jsonl(tmp_path):
+    registry = MetricsRegistry()
+    exporter = MetricsExporter(registry, str(tmp_path), 'run1', interval=None)
+    registry.inc('sub_batches_total')
+    exporter.export()
+    registry.inc('sub_batches_total')
+    exporter.stop()
+    exporter.stop()
+    lines = (tmp_path / 'metrics_run1.jsonl').read_text().splitlines()
+    assert [json.loads(l)['metrics'][0]['value'] for l in lines] == [1, 2], "Un instantané par export, état final écrit à l'arrêt"
+    assert 'trans_sent_sub_batches_total{pid=' in (tmp_path / 'metrics_run1.prom').read_text()
+
+
+def test_log_execution_time_feeds_registry():
+    @log_execution_time('Étape test métriques')
+    def step(fail=False):
+        if fail:
+            raise ValueError('échec')
+        return 1
+
+    step()
+    try:
+        step(fail=True)
+    except ValueError:
+        pass
+    series = [s for s in REGISTRY.snapshot() if s['labels'].get('stage') == 'Étape test métriques']
+    by_name = {s['name']: s for s in series}
+    assert by_name['stage_duration_seconds']['count'] >= 1
+    assert by_name['stage_errors_total']['value'] >= 1
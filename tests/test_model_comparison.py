@@ -0,0 +1,90 @@
+import os
+import pytest
+
+torch = pytest.importorskip('torch')
+
+import pandas as pd
+import pipeline.translation as translation
+import pipeline.model_comparison as model_comparison
+from pipeline.model_comparison import plan_waves, run_comparison, model_column
+from pipeline.model_pool import ModelPool
+
+
+def test_plan_waves_fits_budget():
+    assert plan_waves([300, 300, 500, 100], 700) == [[0, 1], [2, 3]]
+    assert plan_waves([900, 100], 700) == [[0], [1]], "Un modèle plus gros que le budget forme sa propre vague"
+    assert plan_waves([300, 300, 500]) == [[0, 1, 2]], "Sans budget, tous les modèles dans une vague"
+
+
+class FakeTokenizer:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __call__(self, sentences, **kwargs):
+        self.calls.append(len(sentences))
+        return {'input_ids': [[len(s), 1] for s in sentences]}
+
+    def pad(self, encoded, return_tensors=None):
+        ids = torch.tensor(encoded['input_ids'], dtype=torch.long)
+        return {'input_ids': ids, 'attention_mask': torch.ones_like(ids)}
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return [f"{self.prefix}{int(row[0])}" for row in outputs]
+
+
+class FakeModel:
+    size_mb = 1.0
+
+    def __init__(self, pool, resident):
+        self.pool, self.resident = pool, resident
+
+    def generate(self, input_ids, attention_mask, **kwargs):
+        self.resident.append(len(self.pool._entries))
+        return input_ids
+
+
+def make_snapshot(path, spm, weights_bytes):
+    path.mkdir()
+    (path / 'source.spm').write_bytes(spm)
+    (path / 'model.safetensors').write_bytes(b'0' * weights_bytes)
+    return str(path)
+
+
+def test_models_share_inputs_and_respect_memory_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation, 'get_batch_controller', lambda config: None)
+    monkeypatch.setattr(model_comparison, 'get_model_path', lambda model_info: model_info['path'])
+    models = [
+        {'name': 'org/base', 'path': make_snapshot(tmp_path / 'a', b'spm-shared', 1000)},
+        {'name': 'org/base-distilled', 'path': make_snapshot(tmp_path / 'b', b'spm-shared', 1000)},
+        {'name': 'other', 'path': make_snapshot(tmp_path / 'c', b'spm-other', 1000)},
+    ]
+    tokenizer_calls, resident = [], []
+
+    def loader(model_path, device, precision, model_name):
+        tokenizer = FakeTokenizer(tokenizer_calls)
+        tokenizer.prefix = 'x' if model_name == 'other' else ''
+        return tokenizer, FakeModel(pool, resident)
+
+    pool = ModelPool(loader=loader)
+    unrelated = pool.get(make_snapshot(tmp_path / 'd', b'spm-server', 10), 'cpu', model_name='server')
+    pool.release(unrelated)
+    config = {'batches_dir': str(tmp_path / 'batches'), 'pretokenize': {'enabled': False}}
+    frames = {
+        str(tmp_path / 'batches' / f'en_batch_{n}.parquet'): pd.DataFrame({'id_phrase': [1, 2, 3], 'en': ['a', 'bb', 'ccc']})
+        for n in (1, 2)
+    }
+    reads = []
+    monkeypatch.setattr(model_comparison, 'read_comparison_batch', lambda path: reads.append(path) or frames[path])
+    out_dir = str(tmp_path / 'comparison')
+    stats = run_comparison(list(frames), models, 'cpu', config, out_dir, pool=pool, budget_mb=2500 / 1024 / 1024, chunk_batches=1)
+
+    assert len(tokenizer_calls) == 4, "Une tokenisation par lot et par tokenizer distinct (2 lots x 2 tokenizers)"
+    assert len(reads) == 4, "Lot relu à chaque vague (2 lots x 2 vagues), rien n'est gardé entre les vagues"
+    assert max(resident) <= 3, "Au plus deux modèles de la comparaison résidents (plus le modèle déjà chargé)"
+    assert pool._entries.get(unrelated.key) is unrelated, "Les modèles chargés hors de la comparaison restent dans le pool"
+    assert [s['wave'] for s in stats] == [0, 0, 1]
+    df = pd.read_parquet(os.path.join(out_dir, 'en_batch_1.parquet'))
+    assert list(df.columns) == ['id_phrase', 'en'] + [model_column(m) for m in models], "Colonnes de chaque vague ajoutées à la sortie du lot"
+    assert list(df[model_column(models[1])]) == ['1', '2', '3'] and list(df[model_column(models[2])]) == ['x1', 'x2', 'x3']
+    assert [s['identical_to_reference'] for s in stats] == [1.0, 1.0, 0.0]
+    assert all(s['sentences'] == 6 and s['sentences_per_s'] for s in stats), "Débit mesuré pour chaque modèle"
@@ -0,0 +1,94 @@
+import threading
+import time
+from pipeline.model_pool import ModelPool
+
+
+class FakeTensor:
+    def __init__(self, size_mb):
+        self._n = int(size_mb * 1024 * 1024)
+
+    def numel(self):
+        return self._n
+
+    def element_size(self):
+        return 1
+
+
+class FakeModel:
+    def __init__(self, size_mb=10):
+        self._params = [FakeTensor(size_mb)]
+
+    def parameters(self):
+        return self._params
+
+    def buffers(self):
+        return []
+
+
+def make_loader(calls, size_mb=10, delay=0.0):
+    def loader(model_path, device, precision, model_name):
+        calls.append((model_path, device, precision))
+        time.sleep(delay)
+        return object(), FakeModel(size_mb)
+    return loader
+
+
+def test_model_loaded_once_per_key():
+    calls = []
+    pool = ModelPool(loader=make_loader(calls))
+    for _ in range(3):
+        with pool.acquire('/m/a', 'cpu', 'fp32') as entry:
+            assert entry.model is not None
+    with pool.acquire('/m/a', 'cpu', 'fp16'):
+        pass
+    assert len(calls) == 2, "Le modèle doit être chargé une fois par (chemin, device, précision)"
+    stats = pool.stats()
+    assert stats['misses'] == 2
+    assert stats['hits'] == 2
+
+
+def test_concurrent_acquire_loads_once():
+    calls = []
+    pool = ModelPool(loader=make_loader(calls, delay=0.05))
+    results = []
+
+    def worker():
+        with pool.acquire('/m/a', 'cpu') as entry:
+            results.append(entry)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1, "Un seul chargement attendu sous accès concurrent"
+    assert all(r is results[0] for r in results)
+
+
+def test_memory_cap_evicts_idle_lru():
+    calls = []
+    pool = ModelPool(max_memory_mb=25, loader=make_loader(calls, size_mb=10))
+    with pool.acquire('/m/a', 'cpu'):
+        pass
+    with pool.acquire('/m/b', 'cpu'):
+        pass
+    with pool.acquire('/m/c', 'cpu'):
+        pass
+    stats = pool.stats()
+    assert stats['resident_models'] == 2
+    assert stats['evictions'] == 1
+    # /m/a (le moins récemment utilisé) a été évincé : nouveau chargement
+    with pool.acquire('/m/a', 'cpu'):
+        pass
+    assert len(calls) == 4
+
+
+def test_model_in_use_is_not_evicted():
+    calls = []
+    pool = ModelPool(max_memory_mb=5, idle_timeout=0, loader=make_loader(calls, size_mb=10))
+    entry = pool.get('/m/a', 'cpu')
+    with pool.acquire('/m/b', 'cpu'):
+        assert pool.stats()['resident_models'] == 2
+    assert '/m/a' in entry.key[0]
+    pool.release(entry)
+    assert pool.stats()['resident_models'] == 0
@@ -0,0 +1,29 @@
+import pipeline.parallel as parallel
+
+
+def _cpus(monkeypatch, n):
+    monkeypatch.setattr(parallel, 'get_available_cpus', lambda: list(range(n)))
+
+
+def test_process_executor_splits_cores(monkeypatch):
+    _cpus(monkeypatch, 32)
+    workers, threads = parallel.compute_optimal_workers(executor='process')
+    if threads == 32:  # GPU détecté : un seul worker
+        assert workers == 1
+        return
+    assert workers * threads == 32, "Tous les cœurs doivent être répartis entre les workers"
+    assert workers == 8 and threads == 4
+
+
+def test_process_executor_bounded_by_batches(monkeypatch):
+    _cpus(monkeypatch, 32)
+    workers, threads = parallel.compute_optimal_workers(num_batches=3, executor='process')
+    assert workers <= 3
+    assert workers * threads <= 32
+
+
+def test_thread_executor_keeps_worker_count(monkeypatch):
+    _cpus(monkeypatch, 32)
+    workers, threads = parallel.compute_optimal_workers(num_batches=5, executor='thread')
+    assert threads is None
+    assert workers in (1, 5)
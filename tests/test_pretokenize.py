@@ -0,0 +1,82 @@
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from pipeline.pretokenize import get_batch_token_ids, tokenizer_hash
+
+
+class CountingTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, sentences, **kwargs):
+        self.calls += 1
+        return {'input_ids': [[len(w) for w in s.split()] + [1] for s in sentences]}
+
+    def pad(self, encoded, return_tensors=None):
+        import torch
+        self.padded = getattr(self, 'padded', 0) + len(encoded['input_ids'])
+        width = max(len(ids) for ids in encoded['input_ids'])
+        ids = torch.tensor([ids + [0] * (width - len(ids)) for ids in encoded['input_ids']], dtype=torch.long)
+        return {'input_ids': ids, 'attention_mask': (ids != 0).long()}
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return [f"fr:{int(row[0])}" for row in outputs]
+
+
+class EchoModel:
+    def generate(self, input_ids, attention_mask, **kwargs):
+        return input_ids
+
+
+def make_snapshot(tmp_path):
+    snapshot = tmp_path / 'snapshot'
+    snapshot.mkdir()
+    (snapshot / 'source.spm').write_bytes(b'spm-v1')
+    (snapshot / 'vocab.json').write_text('{"a": 0}')
+    return str(snapshot)
+
+
+def test_token_ids_are_cached_per_tokenizer_and_batch(tmp_path):
+    model_path = make_snapshot(tmp_path)
+    config = {'batches_dir': str(tmp_path / 'batches'), 'pretokenize': {'enabled': True}}
+    batch_path = str(tmp_path / 'batches' / 'en_batch_x_00001_00003.parquet')
+    sentences = ['no fever', 'patient denies chest pain', 'ok']
+    tokenizer = CountingTokenizer()
+
+    input_ids, nb_tokens = get_batch_token_ids(batch_path, sentences, tokenizer, model_path, config)
+    assert nb_tokens == [3, 5, 2] and input_ids[1] == [7, 6, 5, 4, 1]
+    sidecar = os.path.join(config['batches_dir'], 'tokens', tokenizer_hash(model_path), os.path.basename(batch_path))
+    assert pq.read_schema(sidecar).field('input_ids').type == pa.list_(pa.int32()), "input_ids stockés en list<int32>"
+
+    assert get_batch_token_ids(batch_path, sentences, tokenizer, model_path, config)[1] == nb_tokens
+    assert tokenizer.calls == 1, "Les tokens en cache sont relus sans retokeniser"
+
+    get_batch_token_ids(batch_path, sentences[:2] + ['changed'], tokenizer, model_path, config)
+    assert tokenizer.calls == 2, "Un lot modifié invalide son cache"
+
+    old_hash = tokenizer_hash(model_path)
+    with open(os.path.join(model_path, 'source.spm'), 'wb') as f:
+        f.write(b'spm-v2-retrained')
+    assert tokenizer_hash(model_path) != old_hash, "Un tokenizer modifié change d'empreinte (nouveau dossier de cache)"
+    get_batch_token_ids(batch_path, sentences, tokenizer, model_path, config)
+    assert tokenizer.calls == 3
+
+
+def test_disabled_pretokenization(tmp_path):
+    config = {'batches_dir': str(tmp_path), 'pretokenize': {'enabled': False}}
+    assert get_batch_token_ids(str(tmp_path / 'b.parquet'), ['a'], CountingTokenizer(), make_snapshot(tmp_path), config) is None
+
+
+def test_pretokenized_input_skips_tokenizer(monkeypatch):
+    pytest.importorskip('torch')
+    import pipeline.translation as translation
+    monkeypatch.setattr(translation, 'get_batch_controller', lambda config: None)
+    tokenizer = CountingTokenizer()
+    out = translation.translate_sentences(
+        [f"v{i}" for i in range(5)], tokenizer, EchoModel(), 'cpu', batch_size_model=2, batching='token_budget', max_tokens=4,
+        input_ids=[[i + 1, 1] for i in range(5)]
+    )
+    assert out == [f"fr:{i + 1}" for i in range(5)]
+    assert tokenizer.calls == 0 and tokenizer.padded == 5, "Avec input_ids, les sous-batchs sont paddés sans retokeniser les phrases"
@@ -0,0 +1,38 @@
+import os
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+
+from pipeline.quantization import load_quantized_model, get_quantized_cache_path
+from pipeline.translation import get_precision
+
+
+def make_tiny_model(path):
+    config = transformers.MarianConfig(
+        vocab_size=64, d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=32,
+        pad_token_id=63, eos_token_id=0, decoder_start_token_id=63
+    )
+    transformers.MarianMTModel(config).save_pretrained(str(path))
+
+
+def test_int8_model_is_cached(tmp_path):
+    make_tiny_model(tmp_path)
+    cache_path = get_quantized_cache_path(str(tmp_path))
+    model = load_quantized_model(str(tmp_path))
+    assert os.path.isfile(cache_path), "Le modèle quantifié doit être mis en cache sur disque"
+    assert any('quantized' in type(m).__module__ for m in model.modules()), "Les couches Linear doivent être quantifiées"
+    mtime = os.path.getmtime(cache_path)
+    cached = load_quantized_model(str(tmp_path))
+    assert os.path.getmtime(cache_path) == mtime, "Le cache ne doit pas être réécrit au second chargement"
+    inputs = torch.tensor([[5, 6, 7, 0]])
+    with torch.no_grad():
+        assert torch.equal(model.generate(inputs, max_new_tokens=4), cached.generate(inputs, max_new_tokens=4))
+
+
+def test_int8_only_on_cpu():
+    assert get_precision('cpu', quantize='int8') == 'int8'
+    assert get_precision('cuda', fp16=False, quantize='int8') == 'fp32', "int8 est réservé à l'inférence CPU"
+    assert get_precision('cpu') == 'fp32'
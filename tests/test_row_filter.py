@@ -0,0 +1,108 @@
+import os
+import pandas as pd
+import pytest
+
+import utils.batch_store as batch_store
+from utils.batch_store import import_batch_files, get_batch_path
+from pipeline.row_filter import parse_row_filter, may_match, row_mask, select_batches
+
+
+def test_filter_is_parsed_and_evaluated_on_bounds_and_rows():
+    tree = parse_row_filter("has_negation and not 5 <= nb_words < 12")
+    assert tree == ('and', [
+        ('cmp', 'has_negation', '==', True),
+        ('or', [('cmp', 'nb_words', '<', 5), ('cmp', 'nb_words', '>=', 12)]),
+    ]), "Négation reportée sur les comparaisons (De Morgan)"
+    assert not may_match(tree, {'has_negation': (False, False), 'nb_words': (1, 30)}), "Lot sans négation écarté"
+    assert not may_match(tree, {'has_negation': (False, True), 'nb_words': (6, 10)}), "Longueurs toutes dans [5, 12[ : écarté"
+    assert may_match(tree, {'has_negation': (False, True)}), "Colonne sans statistiques : lot conservé"
+    assert not may_match(parse_row_filter("nb_words < 3"), {'nb_words': None}), "Colonne entièrement nulle : aucune ligne"
+
+    df = pd.DataFrame({'has_negation': [True, True, False, True], 'nb_words': [3, 8, 2, None]})
+    assert row_mask(tree, df).tolist() == [True, False, False, False], "Une valeur nulle ne vérifie aucune comparaison"
+    for text in ("nb_words + 1 < 3", "nb_words < other", "nb_words in (1, 2)", "nb_words <"):
+        with pytest.raises(ValueError):
+            parse_row_filter(text)
+
+
+@pytest.mark.parametrize('layout', ['files', 'dataset'])
+def test_batches_pruned_on_statistics_are_not_read(tmp_path, monkeypatch, layout):
+    config = {'batches_dir': str(tmp_path), 'storage': {'layout': layout}}
+    paths = []
+    for start, negations in ((1, [False, False, False]), (4, [False, True, False]), (7, [True, True, True])):
+        path = os.path.join(str(tmp_path), f"en_batch_medical_{start:05d}_{start + 2:05d}.parquet")
+        pd.DataFrame({
+            'id_phrase': range(start, start + 3),
+            'en': [f"sentence {i}" for i in range(start, start + 3)],
+            'has_negation': negations,
+            'nb_words': [4, 20, 6],
+        }).to_parquet(path, index=False)
+        paths.append(path)
+    if layout == 'dataset':
+        import_batch_files(paths, config, remove=True)
+    items = [(os.path.basename(p)[:-len('.parquet')], get_batch_path(str(tmp_path), os.path.basename(p)[:-len('.parquet')])) for p in paths]
+
+    read = []
+    original = batch_store.read_batch_columns
+    monkeypatch.setattr(batch_store, 'read_batch_columns', lambda path, *args, **kwargs: read.append(path) or original(path, *args, **kwargs))
+    kept, selection = select_batches(items, "has_negation == True and nb_words < 10", config)
+    assert [batch_id for batch_id, _ in kept] == [items[2][0]], "Seul le dernier lot contient des négations courtes"
+    assert selection == {items[2][0]: [0, 2]}, "Positions des lignes retenues dans le lot"
+    assert items[0][1] not in read, "Lot sans négation écarté sur les statistiques, sans lecture"
+
+    kept, selection = select_batches(items, "has_negation", config, limit=1)
+    assert kept == [items[1]] and selection == {items[1][0]: [1]}, "limit : premiers lots retenus seulement"
+    kept, selection = select_batches(items, "nb_words > 0", config)
+    assert selection == {batch_id: None for batch_id, _ in items}, "Toutes les lignes retenues : lot entier"
+
+
+def test_full_run_resumes_from_filtered_run(tmp_path, monkeypatch):
+    import pipeline.translation as translation
+    import pipeline.batch_generation_fr as batch_generation_fr
+    from utils.config_loader import load_config
+    from utils.status_store import BatchStatusStore
+    config = dict(load_config(), batches_dir=str(tmp_path), meta_dir=str(tmp_path), storage={'layout': 'files'})
+    batch_name = "en_batch_medical_00001_00004.parquet"
+    pd.DataFrame({
+        'id_phrase': range(1, 5),
+        'en': [f"sentence {i}" for i in range(1, 5)],
+        'nb_words': [2] * 4,
+        'nb_chars': [10] * 4,
+    }).to_parquet(tmp_path / batch_name, index=False)
+    store = BatchStatusStore(str(tmp_path / 'batch_info.parquet'), heartbeat_interval=None)
+    sent = []
+
+    def fake_translate(en_sentences, *args, progress=None, **kwargs):
+        sent.extend(en_sentences)
+        fr_texts = [f"fr:{s}" for s in en_sentences]
+        if progress is not None:
+            progress(list(range(len(en_sentences))), fr_texts)
+        return fr_texts
+
+    class FakePool:
+        def acquire(self, *args):
+            class Entry:
+                tokenizer = model = None
+
+                def __enter__(self):
+                    return self
+
+                def __exit__(self, *exc):
+                    return False
+            return Entry()
+
+    monkeypatch.setattr(translation, 'load_config', lambda: config)
+    monkeypatch.setattr(translation, 'get_engine', lambda *args: ('torch', 'fp32', {}))
+    monkeypatch.setattr(translation, 'get_model_pool', lambda config: FakePool())
+    monkeypatch.setattr(translation, 'get_checkpoint', lambda batch_id, *args: translation.BatchCheckpoint(store, batch_id, 'model'))
+    monkeypatch.setattr(translation, 'record_batch_failures', lambda *args: None)
+    monkeypatch.setattr(translation, 'translate_sentences', fake_translate)
+    monkeypatch.setattr(batch_generation_fr, 'generate_fr_batch', lambda *args, **kwargs: None)
+
+    df = translation.translate_batch(batch_name, translation_memory=False, rows=[1, 3])
+    assert df['fr'].tolist() == ["fr:sentence 2", "fr:sentence 4"] and sent == ["sentence 2", "sentence 4"]
+    sent.clear()
+    df = translation.translate_batch(batch_name, translation_memory=False)
+    assert sent == ["sentence 1", "sentence 3"], "Lignes du passage filtré reprises des points de reprise, non renvoyées au modèle"
+    assert df['fr'].tolist() == [f"fr:sentence {i}" for i in range(1, 5)]
+    assert store.load_progress(batch_name[:-len('.parquet')], 'model') == {}, "Points de reprise effacés une fois le lot entier traduit"
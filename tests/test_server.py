@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+from pipeline.server import TranslationServer, ServerClient, ServerBusy
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_requests_are_micro_batched():
+    calls = []
+
+    def translate(texts):
+        calls.append(list(texts))
+        return [f"fr:{t}" for t in texts]
+
+    async def scenario():
+        server = await TranslationServer({'m': translate}, max_batch_size=8, max_wait_ms=50).start('127.0.0.1', 0)
+        host, port = server.address
+        clients = [await ServerClient(host, port).connect() for _ in range(8)]
+        try:
+            results = await asyncio.gather(*(c.translate([f"s{i}"]) for i, c in enumerate(clients)))
+            status, health = await clients[0].request('GET', '/health')
+        finally:
+            for c in clients:
+                await c.close()
+            await server.stop()
+        return results, health
+
+    results, health = run(scenario())
+    assert results == [[f"fr:s{i}"] for i in range(8)], "Chaque requête reçoit ses propres traductions"
+    assert len(calls) == 1 and len(calls[0]) == 8, "Les requêtes simultanées partent au modèle en un seul paquet"
+    assert health['models']['m']['batches'] == 1
+
+
+def test_full_queue_rejects_requests():
+    release = threading.Event()
+
+    def translate(texts):
+        release.wait(5)
+        return list(texts)
+
+    async def scenario():
+        server = await TranslationServer({'m': translate}, max_batch_size=2, max_wait_ms=1, max_queue=3).start('127.0.0.1', 0)
+        host, port = server.address
+        busy = await ServerClient(host, port).connect()
+        first = asyncio.ensure_future(busy.translate(['a', 'b']))
+        await asyncio.sleep(0.1)  # le premier paquet occupe le modèle
+        queued = await ServerClient(host, port).connect()
+        second = asyncio.ensure_future(queued.translate(['c', 'd', 'e']))
+        await asyncio.sleep(0.05)
+        late = await ServerClient(host, port).connect()
+        try:
+            await late.translate(['f'])
+            rejected = False
+        except ServerBusy:
+            rejected = True
+        status, error = await late.request('POST', '/translate', {'texts': ['x'], 'model': 'inconnu'})
+        release.set()
+        results = [await first, await second]
+        for c in (busy, queued, late):
+            await c.close()
+        await server.stop()
+        return rejected, status, results
+
+    rejected, status, results = run(scenario())
+    assert rejected, "Au-delà de max_queue phrases en attente, la requête est refusée (503)"
+    assert status == 404, "Modèle inconnu : 404"
+    assert results == [['a', 'b'], ['c', 'd', 'e']], "Les requêtes admises sont servies une fois le modèle libre"
@@ -0,0 +1,48 @@
+import os
+import sys
+import subprocess
+
+from utils import config_loader
+from benchmarks.bench_startup import parse_importtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_after(module):
+    code = f"import sys, {module}; print(','.join(m for m in ('torch', 'transformers', 'matplotlib', 'seaborn') if m in sys.modules))"
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return proc.stdout.strip()
+
+
+def test_pipeline_modules_import_without_heavy_dependencies():
+    for module in ('main_pipeline', 'pipeline.translation', 'pipeline.preprocessing', 'pipeline.parallel', 'pipeline.reporting'):
+        assert imported_after(module) == '', f"{module} ne doit importer ni torch/transformers ni matplotlib/seaborn"
+
+
+def test_config_is_loaded_once(monkeypatch):
+    calls = []
+    validate = config_loader.validate_config
+    monkeypatch.setattr(config_loader, 'validate_config', lambda config, root: calls.append(root) or validate(config, root))
+    config_loader.clear_config_cache()
+    first = config_loader.load_config()
+    assert config_loader.load_config() is first, "La config doit être mise en cache"
+    assert len(calls) == 1, "La validation (création des dossiers) ne doit tourner qu'une fois"
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   yaml.error\n"
+        "import time:      2000 |      37566 | utils.config_loader\n"
+    )
+    assert parse_importtime(stderr) == {'yaml.error': 120, 'utils.config_loader': 37566}
+
+
+def test_options_before_subcommand_are_kept():
+    from main_pipeline import build_parser
+    parser = build_parser()
+    args = parser.parse_args(['--num-batches', '3', '--parallel', 'translate'])
+    assert args.num_batches == 3 and args.parallel, "Options données avant la sous-commande conservées"
+    assert parser.parse_args(['--daemon', 'generate']).daemon, "--daemon avant generate conservé"
+    args = parser.parse_args(['translate', '--num-batches', '4'])
+    assert args.num_batches == 4 and args.batch_size_model == 32 and not args.daemon, "Défauts inchangés sans option avant la sous-commande"
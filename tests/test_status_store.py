@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+import pandas as pd
+from utils.status_store import BatchStatusStore, get_store_path
+
+
+def make_meta(tmp_path, n=5):
+    meta_path = str(tmp_path / 'batch_info.parquet')
+    pd.DataFrame([{
+        'batch_id': f'en_batch_{i:03d}',
+        'batch_file': f'en_batch_{i:03d}.parquet',
+        'date_creation': '2025-08-15T00:00:00',
+        'nb_phrases': 100,
+        'start_idx': i * 100 + 1,
+        'end_idx': (i + 1) * 100,
+        'status': 'en_attente',
+        'commentaire': ''
+    } for i in range(n)]).to_parquet(meta_path, index=False)
+    return meta_path
+
+
+def test_import_and_transitions(tmp_path):
+    meta_path = make_meta(tmp_path)
+    store = BatchStatusStore(meta_path)
+    assert get_store_path(meta_path).endswith('batch_info.sqlite')
+    assert store.get_batches_to_process() == [f'en_batch_{i:03d}' for i in range(5)]
+    assert store.set_status('en_batch_001', 'termine')
+    assert store.set_status('en_batch_002', 'erreur')
+    assert not store.set_status('inconnu', 'termine')
+    assert store.get_batches_to_process() == ['en_batch_000', 'en_batch_003', 'en_batch_004']
+    # Le parquet n'est réécrit qu'à l'export
+    assert set(pd.read_parquet(meta_path)['status']) == {'en_attente'}
+    store.export_parquet()
+    exported = pd.read_parquet(meta_path).set_index('batch_id')['status']
+    assert exported['en_batch_001'] == 'termine' and exported['en_batch_002'] == 'erreur'
+
+
+def test_concurrent_claims_are_exclusive(tmp_path):
+    meta_path = make_meta(tmp_path, n=20)
+    store = BatchStatusStore(meta_path)
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(owner):
+        while True:
+            batch_id = store.claim_next(owner)
+            if batch_id is None:
+                return
+            with lock:
+                claimed.append(batch_id)
+
+    threads = [threading.Thread(target=worker, args=(f'w{i}',)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == [f'en_batch_{i:03d}' for i in range(20)], "Chaque lot doit être réservé une seule fois"
+
+
+def test_claim_from_previous_run(tmp_path):
+    meta_path = make_meta(tmp_path, n=2)
+    store = BatchStatusStore(meta_path, heartbeat_interval=None, stale_after=60)
+    assert store.claim('en_batch_000', owner='run-1')
+    assert not store.claim('en_batch_000', owner='run-1')
+    assert not store.claim('en_batch_000', owner='run-2'), "Un lot dont le heartbeat est récent n'est pas repris"
+    # Sans heartbeat depuis stale_after secondes, le lot est considéré abandonné
+    store._conn.execute("UPDATE batches SET heartbeat_at = heartbeat_at - 120 WHERE batch_id = 'en_batch_000'")
+    assert store.claim('en_batch_000', owner='run-2')
+    # Propriétaire mort sur cette machine : reprise immédiate
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    assert store.claim('en_batch_001', owner=f"{socket.gethostname()}:{dead.pid}:abcd1234")
+    assert store.claim('en_batch_001', owner='run-3')
+    # pid vivant (réutilisé par un autre processus) mais heartbeat trop ancien : lot repris
+    reused = f"{socket.gethostname()}:{os.getppid()}:abcd1234"
+    store._conn.execute("UPDATE batches SET owner = ?, heartbeat_at = heartbeat_at - 120 WHERE batch_id = 'en_batch_001'", (reused,))
+    assert store.claim('en_batch_001', owner='run-4'), "Heartbeat périmé : pid vivant ignoré"
+
+
+def test_heartbeat_and_progress(tmp_path):
+    meta_path = make_meta(tmp_path, n=2)
+    store = BatchStatusStore(meta_path, heartbeat_interval=None, stale_after=60)
+    assert store.claim('en_batch_000', owner='run-1')
+    store._conn.execute("UPDATE batches SET heartbeat_at = heartbeat_at - 120")
+    assert store.heartbeat('run-1') == 1
+    assert not store.claim('en_batch_000', owner='run-2'), "Le heartbeat garde la réservation"
+    store.save_progress('en_batch_000', [(0, 'un'), (2, 'trois'), (3, None)], model_key='k1')
+    assert store.load_progress('en_batch_000', model_key='k1') == {0: 'un', 2: 'trois'}, "Les échecs (None) ne sont pas enregistrés"
+    assert store.load_progress('en_batch_000', model_key='k2') == {}, "Une autre configuration de modèle ne reprend pas ces traductions"
+    store.clear_progress('en_batch_000')
+    assert store.load_progress('en_batch_000', model_key='k1') == {}
+
+
+def test_external_parquet_rewrite_is_merged_at_open(tmp_path):
+    meta_path = make_meta(tmp_path, n=2)
+    store = BatchStatusStore(meta_path, heartbeat_interval=None)
+    store.set_status('en_batch_000', 'termine')
+    assert store.claim('en_batch_001', owner='run-1')
+    store.save_progress('en_batch_001', [(0, 'un')], model_key='k1')
+    store.export_parquet()
+    assert BatchStatusStore(meta_path).get_status('en_batch_000') == 'termine', "Un export du store n'est pas réimporté"
+    time.sleep(0.01)
+    make_meta(tmp_path, n=3)
+    os.utime(meta_path, None)
+    assert store.get_batches_to_process() == ['en_batch_001'], "Pas de resynchronisation à chaque appel"
+    reopened = BatchStatusStore(meta_path, heartbeat_interval=None)
+    assert reopened.get_batches_to_process() == ['en_batch_000', 'en_batch_001', 'en_batch_002']
+    assert reopened.get_status('en_batch_001') == 'en_cours', "Le statut d'un lot réservé est conservé"
+    assert reopened.load_progress('en_batch_001', model_key='k1') == {0: 'un'}, "Points de reprise conservés"
@@ -0,0 +1,64 @@
+from pipeline.translation_memory import TranslationMemory, invalidate, make_model_key, normalize_source
+
+MODEL = {'name': 'Helsinki-NLP/opus-mt-en-fr', 'path': 'opus-mt-en-fr/snapshots/aaa', 'type': 'marian'}
+
+
+def test_normalization_and_keys(tmp_path):
+    tm = TranslationMemory(str(tmp_path / 'tm.sqlite'), MODEL)
+    assert normalize_source('  No acute   distress. ') == 'No acute distress.'
+    assert tm.make_key('No acute distress.') == tm.make_key(' No  acute distress. ')
+    assert tm.make_key('No acute distress.') != tm.make_key('no acute distress.')
+    assert make_model_key(MODEL, 'fp32') != make_model_key(MODEL, 'fp16')
+    assert make_model_key(MODEL, generation_params={'num_beams': 1}) != make_model_key(MODEL)
+
+
+def test_persistence_and_hit_rate(tmp_path):
+    db = str(tmp_path / 'tm.sqlite')
+    tm = TranslationMemory(db, MODEL)
+    key = tm.make_key('Patient denies chest pain.')
+    tm.put_many({key: ('Patient denies chest pain.', 'Le patient nie toute douleur thoracique.')})
+    tm.close()
+    # Nouvelle exécution : l'entrée est relue depuis SQLite
+    tm2 = TranslationMemory(db, MODEL)
+    found = tm2.get_many([key, tm2.make_key('Unknown sentence.')])
+    assert found == {key: 'Le patient nie toute douleur thoracique.'}
+    stats = tm2.stats()
+    assert stats['disk_hits'] == 1 and stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+    tm2.get_many([key])
+    assert tm2.stats()['lru_hits'] == 1
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path):
+    tm = TranslationMemory(str(tmp_path / 'tm.sqlite'), MODEL, max_entries=10, lru_size=2)
+    keys = []
+    for i in range(12):
+        key = tm.make_key(f'sentence {i}')
+        keys.append(key)
+        tm.put_many({key: (f'sentence {i}', f'phrase {i}')})
+    assert tm.stats()['evicted'] > 0
+    assert keys[0] not in tm.get_many([keys[0]])
+    assert keys[-1] in tm.get_many([keys[-1]])
+
+
+def test_entry_count_kept_in_memory(tmp_path):
+    tm = TranslationMemory(str(tmp_path / 'tm.sqlite'), MODEL, max_entries=100)
+    statements = []
+    tm._conn.set_trace_callback(statements.append)
+    for i in range(50):
+        tm.put_many({tm.make_key(f'sentence {i}'): (f'sentence {i}', f'phrase {i}')})
+    assert not any('COUNT(*)' in sql for sql in statements), "Pas de comptage de la table sous la limite"
+    for i in range(50, 120):
+        tm.put_many({tm.make_key(f'sentence {i}'): (f'sentence {i}', f'phrase {i}')})
+    count = tm._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+    assert count <= 100 and tm._count == count, "Compteur tenu à jour par les ajouts et les évictions"
+
+
+def test_invalidate_other_snapshots(tmp_path):
+    db = str(tmp_path / 'tm.sqlite')
+    old = TranslationMemory(db, MODEL)
+    old.put_many({old.make_key('No fever.'): ('No fever.', 'Pas de fièvre.')})
+    old.close()
+    new_model = dict(MODEL, path='opus-mt-en-fr/snapshots/bbb')
+    assert invalidate(db, [MODEL]) == 0
+    assert invalidate(db, [new_model]) == 1
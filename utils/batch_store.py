@@ -0,0 +1,323 @@
+"""
+Stockage des lots EN/FR selon storage.layout :
+- files   : un fichier par lot (<batches_dir>/en_batch_*.parquet, fr_batch_*.parquet), format historique ;
+- dataset : un dataset Parquet partitionné par fichier source, <batches_dir>/<dirname>/en/source=<source>/part-0.parquet,
+  un row group par lot (colonne batch_id) ; un lot logique est un row group, lu par pyarrow.dataset avec
+  projection de colonnes et filtre batch_id poussé jusqu'aux statistiques des row groups.
+  Traductions : <dirname>/fr/source=<source>/, un fragment par lot traduit (<batch_id>.parquet) fusionné dans
+  part-0.parquet (un row group par lot, même clé batch_id que le lot EN) par compact_fr_dataset.
+
+Les chemins de lots restent les chemins logiques <batches_dir>/<batch_id>.parquet dans les deux cas
+(statuts, points de reprise, tokens pré-calculés, mémoire de traduction inchangés).
+
+    python -m utils.batch_store import [--remove]   # lots fichier par fichier -> dataset
+    python -m utils.batch_store compact             # fragments FR -> part-0.parquet
+"""
+import os
+import re
+import glob
+import threading
+from utils.core import log_info, ensure_dir_exists, read_parquet_columns
+from utils.config_loader import load_config, get_abs_path_from_config
+
+PART_FILE = 'part-0.parquet'
+BATCH_NAME_RE = re.compile(r'^(?:en|fr)_batch_(.+)_(\d+)_(\d+)$')
+
+# Index des partitions lues : chemin -> (signature du fichier, fragment pyarrow.dataset avec footer chargé, {batch_id: row group})
+_fragments = {}
+_fragments_lock = threading.Lock()
+
+
+def get_storage_config(config):
+    return dict({'layout': 'files', 'dirname': 'dataset'}, **(config.get('storage') or {}))
+
+
+def is_dataset_layout(config=None):
+    return get_storage_config(config or load_config())['layout'] == 'dataset'
+
+
+def get_dataset_dir(config, side='en', batches_dir=None):
+    batches_dir = batches_dir or get_abs_path_from_config(config, 'batches_dir')
+    return os.path.join(batches_dir, get_storage_config(config)['dirname'], side)
+
+
+def get_batch_path(batches_dir, batch_id):
+    """Chemin logique d'un lot (fichier réel en layout files)."""
+    return os.path.join(batches_dir, f"{batch_id}.parquet")
+
+
+def batch_key(path_or_name):
+    """batch_id EN commun aux deux côtés : en_batch_x_1_100 pour en_batch_x_1_100.parquet comme pour fr_batch_x_1_100.parquet."""
+    name = os.path.basename(path_or_name)
+    if name.endswith('.parquet'):
+        name = name[:-len('.parquet')]
+    return 'en_' + name[len('fr_'):] if name.startswith('fr_') else name
+
+
+def parse_batch_key(batch_id):
+    """(source, début, fin) d'un batch_id en_batch_<source>_<début>_<fin>, ou None."""
+    match = BATCH_NAME_RE.match(batch_id)
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2)), int(match.group(3))
+
+
+def _sort_key(batch_id):
+    parsed = parse_batch_key(batch_id)
+    return (parsed[1], batch_id) if parsed else (0, batch_id)
+
+
+def _partition_dir(dataset_dir, batch_id):
+    parsed = parse_batch_key(batch_id)
+    if parsed is None:
+        raise ValueError(f"Nom de lot non reconnu (en_batch_<source>_<début>_<fin>) : {batch_id}")
+    return os.path.join(dataset_dir, f"source={parsed[0]}")
+
+
+def row_group_batch_ids(parquet_file):
+    """batch_id de chaque row group, lus dans les statistiques du footer (sans lire les données)."""
+    metadata = parquet_file.metadata
+    index = parquet_file.schema_arrow.get_field_index('batch_id')
+    ids = []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(index).statistics
+        if stats is not None and stats.has_min_max and stats.min == stats.max:
+            value = stats.min
+            ids.append(value.decode() if isinstance(value, bytes) else value)
+        else:
+            ids.append(parquet_file.read_row_group(i, columns=['batch_id']).column(0)[0].as_py())
+    return ids
+
+
+def get_partition_index(part_path):
+    """
+    (fragment pyarrow.dataset, {batch_id: row group}) d'une partition, footer lu une fois
+    puis réutilisé tant que le fichier ne change pas.
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    stat = os.stat(part_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _fragments_lock:
+        cached = _fragments.get(part_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1], cached[2]
+    import pyarrow.parquet as pq
+    fragment = ds.ParquetFileFormat().make_fragment(part_path, filesystem=pafs.LocalFileSystem())
+    fragment.ensure_complete_metadata()
+    index = {batch_id: i for i, batch_id in enumerate(row_group_batch_ids(pq.ParquetFile(part_path)))}
+    with _fragments_lock:
+        _fragments[part_path] = (signature, fragment, index)
+    return fragment, index
+
+
+def _dataset_paths(batch_path, config):
+    """(batch_id, fragment non compacté, part-0.parquet) d'un lot dans sa partition du dataset."""
+    name = os.path.basename(batch_path)
+    side = 'fr' if name.startswith('fr_') else 'en'
+    batch_id = batch_key(name)
+    partition = _partition_dir(get_dataset_dir(config, side, os.path.dirname(batch_path)), batch_id)
+    return batch_id, os.path.join(partition, f"{batch_id}.parquet"), os.path.join(partition, PART_FILE)
+
+
+def read_batch_columns(batch_path, columns=None, config=None, filter=None):
+    """
+    Lot EN ou FR en DataFrame (colonnes demandées qui existent, None = toutes) : fichier du lot s'il existe,
+    sinon row group du dataset (layout dataset), lu par pyarrow.dataset avec projection de colonnes.
+    filter : expression pyarrow.dataset poussée jusqu'aux statistiques des pages/row groups (layout dataset).
+    Lève FileNotFoundError si le lot est introuvable.
+    """
+    if os.path.isfile(batch_path):
+        return read_parquet_columns(batch_path, columns)
+    config = config or load_config()
+    if not is_dataset_layout(config):
+        raise FileNotFoundError(f"Lot introuvable : {batch_path}")
+    import pyarrow.dataset as ds
+    batch_id, fragment_path, part_path = _dataset_paths(batch_path, config)
+    # Fragment non compacté (lot retraduit) prioritaire sur le row group de part-0.parquet
+    if os.path.isfile(fragment_path):
+        source = ds.dataset(fragment_path, format='parquet')
+    elif os.path.isfile(part_path):
+        fragment, index = get_partition_index(part_path)
+        if batch_id not in index:
+            raise FileNotFoundError(f"Lot introuvable : {batch_id} absent de {part_path}")
+        source = fragment.subset(row_group_ids=[index[batch_id]])
+    else:
+        raise FileNotFoundError(f"Lot introuvable : {batch_path} (partition {os.path.dirname(part_path)} vide)")
+    names = source.physical_schema.names if isinstance(source, ds.Fragment) else source.schema.names
+    wanted = [c for c in (columns or names) if c in names and c != 'batch_id']
+    return source.to_table(columns=wanted, filter=filter).to_pandas()
+
+
+def read_batch_statistics(batch_path, columns, config=None):
+    """
+    (nombre de lignes, {colonne: (min, max)}) d'un lot, lus dans les statistiques du footer parquet
+    (fichier du lot, ou row group du dataset) sans lire les données. Une colonne sans aucune valeur non nulle
+    vaut None ; une colonne sans statistiques est absente du dict. Lève ValueError si une colonne manque au lot.
+    """
+    import pyarrow.parquet as pq
+    if os.path.isfile(batch_path):
+        metadata = pq.ParquetFile(batch_path).metadata
+        row_groups = range(metadata.num_row_groups)
+    else:
+        config = config or load_config()
+        if not is_dataset_layout(config):
+            raise FileNotFoundError(f"Lot introuvable : {batch_path}")
+        batch_id, fragment_path, part_path = _dataset_paths(batch_path, config)
+        if os.path.isfile(fragment_path):
+            metadata = pq.ParquetFile(fragment_path).metadata
+            row_groups = range(metadata.num_row_groups)
+        elif os.path.isfile(part_path):
+            fragment, index = get_partition_index(part_path)
+            if batch_id not in index:
+                raise FileNotFoundError(f"Lot introuvable : {batch_id} absent de {part_path}")
+            metadata, row_groups = fragment.metadata, [index[batch_id]]
+        else:
+            raise FileNotFoundError(f"Lot introuvable : {batch_path} (partition {os.path.dirname(part_path)} vide)")
+    nb_rows, bounds, unknown = 0, {}, set()
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        nb_rows += row_group.num_rows
+        chunks = {row_group.column(j).path_in_schema: row_group.column(j) for j in range(row_group.num_columns)}
+        missing = [c for c in columns if c not in chunks]
+        if missing:
+            raise ValueError(f"Colonne(s) absente(s) du lot {os.path.basename(batch_path)} : {missing}")
+        for column in columns:
+            stats = chunks[column].statistics
+            if stats is not None and stats.has_min_max:
+                low, high = bounds.get(column, (stats.min, stats.max))
+                bounds[column] = (min(low, stats.min), max(high, stats.max))
+            elif not (stats is not None and stats.has_null_count and stats.null_count == row_group.num_rows):
+                unknown.add(column)
+    return nb_rows, {c: bounds.get(c) for c in columns if c not in unknown}
+
+
+def write_batch(batch_path, df, config=None):
+    """Écrit un lot FR : fichier du lot (layout files) ou fragment de la partition FR du dataset."""
+    config = config or load_config()
+    if not is_dataset_layout(config):
+        df.to_parquet(batch_path, index=False)
+        return batch_path
+    batch_id = batch_key(batch_path)
+    partition = _partition_dir(get_dataset_dir(config, 'fr', os.path.dirname(batch_path)), batch_id)
+    ensure_dir_exists(partition)
+    fragment_path = os.path.join(partition, f"{batch_id}.parquet")
+    tmp_path = fragment_path + '.tmp'
+    df.assign(batch_id=batch_id).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, fragment_path)
+    return fragment_path
+
+
+def list_en_batches(config=None, batches_dir=None):
+    """Chemins logiques des lots EN (ordre des noms), quel que soit le layout."""
+    config = config or load_config()
+    batches_dir = batches_dir or get_abs_path_from_config(config, 'batches_dir')
+    if not is_dataset_layout(config):
+        return sorted(glob.glob(os.path.join(batches_dir, 'en_*.parquet')))
+    import pyarrow.parquet as pq
+    ids = []
+    for part in glob.glob(os.path.join(get_dataset_dir(config, 'en', batches_dir), 'source=*', PART_FILE)):
+        ids += row_group_batch_ids(pq.ParquetFile(part))
+    return [get_batch_path(batches_dir, batch_id) for batch_id in sorted(ids)]
+
+
+def _align(table, schema):
+    """Table aux colonnes et types du schéma commun (colonnes absentes à null)."""
+    import pyarrow as pa
+    columns = [table.column(f.name) if f.name in table.schema.names else pa.nulls(table.num_rows, f.type) for f in schema]
+    return pa.Table.from_arrays(columns, names=schema.names).cast(schema)
+
+
+def merge_partition(part_path, batch_files):
+    """
+    Réécrit part_path avec ses row groups existants (hors lots remplacés) et les lots de batch_files
+    (un fichier par lot, batch_id déduit du nom), un row group par lot, dans l'ordre de début des lots.
+    Mémoire bornée par un lot. Retourne le nombre de row groups écrits.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    new = {batch_key(path): path for path in batch_files}
+    items, schemas = [], []
+    if os.path.isfile(part_path):
+        existing = pq.ParquetFile(part_path)
+        schemas.append(existing.schema_arrow)
+        items += [(batch_id, i) for i, batch_id in enumerate(row_group_batch_ids(existing)) if batch_id not in new]
+    for batch_id, path in new.items():
+        schema = pq.read_schema(path)
+        schemas.append(schema if 'batch_id' in schema.names else schema.append(pa.field('batch_id', pa.string())))
+        items.append((batch_id, path))
+    if not items:
+        return 0
+    # Types promus d'un lot à l'autre (colonne entièrement nulle dans un lot, entière dans un autre)
+    schema = pa.unify_schemas([s.remove_metadata() for s in schemas], promote_options='permissive')
+    ensure_dir_exists(os.path.dirname(part_path))
+    tmp_path = part_path + '.tmp'
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for batch_id, source in sorted(items, key=lambda item: _sort_key(item[0])):
+            if isinstance(source, int):
+                table = existing.read_row_group(source)
+            else:
+                table = pq.read_table(source)
+                if 'batch_id' not in table.schema.names:
+                    table = table.append_column('batch_id', pa.array([batch_id] * table.num_rows, pa.string()))
+            writer.write_table(_align(table, schema), row_group_size=max(table.num_rows, 1))
+    os.replace(tmp_path, part_path)
+    return len(items)
+
+
+def import_batch_files(batch_paths, config=None, remove=False, dataset_root=None):
+    """
+    Intègre des lots au format fichier (en_batch_*.parquet, fr_batch_*.parquet) dans le dataset :
+    une partition par source et par côté, un lot remplaçant son row group s'il existe déjà.
+    dataset_root : dossier du dataset (défaut : <dossier des fichiers>/<storage.dirname>).
+    remove=True supprime les fichiers importés. Retourne le nombre de lots importés.
+    """
+    config = config or load_config()
+    groups = {}
+    for path in batch_paths:
+        side = 'fr' if os.path.basename(path).startswith('fr_') else 'en'
+        if dataset_root:
+            dataset_dir = os.path.join(dataset_root, side)
+        else:
+            dataset_dir = get_dataset_dir(config, side, os.path.dirname(os.path.abspath(path)))
+        groups.setdefault(os.path.join(_partition_dir(dataset_dir, batch_key(path)), PART_FILE), []).append(path)
+    for part_path, paths in sorted(groups.items()):
+        merge_partition(part_path, paths)
+        log_info(f"[DATASET] {len(paths)} lot(s) intégré(s) dans {part_path}")
+        if remove:
+            for path in paths:
+                os.remove(path)
+    return sum(len(paths) for paths in groups.values())
+
+
+def compact_fr_dataset(config=None, batches_dir=None):
+    """Fusionne les fragments FR (un par lot traduit) dans part-0.parquet de leur partition. Retourne le nombre de fragments fusionnés."""
+    config = config or load_config()
+    fr_dir = get_dataset_dir(config, 'fr', batches_dir)
+    merged = 0
+    for partition in sorted(glob.glob(os.path.join(fr_dir, 'source=*'))):
+        fragments = sorted(p for p in glob.glob(os.path.join(partition, '*.parquet')) if os.path.basename(p) != PART_FILE)
+        if not fragments:
+            continue
+        merge_partition(os.path.join(partition, PART_FILE), fragments)
+        for fragment in fragments:
+            os.remove(fragment)
+        merged += len(fragments)
+    return merged
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Dataset Parquet des lots (storage.layout: dataset)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_import = sub.add_parser('import', help='Intégrer les lots fichier par fichier (en_batch_*/fr_batch_*) dans le dataset')
+    p_import.add_argument('--remove', action='store_true', help='Supprimer les fichiers une fois importés')
+    sub.add_parser('compact', help='Fusionner les fragments FR dans leur partition')
+    args = parser.parse_args()
+    config = load_config()
+    batches_dir = get_abs_path_from_config(config, 'batches_dir')
+    if args.command == 'import':
+        paths = sorted(glob.glob(os.path.join(batches_dir, 'en_batch_*.parquet')) + glob.glob(os.path.join(batches_dir, 'fr_batch_*.parquet')))
+        log_info(f"[DATASET] {import_batch_files(paths, config, remove=args.remove)} lot(s) importé(s) dans {os.path.dirname(get_dataset_dir(config))}")
+    else:
+        log_info(f"[DATASET] {compact_fr_dataset(config)} fragment(s) FR compacté(s)")
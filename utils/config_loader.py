@@ -6,7 +6,12 @@ CONFIG_REQUIRED_KEYS = [
     'raw_data_dir', 'processed_data_dir', 'batches_dir', 'meta_dir', 'logs_dir', 'models_dir', 'models'
 ]
 
-# Charge la configuration YAML et valide les clés principales
+# Configurations chargées : (chemin, racine) -> (mtime, config). Lecture et validation (création des dossiers)
+# une seule fois par processus tant que le fichier ne change pas.
+_config_cache = {}
+
+# Charge la configuration YAML (mise en cache) et valide les clés principales.
+# L'objet retourné est partagé : ne pas le modifier.
 
 def load_config(config_path='config.yaml', root=None):
     if root is None:
@@ -15,16 +20,25 @@ def load_config(config_path='config.yaml', root=None):
     if not os.path.isfile(config_full_path):
         log_error(f"Fichier de configuration introuvable : {config_full_path}")
         raise FileNotFoundError(f"Fichier de configuration introuvable : {config_full_path}")
+    mtime = os.path.getmtime(config_full_path)
+    cached = _config_cache.get((config_full_path, root))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
     with open(config_full_path, 'r') as f:
         config = yaml.safe_load(f)
     validate_config(config, root)
+    _config_cache[(config_full_path, root)] = (mtime, config)
     return config
 
+def clear_config_cache():
+    _config_cache.clear()
+
 def validate_config(config, root):
     for key in CONFIG_REQUIRED_KEYS:
         if key not in config:
             log_error(f'Clé manquante dans la config : {key}')
             raise KeyError(f'Clé manquante dans la config : {key}')
+    check_checkpoint_stages(config)
     # Crée les dossiers principaux s'ils n'existent pas
     from utils.core import ensure_dirs_exist
     dir_keys = ['raw_data_dir', 'processed_data_dir', 'batches_dir', 'meta_dir', 'logs_dir', 'models_dir']
@@ -41,3 +55,22 @@ def get_abs_path_from_config(config, key, root=None):
         root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     rel_path = config[key]
     return os.path.abspath(os.path.join(root, rel_path))
+
+# Étapes intermédiaires dont le résultat est écrit sur disque (points de reprise), selon `save_intermediate` :
+# true = toutes, false = aucune, liste = étapes nommées. Le lot FR (résultat final) est toujours écrit.
+
+CHECKPOINT_STAGES = ['preprocessing']
+
+def check_checkpoint_stages(config):
+    save_intermediate = config.get('save_intermediate', True)
+    if isinstance(save_intermediate, (list, tuple)):
+        unknown = [stage for stage in save_intermediate if stage not in CHECKPOINT_STAGES]
+        if unknown:
+            log_error(f"Étape(s) inconnue(s) dans save_intermediate : {unknown} (étapes possibles : {CHECKPOINT_STAGES})")
+            raise ValueError(f"Étape(s) inconnue(s) dans save_intermediate : {unknown} (étapes possibles : {CHECKPOINT_STAGES})")
+
+def is_checkpoint(config, stage):
+    save_intermediate = config.get('save_intermediate', True)
+    if isinstance(save_intermediate, (list, tuple)):
+        return stage in save_intermediate
+    return bool(save_intermediate)
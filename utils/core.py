@@ -5,6 +5,7 @@ import time
 def log_execution_time(operation_name=None):
     """
     Décorateur pour mesurer et logger le temps d'exécution d'une fonction.
+    La durée alimente aussi l'histogramme stage_duration_seconds{stage=...} (utils.metrics).
     Utilisation :
         @log_execution_time()
         def ma_fonction(...): ...
@@ -13,22 +14,31 @@ def log_execution_time(operation_name=None):
         def ...
     """
     def decorator(func):
+        from utils import metrics
+        name = operation_name or func.__name__
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            name = operation_name or func.__name__
             logger = logging.getLogger()
             start = time.perf_counter()
             logger.info(f"[TIMER] Début de '{name}'")
-            result = func(*args, **kwargs)
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                metrics.inc('stage_errors_total', stage=name)
+                raise
             elapsed = time.perf_counter() - start
+            metrics.observe('stage_duration_seconds', elapsed, stage=name)
             logger.info(f"[TIMER] Fin de '{name}' : {elapsed:.3f} secondes")
             return result
         return wrapper
     return decorator
 
 import os
+import sys
 import logging
 import shutil
+import threading
 from datetime import datetime
 from logging import StreamHandler, FileHandler, Formatter, getLogger, INFO, DEBUG, ERROR
 
@@ -48,12 +58,20 @@ def get_best_device(device_cfg):
         return device
     return device_cfg
 
+SOURCE_EXTENSIONS = ('.txt', '.csv', '.txt.gz', '.csv.gz', '.txt.zst', '.csv.zst')
+
+
+def is_source_file(filename):
+    """Fichier source de phrases : .txt ou .csv, éventuellement compressé (.gz, .zst)."""
+    return filename.endswith(SOURCE_EXTENSIONS)
+
+
 def check_data_source_exists(config):
-    """Vérifie la présence d'au moins un fichier source (.txt ou .csv) dans data/raw/"""
+    """Vérifie la présence d'au moins un fichier source (.txt ou .csv, éventuellement compressé) dans data/raw/"""
     from utils.config_loader import get_abs_path_from_config
     data_dir = get_abs_path_from_config(config, 'raw_data_dir')
     check_dir_exists(data_dir, f"Le dossier source des données n'existe pas : {data_dir}")
-    files = [f for f in os.listdir(data_dir) if f.endswith('.txt') or f.endswith('.csv')]
+    files = [f for f in os.listdir(data_dir) if is_source_file(f)]
     if not files:
         log_error(f"Aucun fichier source (.txt ou .csv) trouvé dans {data_dir}")
         raise FileNotFoundError(f"Aucun fichier source (.txt ou .csv) trouvé dans {data_dir}")
@@ -75,13 +93,65 @@ def safe_open(path, mode='r', encoding=None):
     return open(path, mode, encoding=encoding)
 
 # --- Gestion des erreurs/logs ---
-def setup_logger(log_dir, log_name='pipeline.log'):
-    ensure_dir_exists(log_dir)
-    log_path = os.path.join(log_dir, log_name)
-    # Niveau de log configurable via config.yaml ou variable d'env
+# Écriture des logs : avec logging.async (défaut), les handlers (fichier, console, recopie stdout)
+# tournent dans un thread dédié alimenté par une file ; log_info/log_error ne font que déposer l'enregistrement.
+# Les messages répétés à chaque sous-batch (log_info(..., throttle=True)) sont échantillonnés
+# (1 sur sample_every) et limités à max_per_second par point d'appel.
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_LOGGING = {'async': True, 'stdout_mirror': True, 'sample_every': 1, 'max_per_second': None}
+
+# print_mirror : recopie [INFO]/[ERREUR] sur stdout faite par log_info/log_error eux-mêmes
+# (désactivée si un handler s'en charge ou en mode démon)
+_log_state = {'print_mirror': True, 'stdout_mirror': True, 'listener': None, 'throttle': None}
+
+
+class StdoutMirrorHandler(logging.Handler):
+    """Recopie sur stdout, au format [INFO] message, des enregistrements émis par log_info/log_error."""
+
+    def emit(self, record):
+        prefix = getattr(record, 'mirror', None)
+        if prefix:
+            print(f"{prefix} {record.getMessage()}")
+
+
+class LogThrottle:
+    """Échantillonnage et limitation de débit des messages répétitifs, par point d'appel."""
+
+    def __init__(self, sample_every=1, max_per_second=None):
+        self.sample_every = max(1, int(sample_every or 1))
+        self.max_per_second = max_per_second
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def allow(self, key):
+        """Retourne None si le message est supprimé, sinon le nombre de messages supprimés depuis le dernier émis."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None:
+                state = self._state[key] = [0, 0, now, 0]  # vus, supprimés, début de fenêtre, émis dans la fenêtre
+            state[0] += 1
+            if (state[0] - 1) % self.sample_every:
+                state[1] += 1
+                return None
+            if self.max_per_second:
+                if now - state[2] >= 1.0:
+                    state[2], state[3] = now, 0
+                if state[3] >= self.max_per_second:
+                    state[1] += 1
+                    return None
+                state[3] += 1
+            suppressed, state[1] = state[1], 0
+            return suppressed
+
+
+def read_logging_config():
+    """Niveau et options de logging de config.yaml (lecture directe : appelé avant load_config)."""
     import yaml
     config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.yaml')
     log_level = INFO
+    options = dict(DEFAULT_LOGGING)
     if os.path.isfile(config_path):
         with open(config_path, 'r', encoding='utf-8') as f:
             try:
@@ -91,22 +161,96 @@ def setup_logger(log_dir, log_name='pipeline.log'):
                     log_level = DEBUG
                 elif level_str == 'ERROR':
                     log_level = ERROR
+                options.update(config.get('logging') or {})
             except Exception:
                 pass
-    # Fichier log avec timestamp
-    now = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_name_ts = f"pipeline_{now}.log"
-    log_path_ts = os.path.join(log_dir, log_name_ts)
+    return log_level, options
+
+
+def install_log_handlers(handlers, log_level=INFO, async_logging=True, stdout_mirror=True, sample_every=1, max_per_second=None):
+    """
+    Remplace les handlers du logger racine.
+    async_logging : handlers servis par un thread dédié (QueueListener), arrêté et vidé à la sortie.
+    stdout_mirror : recopie [INFO]/[ERREUR] sur stdout (False en mode démon).
+    """
+    import queue
+    import atexit
+    from logging.handlers import QueueHandler, QueueListener
+    stop_log_listener()
+    _log_state['stdout_mirror'] = stdout_mirror
     logger = getLogger()
     logger.setLevel(log_level)
     if logger.hasHandlers():
         logger.handlers.clear()
-    file_handler = FileHandler(log_path_ts, encoding='utf-8')
-    file_handler.setFormatter(Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
-    logger.addHandler(file_handler)
-    stream_handler = StreamHandler()
-    stream_handler.setFormatter(Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
-    logger.addHandler(stream_handler)
+    handlers = list(handlers)
+    if async_logging:
+        if stdout_mirror:
+            handlers.append(StdoutMirrorHandler())
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(stop_log_listener)
+        logger.addHandler(QueueHandler(log_queue))
+        _log_state['listener'] = listener
+        _log_state['print_mirror'] = False
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+        _log_state['print_mirror'] = stdout_mirror
+    _log_state['throttle'] = LogThrottle(sample_every, max_per_second) if (sample_every or 1) > 1 or max_per_second else None
+    return logger
+
+
+def get_log_handlers():
+    """Handlers effectifs du logger racine (ceux du thread d'écriture en mode async)."""
+    listener = _log_state['listener']
+    return list(listener.handlers) if listener is not None else list(getLogger().handlers)
+
+
+def get_stdout_mirror():
+    """Recopie console active dans ce processus (transmise aux workers processus)."""
+    return _log_state['stdout_mirror']
+
+
+def stop_log_listener():
+    """Vide la file des logs et arrête le thread d'écriture (fin d'exécution)."""
+    listener = _log_state['listener']
+    if listener is not None:
+        _log_state['listener'] = None
+        listener.stop()
+
+
+def make_file_handler(log_path):
+    handler = FileHandler(log_path, encoding='utf-8')
+    handler.setFormatter(Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+    return handler
+
+
+def setup_logger(log_dir, log_name='pipeline.log', stdout_mirror=None):
+    """
+    Logger de la pipeline : fichier horodaté + console (+ recopie stdout), via la section logging de config.yaml.
+    stdout_mirror=False (mode démon) : fichier uniquement.
+    """
+    ensure_dir_exists(log_dir)
+    log_level, options = read_logging_config()
+    if stdout_mirror is not None:
+        options['stdout_mirror'] = stdout_mirror
+    # Fichier log avec timestamp
+    now = datetime.now().strftime('%Y%m%d_%H%M%S')
+    log_name_ts = f"pipeline_{now}.log"
+    log_path_ts = os.path.join(log_dir, log_name_ts)
+    handlers = [make_file_handler(log_path_ts)]
+    if options['stdout_mirror']:
+        stream_handler = StreamHandler()
+        stream_handler.setFormatter(Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+        handlers.append(stream_handler)
+    logger = install_log_handlers(
+        handlers, log_level,
+        async_logging=options['async'],
+        stdout_mirror=options['stdout_mirror'],
+        sample_every=options['sample_every'],
+        max_per_second=options['max_per_second']
+    )
     # Copie le dernier log en pipeline.log (pour accès rapide)
     log_path = os.path.join(log_dir, 'pipeline.log')
     try:
@@ -116,16 +260,29 @@ def setup_logger(log_dir, log_name='pipeline.log'):
     return logger
 
 def log_error(msg, exc=None):
-    logging.error(msg)
+    logging.error(msg, extra={'mirror': '[ERREUR]'}, stacklevel=2)
     if exc:
-        logging.error(str(exc))
-    print(f"[ERREUR] {msg}")
-    if exc:
-        print(f"[EXCEPTION] {exc}")
+        logging.error(str(exc), extra={'mirror': '[EXCEPTION]'}, stacklevel=2)
+    if _log_state['print_mirror']:
+        print(f"[ERREUR] {msg}")
+        if exc:
+            print(f"[EXCEPTION] {exc}")
 
-def log_info(msg):
-    logging.info(msg)
-    print(f"[INFO] {msg}")
+def log_info(msg, throttle=False):
+    """
+    Log INFO (+ recopie stdout).
+    throttle=True : message répété à chaque sous-batch, soumis à l'échantillonnage / limitation de débit.
+    """
+    if throttle and _log_state['throttle'] is not None:
+        caller = sys._getframe(1)
+        suppressed = _log_state['throttle'].allow((caller.f_code.co_filename, caller.f_lineno))
+        if suppressed is None:
+            return
+        if suppressed:
+            msg = f"{msg} ({suppressed} message(s) similaire(s) omis)"
+    logging.info(msg, extra={'mirror': '[INFO]'}, stacklevel=2)
+    if _log_state['print_mirror']:
+        print(f"[INFO] {msg}")
 
 # --- Vérifications génériques ---
 def check_file_exists(path, msg=None):
@@ -156,3 +313,15 @@ def check_not_empty(lst, msg=None):
 # --- Utilitaires divers ---
 def timestamp():
     return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+def read_parquet_columns(path, columns=None):
+    """
+    Lit un parquet en ne chargeant que les colonnes demandées qui existent dans le fichier
+    (projection de colonnes). columns=None lit toutes les colonnes.
+    """
+    import pandas as pd
+    if columns is None:
+        return pd.read_parquet(path)
+    import pyarrow.parquet as pq
+    available = set(pq.read_schema(path).names)
+    return pd.read_parquet(path, columns=[c for c in columns if c in available])
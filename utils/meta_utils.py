@@ -1,12 +1,125 @@
+import os
+import glob
 import pandas as pd
+from utils.status_store import get_status_store
+from utils import metrics
+
 
 def get_batches_to_process(meta_path):
     """Retourne la liste des batch_id à traiter (statut != 'termine' et != 'erreur')."""
-    df = pd.read_parquet(meta_path)
-    return df.loc[~df['status'].isin(['termine', 'erreur']), 'batch_id'].tolist()
-
-def update_batch_status(meta_path, batch_id, new_status):
-    """Met à jour le statut d'un lot dans le meta."""
-    df = pd.read_parquet(meta_path)
-    df.loc[df['batch_id'] == batch_id, 'status'] = new_status
-    df.to_parquet(meta_path, index=False)
+    return get_status_store(meta_path).get_batches_to_process()
+
+
+def update_batch_status(meta_path, batch_id, new_status, commentaire=None):
+    """Met à jour le statut (et le commentaire s'il est donné) d'un lot dans le store des statuts (sans réécrire le meta parquet)."""
+    metrics.inc('batch_status_total', status=new_status)
+    return get_status_store(meta_path).set_status(batch_id, new_status, commentaire)
+
+
+def claim_batch(meta_path, batch_id):
+    """Réserve atomiquement un lot pour ce processus. Retourne False s'il est déjà pris."""
+    return get_status_store(meta_path).claim(batch_id)
+
+
+def register_batches(meta_path, meta_records, replace=True):
+    """
+    Enregistre les lots générés dans le store des statuts.
+    replace=True remplace les lots existants, replace=False ajoute les lots (génération en flux).
+    """
+    store = get_status_store(meta_path)
+    if replace:
+        store.replace_all(meta_records)
+    else:
+        store.add_batches(meta_records)
+
+
+def export_batch_info(meta_path):
+    """Réécrit batch_info.parquet à partir du store (pour les outils de reporting)."""
+    return get_status_store(meta_path).export_parquet()
+
+
+# --- Meta des lots FR (fr_batch_info) : fragments en ajout seul + compaction ---
+FR_META_FILE = 'fr_batch_info.parquet'
+FR_META_FRAGMENTS_DIR = 'fr_batch_info_fragments'
+
+
+def append_fr_meta_record(meta_dir, meta_record):
+    """
+    Ajoute l'enregistrement meta d'un lot FR sous forme de petit fragment parquet (un par lot).
+    Écriture atomique ; un lot retraduit remplace simplement son fragment.
+    """
+    fragments_dir = os.path.join(meta_dir, FR_META_FRAGMENTS_DIR)
+    os.makedirs(fragments_dir, exist_ok=True)
+    fragment_path = os.path.join(fragments_dir, f"{meta_record['batch_id']}.parquet")
+    tmp_path = fragment_path + '.tmp'
+    pd.DataFrame([meta_record]).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, fragment_path)
+    return fragment_path
+
+
+def _list_fr_meta_fragments(meta_dir):
+    return sorted(glob.glob(os.path.join(meta_dir, FR_META_FRAGMENTS_DIR, '*.parquet')))
+
+
+def read_fr_batch_info(meta_dir):
+    """
+    Vue consolidée du meta FR : fichier compacté fr_batch_info.parquet + fragments non compactés.
+    Un fragment remplace la ligne compactée du même batch_id. Retourne None si aucun meta FR.
+    """
+    parts = []
+    compacted_path = os.path.join(meta_dir, FR_META_FILE)
+    if os.path.isfile(compacted_path):
+        parts.append(pd.read_parquet(compacted_path))
+    parts += [pd.read_parquet(p) for p in _list_fr_meta_fragments(meta_dir)]
+    if not parts:
+        return None
+    df = pd.concat(parts, ignore_index=True)
+    return df.drop_duplicates(subset='batch_id', keep='last').reset_index(drop=True)
+
+
+def compact_fr_batch_info(meta_dir):
+    """Fusionne les fragments dans fr_batch_info.parquet puis les supprime. Retourne le nombre de fragments fusionnés."""
+    fragments = _list_fr_meta_fragments(meta_dir)
+    if not fragments:
+        return 0
+    df = read_fr_batch_info(meta_dir)
+    compacted_path = os.path.join(meta_dir, FR_META_FILE)
+    tmp_path = compacted_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, compacted_path)
+    for fragment in fragments:
+        os.remove(fragment)
+    return len(fragments)
+
+
+# --- Phrases en échec (traduction impossible même seules) : un fichier par lot ---
+FAILED_SENTENCES_DIR = 'failed_sentences'
+
+
+def record_failed_sentences(meta_dir, batch_id, records):
+    """
+    Enregistre les phrases d'un lot dont la traduction a échoué (id_phrase, en, error).
+    Un lot retraduit remplace son fichier ; sans échec, l'ancien fichier est supprimé.
+    """
+    failed_dir = os.path.join(meta_dir, FAILED_SENTENCES_DIR)
+    failed_path = os.path.join(failed_dir, f"{batch_id}.parquet")
+    if not records:
+        if os.path.isfile(failed_path):
+            os.remove(failed_path)
+        return None
+    os.makedirs(failed_dir, exist_ok=True)
+    df = pd.DataFrame(records)
+    df.insert(0, 'batch_id', batch_id)
+    df['date'] = pd.Timestamp.now().isoformat()
+    tmp_path = failed_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, failed_path)
+    return failed_path
+
+
+def read_failed_sentences(meta_dir):
+    """Toutes les phrases en échec (tous lots confondus), ou None s'il n'y en a pas."""
+    paths = sorted(glob.glob(os.path.join(meta_dir, FAILED_SENTENCES_DIR, '*.parquet')))
+    if not paths:
+        return None
+    return pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
@@ -0,0 +1,235 @@
+"""
+Registre de métriques de la pipeline : compteurs, jauges et histogrammes étiquetés.
+- alimenté par log_execution_time (durée des étapes) et la boucle de monitoring de la traduction
+  (latence des sous-batchs, phrases traduites, padding, mémoire, alertes, échecs) ;
+- exporté par exécution dans logs/metrics/ : fichier texte Prometheus (dernier état, lisible par
+  le textfile collector de node_exporter) et série temporelle JSONL (un instantané par export).
+
+Coût par appel : un verrou et une mise à jour de dictionnaire (~1 µs), prévu pour rester actif
+en production (section `metrics` de config.yaml pour le désactiver).
+"""
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+
+PREFIX = 'trans_sent_'
+
+# Bornes des histogrammes de durée (secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+HELP = {
+    'stage_duration_seconds': "Durée des étapes instrumentées par log_execution_time",
+    'stage_errors_total': "Étapes terminées par une exception",
+    'sub_batch_latency_seconds': "Latence d'un sous-batch envoyé au modèle (tokenisation, generate, décodage)",
+    'translation_stage_seconds': "Durée par étage d'un sous-batch (tokenize, generate, decode ; *_wait : attente du thread principal)",
+    'sentences_translated_total': "Phrases traduites par le modèle",
+    'sub_batches_total': "Sous-batchs envoyés au modèle",
+    'tokens_real_total': "Tokens réels des sous-batchs",
+    'tokens_padded_total': "Tokens après padding des sous-batchs",
+    'padding_efficiency': "Tokens réels / tokens paddés du dernier sous-batch",
+    'translation_failures_total': "Phrases en échec après découpage des sous-batchs",
+    'oom_total': "Saturations mémoire pendant la traduction",
+    'translation_memory_lookups_total': "Phrases cherchées dans la mémoire de traduction",
+    'translation_memory_hits_total': "Phrases trouvées dans la mémoire de traduction",
+    'ram_used_mb': "RAM utilisée (Mo)",
+    'gpu_used_mb': "Mémoire GPU allouée (Mo)",
+    'alerts_total': "Alertes de monitoring (ram, gpu, time)",
+    'batch_status_total': "Changements de statut des lots",
+    'row_filter_batches_total': "Lots examinés par le filtre de lignes (selected, pruned_stats, pruned_rows)",
+    'row_filter_rows_total': "Phrases examinées par le filtre de lignes (selected, pruned)",
+    'server_request_latency_seconds': "Latence d'une requête du serveur de traduction (file + traduction)",
+    'server_sentences_total': "Phrases traduites par le serveur",
+    'server_batches_total': "Paquets envoyés au modèle par le serveur (micro-batching)",
+    'server_rejected_total': "Requêtes refusées par le serveur (file pleine)",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+class MetricsRegistry:
+    """Métriques d'un processus ; toutes les opérations sont sûres entre threads."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                # [compte par intervalle..., +Inf, somme, nombre]
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            hist[slot] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Liste des séries : {'name', 'type', 'labels', 'value'} ou, pour un histogramme, 'buckets'/'sum'/'count'."""
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = [(key, list(hist)) for key, hist in self._histograms.items()]
+        series = [{'name': n, 'type': 'counter', 'labels': dict(l), 'value': v} for (n, l), v in counters]
+        series += [{'name': n, 'type': 'gauge', 'labels': dict(l), 'value': v} for (n, l), v in gauges]
+        for (name, labels), hist in histograms:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + ('+Inf',), hist[:-2]):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            series.append({'name': name, 'type': 'histogram', 'labels': dict(labels), 'buckets': buckets, 'sum': hist[-2], 'count': hist[-1]})
+        return sorted(series, key=lambda s: (s['name'], sorted(s['labels'].items())))
+
+    def to_prometheus(self, extra_labels=None):
+        """État courant au format texte Prometheus (exposition 0.0.4)."""
+        lines = []
+        declared = set()
+        for s in self.snapshot():
+            name = PREFIX + s['name']
+            labels = dict(extra_labels or {}, **s['labels'])
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {HELP.get(s['name'], s['name'])}")
+                lines.append(f"# TYPE {name} {s['type']}")
+            if s['type'] == 'histogram':
+                for bound, count in s['buckets'].items():
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=bound))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(s['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {s['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(s['value'])}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsExporter:
+    """Écrit périodiquement le registre : <prefix>.prom (remplacé) et <prefix>.jsonl (un instantané par ligne)."""
+
+    def __init__(self, registry, metrics_dir, run_id, interval=10):
+        self.registry = registry
+        self.run_id = run_id
+        self.interval = interval
+        name = f"metrics_{run_id}" if is_main_process() else f"metrics_{run_id}_pid{os.getpid()}"
+        os.makedirs(metrics_dir, exist_ok=True)
+        self.prom_path = os.path.join(metrics_dir, name + '.prom')
+        self.jsonl_path = os.path.join(metrics_dir, name + '.jsonl')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export(self):
+        with self._lock:
+            labels = {'run_id': self.run_id, 'pid': os.getpid()}
+            tmp_path = self.prom_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.registry.to_prometheus(labels))
+            os.replace(tmp_path, self.prom_path)
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(dict(labels, ts=round(time.time(), 3), metrics=self.registry.snapshot()), ensure_ascii=False) + '\n')
+
+    def start(self):
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='metrics-export', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._safe_export()
+
+    def _safe_export(self):
+        try:
+            self.export()
+        except OSError as e:
+            from utils.core import log_error
+            log_error("[METRIQUES] Échec de l'export des métriques", exc=e)
+
+    def stop(self):
+        """Arrête l'export périodique et écrit l'état final (idempotent)."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._safe_export()
+
+
+def is_main_process():
+    import multiprocessing
+    return multiprocessing.parent_process() is None
+
+
+# --- Registre du processus ---
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set_gauge
+observe = REGISTRY.observe
+
+_exporter = None
+
+
+def start_metrics_export(config, run_id):
+    """
+    Active l'export des métriques de ce processus pour l'exécution run_id (section `metrics` de la config).
+    Retourne l'exporteur, ou None si les métriques sont désactivées.
+    """
+    global _exporter
+    cfg = config.get('metrics') or {}
+    REGISTRY.enabled = cfg.get('enabled', True)
+    if not REGISTRY.enabled:
+        return None
+    if _exporter is None:
+        from utils.config_loader import get_abs_path_from_config
+        metrics_dir = os.path.join(get_abs_path_from_config(config, 'logs_dir'), cfg.get('dirname', 'metrics'))
+        _exporter = MetricsExporter(REGISTRY, metrics_dir, run_id, cfg.get('export_interval', 10)).start()
+    return _exporter
+
+
+def stop_metrics_export():
+    """Écrit l'état final des métriques (fin d'exécution)."""
+    if _exporter is not None:
+        _exporter.stop()
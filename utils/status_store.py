@@ -0,0 +1,436 @@
+"""
+Stockage transactionnel du statut des lots (SQLite en mode WAL).
+Remplace la réécriture complète de batch_info.parquet à chaque changement de statut :
+- transitions de statut en O(1) (UPDATE par clé primaire)
+- réservation atomique d'un lot (un seul worker/processus l'obtient)
+- requêtes indexées sur le statut
+- export vers batch_info.parquet pour les outils de reporting
+- battement de cœur (heartbeat) des lots réservés : un lot en_cours dont le propriétaire est mort
+  (processus absent sur cette machine) ou dont le heartbeat est plus vieux que stale_after est repris
+- points de reprise de la traduction (table checkpoints) : traductions des sous-batchs terminés,
+  relues au redémarrage pour ne traduire que le reste du lot
+
+La base vit à côté du meta parquet : translations/meta/batch_info.sqlite.
+Si batch_info.parquet a été réécrit par un autre outil, il est fusionné par batch_id à l'ouverture
+du store (lots en cours et points de reprise conservés) ; pandas n'est importé que pour ces
+échanges avec le parquet.
+"""
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from utils.core import log_info, log_error
+
+FINAL_STATUSES = ('termine', 'erreur')
+
+# Identifiant de ce processus pour les réservations de lots
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+META_COLUMNS = ['batch_id', 'batch_file', 'date_creation', 'nb_phrases', 'start_idx', 'end_idx', 'status', 'commentaire']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL UNIQUE,
+    batch_file TEXT,
+    date_creation TEXT,
+    nb_phrases INTEGER,
+    start_idx INTEGER,
+    end_idx INTEGER,
+    status TEXT NOT NULL,
+    commentaire TEXT,
+    owner TEXT,
+    updated_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_batches_status ON batches(status);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    batch_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    fr TEXT NOT NULL,
+    model_key TEXT NOT NULL,
+    PRIMARY KEY (batch_id, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+INSERT_BATCH = (
+    "INSERT INTO batches (batch_id, batch_file, date_creation, nb_phrases, start_idx, end_idx, status, commentaire, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Fusion d'un parquet réécrit hors du store : lot existant mis à jour en place (ordre seq conservé),
+# sauf le statut d'un lot réservé par un worker
+MERGE_BATCH = INSERT_BATCH + (
+    " ON CONFLICT(batch_id) DO UPDATE SET batch_file = excluded.batch_file, date_creation = excluded.date_creation,"
+    " nb_phrases = excluded.nb_phrases, start_idx = excluded.start_idx, end_idx = excluded.end_idx,"
+    " status = CASE WHEN batches.status = 'en_cours' THEN batches.status ELSE excluded.status END,"
+    " commentaire = excluded.commentaire, updated_at = excluded.updated_at"
+)
+
+
+def get_store_path(meta_path):
+    """Chemin de la base SQLite associée à un meta parquet (batch_info.parquet -> batch_info.sqlite)."""
+    return os.path.splitext(meta_path)[0] + '.sqlite'
+
+
+def is_owner_alive(owner):
+    """
+    Le propriétaire d'une réservation (hôte:pid:jeton) est-il vivant ?
+    True/False si le processus est sur cette machine, None si on ne peut pas le savoir (autre hôte).
+    """
+    parts = (owner or '').split(':')
+    if len(parts) != 3 or parts[0] != socket.gethostname():
+        return None
+    if owner == OWNER_ID:
+        return True
+    try:
+        pid = int(parts[1])
+    except ValueError:
+        return None
+    if pid == os.getpid():
+        # Même pid, autre jeton : réservation d'un processus précédent dont le pid a été réutilisé
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class BatchStatusStore:
+    """Statuts des lots d'un meta batch_info.parquet, partagé entre threads et processus."""
+
+    def __init__(self, meta_path, heartbeat_interval=30, stale_after=120):
+        self.meta_path = meta_path
+        self.db_path = get_store_path(meta_path)
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._lock = threading.RLock()
+        self._owners = set()
+        self._heartbeat_thread = None
+        self._stop = threading.Event()
+        self._conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._sync_from_parquet()
+
+    def _migrate(self):
+        """Ajoute les colonnes apparues après la création d'une base existante."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(batches)")}
+        if 'heartbeat_at' not in columns:
+            self._conn.execute("ALTER TABLE batches ADD COLUMN heartbeat_at REAL")
+
+    # --- Synchronisation avec batch_info.parquet ---
+    def _parquet_mtime(self):
+        return str(os.stat(self.meta_path).st_mtime_ns) if os.path.isfile(self.meta_path) else None
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _sync_from_parquet(self):
+        """
+        À l'ouverture : fusionne batch_info.parquet par batch_id s'il a été modifié hors du store (ou si le store est neuf).
+        Vérifié sous verrou d'écriture : un export en cours (parquet remplacé, mtime pas encore enregistré) est attendu.
+        Les lots absents du parquet et les points de reprise ne sont pas supprimés.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                mtime = self._parquet_mtime()
+                if mtime is None or mtime == self._get_meta('parquet_mtime'):
+                    self._conn.execute("COMMIT")
+                    return
+                import pandas as pd
+                records = pd.read_parquet(self.meta_path).to_dict('records')
+                self._conn.executemany(MERGE_BATCH, _to_rows(records))
+                self._set_meta('parquet_mtime', mtime)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            log_info(f"[STATUTS] {len(records)} lot(s) fusionné(s) depuis {self.meta_path}")
+
+    def replace_all(self, records):
+        """Remplace tous les lots par les enregistrements meta donnés (génération des lots)."""
+        rows = _to_rows(records)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM batches")
+                self._conn.execute("DELETE FROM checkpoints")
+                self._conn.executemany(INSERT_BATCH, rows)
+                self._set_meta('parquet_mtime', self._parquet_mtime())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add_batches(self, records):
+        """Ajoute des lots (ou remplace ceux de même batch_id) sans toucher aux autres."""
+        rows = _to_rows(records)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM batches WHERE batch_id = ?", [(r[0],) for r in rows])
+                self._conn.executemany("DELETE FROM checkpoints WHERE batch_id = ?", [(r[0],) for r in rows])
+                self._conn.executemany(INSERT_BATCH, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def export_parquet(self, meta_path=None):
+        """
+        Écrit l'état courant dans batch_info.parquet (écriture atomique via fichier temporaire).
+        Instantané, remplacement du fichier et mtime enregistrés dans la même transaction : un autre
+        processus qui ouvre le store ne prend pas l'export pour une réécriture externe.
+        """
+        meta_path = meta_path or self.meta_path
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                df = self.to_dataframe()
+                tmp_path = meta_path + '.tmp'
+                df.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, meta_path)
+                if meta_path == self.meta_path:
+                    self._set_meta('parquet_mtime', self._parquet_mtime())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return meta_path
+
+    def to_dataframe(self):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(META_COLUMNS)} FROM batches ORDER BY seq").fetchall()
+        import pandas as pd
+        return pd.DataFrame(rows, columns=META_COLUMNS)
+
+    # --- Transitions de statut ---
+    def set_status(self, batch_id, status, commentaire=None):
+        """Change le statut d'un lot. Retourne False si le lot est inconnu."""
+        with self._lock:
+            if commentaire is None:
+                cur = self._conn.execute(
+                    "UPDATE batches SET status = ?, owner = ?, updated_at = ? WHERE batch_id = ?",
+                    (status, OWNER_ID, time.time(), batch_id)
+                )
+            else:
+                cur = self._conn.execute(
+                    "UPDATE batches SET status = ?, commentaire = ?, owner = ?, updated_at = ? WHERE batch_id = ?",
+                    (status, commentaire, OWNER_ID, time.time(), batch_id)
+                )
+            return cur.rowcount == 1
+
+    def _is_abandoned(self, owner, heartbeat_at, now):
+        """
+        Réservation abandonnée : propriétaire mort sur cette machine, ou heartbeat plus vieux que stale_after.
+        Un pid vivant ne suffit pas (pid d'un worker mort réutilisé par un autre processus) : un propriétaire
+        vivant rafraîchit son heartbeat depuis son propre thread.
+        """
+        if is_owner_alive(owner) is False:
+            return True
+        return heartbeat_at is None or now - heartbeat_at > self.stale_after
+
+    def _claim_locked(self, batch_id, owner, now):
+        row = self._conn.execute(
+            "SELECT status, owner, IFNULL(heartbeat_at, updated_at) FROM batches WHERE batch_id = ?", (batch_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        status, previous, heartbeat_at = row
+        if status == 'en_cours' and previous != owner and self._is_abandoned(previous, heartbeat_at, now):
+            log_info(f"[STATUTS] Lot {batch_id} abandonné par {previous}, repris par {owner}")
+        elif status != 'en_attente':
+            return False
+        self._conn.execute(
+            "UPDATE batches SET status = 'en_cours', owner = ?, updated_at = ?, heartbeat_at = ? WHERE batch_id = ?",
+            (owner, now, now, batch_id)
+        )
+        return True
+
+    def claim(self, batch_id, owner=OWNER_ID):
+        """
+        Réserve un lot pour ce processus (statut en_cours).
+        Réussit si le lot est en attente, ou en cours mais abandonné par un propriétaire mort
+        (exécution précédente interrompue, worker d'une autre machine sans heartbeat depuis stale_after secondes).
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                claimed = self._claim_locked(batch_id, owner, time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if claimed:
+                self._start_heartbeat(owner)
+            return claimed
+
+    def claim_next(self, owner=OWNER_ID):
+        """Réserve atomiquement le prochain lot en attente (ou abandonné). Retourne son batch_id ou None."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT batch_id FROM batches WHERE status = 'en_attente' ORDER BY seq LIMIT 1").fetchone()
+                batch_id = row[0] if row else None
+                if batch_id is None:
+                    candidates = self._conn.execute(
+                        "SELECT batch_id, owner, IFNULL(heartbeat_at, updated_at) FROM batches "
+                        "WHERE status = 'en_cours' AND IFNULL(owner, '') != ? ORDER BY seq", (owner,)
+                    ).fetchall()
+                    batch_id = next((b for b, o, h in candidates if self._is_abandoned(o, h, now)), None)
+                if batch_id is not None:
+                    self._claim_locked(batch_id, owner, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if batch_id is not None:
+                self._start_heartbeat(owner)
+        return batch_id
+
+    # --- Heartbeat ---
+    def heartbeat(self, owner=OWNER_ID):
+        """Rafraîchit le heartbeat de tous les lots en cours réservés par owner."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE batches SET heartbeat_at = ? WHERE owner = ? AND status = 'en_cours'",
+                (time.time(), owner)
+            )
+            return cur.rowcount
+
+    def _start_heartbeat(self, owner):
+        """Démarre (une fois par store) le thread qui rafraîchit le heartbeat des lots réservés."""
+        self._owners.add(owner)
+        if self._heartbeat_thread is None and self.heartbeat_interval:
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name='status-heartbeat', daemon=True)
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            for owner in list(self._owners):
+                try:
+                    self.heartbeat(owner)
+                except sqlite3.Error as e:
+                    log_error("[STATUTS] Échec du heartbeat", exc=e)
+
+    # --- Points de reprise de la traduction ---
+    def save_progress(self, batch_id, items, model_key=''):
+        """Enregistre les traductions [(index, fr), ...] d'un sous-batch terminé et rafraîchit le heartbeat du lot."""
+        rows = [(batch_id, int(idx), fr, model_key) for idx, fr in items if fr is not None]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO checkpoints (batch_id, idx, fr, model_key) VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("UPDATE batches SET heartbeat_at = ? WHERE batch_id = ?", (time.time(), batch_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def load_progress(self, batch_id, model_key=''):
+        """Traductions déjà enregistrées pour ce lot et cette configuration de modèle : {index: fr}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, fr FROM checkpoints WHERE batch_id = ? AND model_key = ?", (batch_id, model_key)
+            ).fetchall()
+        return dict(rows)
+
+    def clear_progress(self, batch_id):
+        """Supprime les points de reprise d'un lot (lot FR écrit)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE batch_id = ?", (batch_id,))
+
+    # --- Requêtes ---
+    def get_batches_to_process(self):
+        """batch_id dont le statut n'est pas final, dans l'ordre de génération."""
+        placeholders = ','.join('?' * len(FINAL_STATUSES))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT batch_id FROM batches WHERE status NOT IN ({placeholders}) ORDER BY seq",
+                FINAL_STATUSES
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def get_status(self, batch_id):
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return row[0] if row else None
+
+    def count_by_status(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM batches GROUP BY status").fetchall())
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._conn.close()
+
+
+def _to_rows(records):
+    now = time.time()
+    return [(
+        r['batch_id'], r.get('batch_file'), r.get('date_creation'),
+        _to_int(r.get('nb_phrases')), _to_int(r.get('start_idx')), _to_int(r.get('end_idx')),
+        r.get('status') or 'en_attente', r.get('commentaire') or '', now
+    ) for r in records]
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_status_store(meta_path):
+    """Store du processus pour ce meta (une connexion par processus, partagée entre threads)."""
+    key = os.path.abspath(meta_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            from utils.config_loader import load_config
+            cfg = load_config().get('status_store') or {}
+            store = _stores[key] = BatchStatusStore(
+                key,
+                heartbeat_interval=cfg.get('heartbeat_interval', 30),
+                stale_after=cfg.get('stale_after', 120)
+            )
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+    from utils.config_loader import load_config, get_abs_path_from_config
+    parser = argparse.ArgumentParser(description="Store des statuts de lots")
+    parser.add_argument('command', choices=['status', 'export'], help="status : décompte par statut ; export : réécrit batch_info.parquet")
+    args = parser.parse_args()
+    config = load_config()
+    meta_path = os.path.join(get_abs_path_from_config(config, 'meta_dir'), 'batch_info.parquet')
+    store = get_status_store(meta_path)
+    if args.command == 'export':
+        print(f"Export : {store.export_parquet()}")
+    else:
+        for status, n in sorted(store.count_by_status().items()):
+            print(f"{status} : {n}")